@@ -1,15 +1,119 @@
 
-from django.contrib import admin
-from .models import Cliente, Boleto
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.utils import timezone
+from .models import Cliente, Boleto, ContaInter, EnvioEmail, IntencaoEmissao, Reajuste, ReajusteItem, ResumoRecebiveis, Tarefa
+from .forms import ContaInterForm
+from .services.busca_service import filtrar_clientes
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
     list_display = ("nome","cpfCnpj","valorNominal","dataVencimento","email","telefone","cidade","uf")
     search_fields = ("nome","cpfCnpj","email","cidade")
-    list_filter = ("uf",)
+    list_filter = ("ativo","uf","etiqueta","conta")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Primeiro o prefixo nas colunas normalizadas e indexadas (busca/documento); sem
+        # resultado, a busca padrão do admin (icontains em search_fields) acha "silva"
+        # em "João Silva", e-mails e cidades.
+        por_prefixo = filtrar_clientes(queryset, search_term)
+        if not search_term.strip() or por_prefixo.exists():
+            return por_prefixo, False
+        return super().get_search_results(request, queryset, search_term)
+
+@admin.register(ContaInter)
+class ContaInterAdmin(admin.ModelAdmin):
+    form = ContaInterForm
+    list_display = ("nome","conta_corrente","limite_por_minuto","ativa")
+    list_filter = ("ativa",)
+    search_fields = ("nome","conta_corrente")
 
 @admin.register(Boleto)
 class BoletoAdmin(admin.ModelAdmin):
-    list_display = ("cliente","competencia_mes","competencia_ano","valor","status","nosso_numero","codigo_solicitacao","data_vencimento")
-    list_filter = ("status","competencia_ano","competencia_mes")
+    list_display = ("cliente","competencia_mes","competencia_ano","valor","status","erro_tipo","nosso_numero","codigo_solicitacao","data_vencimento")
+    list_filter = ("status","vencido","erro_tipo","competencia_ano","competencia_mes")
+    readonly_fields = ("conta","reservado_por","reservado_ate")
+    actions = ["retentar_falhas"]
+
+    @admin.action(description="Retentar emissão dos boletos com erro retentável")
+    def retentar_falhas(self, request, queryset):
+        # Como o botão em /boletos: a retentativa roda no worker de tarefas, não no gunicorn.
+        from .services.emissao_service import boletos_retentaveis
+        from .services.progresso_service import enfileirar_tarefa
+
+        ids = list(boletos_retentaveis(queryset).values_list("id", flat=True))
+        if not ids:
+            self.message_user(request, "Nenhum boleto com erro retentável na seleção.", messages.INFO)
+            return None
+        tarefa = enfileirar_tarefa(
+            "retentativa",
+            "Retentativa de boletos com erro (admin)",
+            {"boleto_ids": ids},
+            total=len(ids),
+            criado_por=request.user.get_username(),
+        )
+        return redirect("tarefa_detalhe", tarefa_id=tarefa.pk)
     search_fields = ("cliente__nome","nosso_numero","linha_digitavel","codigo_solicitacao")
+
+
+@admin.register(ResumoRecebiveis)
+class ResumoRecebiveisAdmin(admin.ModelAdmin):
+    list_display = ("competencia_mes","competencia_ano","data_vencimento","uf","status","quantidade","valor_total")
+    list_filter = ("status","competencia_ano","uf")
+
+
+@admin.register(IntencaoEmissao)
+class IntencaoEmissaoAdmin(admin.ModelAdmin):
+    list_display = ("seu_numero","boleto","conta","status","tentativas","atualizado_em")
+    list_filter = ("status",)
+    search_fields = ("seu_numero","boleto__cliente__nome")
+    raw_id_fields = ("boleto",)
+
+
+@admin.register(EnvioEmail)
+class EnvioEmailAdmin(admin.ModelAdmin):
+    list_display = ("boleto","destinatario","status","tentativas","proxima_tentativa","enviado_em")
+    list_filter = ("status","dominio")
+    search_fields = ("destinatario","boleto__cliente__nome")
+    raw_id_fields = ("boleto",)
+    readonly_fields = ("ultimo_erro","enviado_em")
+    actions = ["reenviar"]
+
+    @admin.action(description="Reenviar e-mail (volta para a fila)")
+    def reenviar(self, request, queryset):
+        total = queryset.exclude(status="enviando").update(
+            status="pendente", tentativas=0, proxima_tentativa=timezone.now(), ultimo_erro="", lote=""
+        )
+        self.message_user(request, f"{total} e-mail(s) de volta na fila; saem no próximo enviar_boletos.")
+
+
+class ReajusteItemInline(admin.TabularInline):
+    model = ReajusteItem
+    fields = ("cliente","valor_anterior","valor_novo")
+    readonly_fields = fields
+    raw_id_fields = ("cliente",)
+    can_delete = False
+    extra = 0
+    max_num = 0
+
+
+@admin.register(Reajuste)
+class ReajusteAdmin(admin.ModelAdmin):
+    list_display = ("descricao","fator","quantidade","total_anterior","total_novo","boletos_atualizados","criado_por","criado_em")
+    readonly_fields = ("descricao","fator","filtro","quantidade","total_anterior","total_novo","boletos_atualizados","criado_por","criado_em")
+    inlines = [ReajusteItemInline]
+
+    def has_add_permission(self, request):
+        # Reajustes são aplicados por manage.py reajustar_clientes; aqui é só a trilha.
+        return False
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ("descricao","tipo","status","worker","processados","falhas","total","criado_por","iniciada_em","finalizada_em")
+    list_filter = ("status","tipo")
+    readonly_fields = ("tipo","descricao","status","parametros","worker","total","processados","falhas","vazao","mensagens","erro","arquivo","criado_por","iniciada_em","atualizada_em","finalizada_em")
+
+    def has_add_permission(self, request):
+        # Tarefas nascem dos botões de emissão; o andamento fica em /tarefas/<id>/.
+        return False
@@ -4,3 +4,6 @@ class BillingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "billing"
     verbose_name = "Faturamento"
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registra os receivers do rollup
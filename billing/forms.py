@@ -1,16 +1,125 @@
 
+from typing import Any, Dict, List, Optional
+
 from django import forms
+from django.db.models import Exists, OuterRef, Q, QuerySet
+
+from .models import UF_CHOICES, Cliente, Boleto, ContaInter
+from .utils import somente_digitos
+
+class IdsField(forms.Field):
+    """Lista de ids inteiros, sem carregar um choice por registro como ModelMultipleChoiceField."""
+
+    widget = forms.MultipleHiddenInput
+    hidden_widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({int(v) for v in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Identificadores inválidos.")
 
-from .models import Cliente, Boleto
 
 class SelecionarClientesForm(forms.Form):
+    MODO_REGRA = "regra"
+    MODO_SELECIONADOS = "selecionados"
+    MAX_SELECAO_MANUAL = 1000
+
     ano = forms.IntegerField(min_value=2000, max_value=2100, initial=2025, label="Ano")
     mes = forms.IntegerField(min_value=1, max_value=12, initial=9, label="Mês")
-    clientes = forms.ModelMultipleChoiceField(
-        queryset=Cliente.objects.all(),
-        widget=forms.CheckboxSelectMultiple,
-        label="Selecione os clientes para gerar boletos",
+    # Sem valor inicial: com clientes marcados vale "selecionados"; a emissão por
+    # regra precisa ser escolhida (e confirmada) explicitamente.
+    modo = forms.ChoiceField(
+        choices=[
+            (MODO_SELECIONADOS, "Somente os marcados na lista (em qualquer página)"),
+            (MODO_REGRA, "Todos que atendem aos filtros"),
+        ],
+        required=False,
+        widget=forms.RadioSelect,
+        label="Seleção",
+    )
+    somente_ativos = forms.BooleanField(required=False, initial=True, label="Somente clientes ativos")
+    apenas_nao_emitidos = forms.BooleanField(
+        required=False, initial=True, label="Somente quem ainda não tem boleto nesta competência"
     )
+    dia_inicio = forms.IntegerField(min_value=1, max_value=31, required=False, label="Vencimento do dia")
+    dia_fim = forms.IntegerField(min_value=1, max_value=31, required=False, label="até o dia")
+    uf = forms.ChoiceField(choices=[("", "Todas")] + UF_CHOICES, required=False, label="UF")
+    etiqueta = forms.CharField(max_length=50, required=False, label="Etiqueta")
+    # Apenas ids: evita montar (e validar) um choice por cliente cadastrado.
+    clientes = IdsField(required=False, label="Selecione os clientes para gerar boletos")
+
+    def clean(self):
+        dados = super().clean()
+        inicio, fim = dados.get("dia_inicio"), dados.get("dia_fim")
+        if inicio and fim and inicio > fim:
+            self.add_error("dia_fim", "O dia final deve ser maior ou igual ao inicial.")
+        if "clientes" in self.errors:
+            return dados
+        ids = dados.get("clientes") or []
+        modo = dados.get("modo") or (self.MODO_SELECIONADOS if ids else "")
+        dados["modo"] = modo
+        if not modo:
+            self.add_error("clientes", "Marque ao menos um cliente ou escolha gerar para todos que atendem aos filtros.")
+        elif modo == self.MODO_REGRA and ids:
+            self.add_error(
+                "modo",
+                f"Há {len(ids)} cliente(s) marcado(s): escolha gerar somente para os marcados ou desmarque-os.",
+            )
+        elif modo == self.MODO_SELECIONADOS:
+            if not ids:
+                self.add_error("clientes", "Marque ao menos um cliente ou escolha gerar para todos que atendem aos filtros.")
+            elif len(ids) > self.MAX_SELECAO_MANUAL:
+                self.add_error(
+                    "clientes",
+                    f"Marque no máximo {self.MAX_SELECAO_MANUAL} clientes; para mais, use a seleção por filtros.",
+                )
+        return dados
+
+    def dados_filtro(self) -> Dict[str, Any]:
+        """Filtros válidos enviados (mesmo com a seleção inválida); os demais ficam com o valor inicial."""
+        dados = {nome: self.get_initial_for_field(campo, nome) for nome, campo in self.fields.items()}
+        if self.is_bound:
+            self.is_valid()
+            dados.update((nome, valor) for nome, valor in self.cleaned_data.items() if nome not in self.errors)
+        return dados
+
+    def selecionados(self) -> List[str]:
+        """Ids marcados como enviados (para remarcar as caixas e repassar entre páginas)."""
+        return self.data.getlist("clientes") if self.is_bound and hasattr(self.data, "getlist") else []
+
+    def filtrar(self, queryset: QuerySet, dados: Optional[Dict[str, Any]] = None) -> QuerySet:
+        """Aplica as regras de seleção ao queryset (tudo resolvido no banco)."""
+        dados = self.cleaned_data if dados is None else dados
+        if dados.get("somente_ativos"):
+            queryset = queryset.filter(ativo=True)
+        if dados.get("dia_inicio"):
+            queryset = queryset.filter(dataVencimento__gte=dados["dia_inicio"])
+        if dados.get("dia_fim"):
+            queryset = queryset.filter(dataVencimento__lte=dados["dia_fim"])
+        if dados.get("uf"):
+            queryset = queryset.filter(uf=dados["uf"])
+        if dados.get("etiqueta"):
+            queryset = queryset.filter(etiqueta=dados["etiqueta"].strip())
+        if dados.get("apenas_nao_emitidos") and dados.get("ano") and dados.get("mes"):
+            queryset = queryset.exclude(
+                Exists(
+                    Boleto.objects.filter(
+                        cliente=OuterRef("pk"),
+                        competencia_ano=dados["ano"],
+                        competencia_mes=dados["mes"],
+                    )
+                )
+            )
+        return queryset
+
+    def clientes_queryset(self) -> QuerySet:
+        """Os marcados (exatamente eles, em qualquer página) ou todos que atendem aos filtros."""
+        if self.cleaned_data["modo"] == self.MODO_SELECIONADOS:
+            return Cliente.objects.filter(id__in=self.cleaned_data["clientes"]).order_by("id")
+        return self.filtrar(Cliente.objects.all()).order_by("id")
 
 
 class ClienteForm(forms.ModelForm):
@@ -31,12 +140,30 @@ class ClienteForm(forms.ModelForm):
             "cidade",
             "uf",
             "cep",
+            "ativo",
+            "etiqueta",
+            "conta",
         ]
         widgets = {
             "dataVencimento": forms.NumberInput(attrs={"min": 1, "max": 31}),
             "valorNominal": forms.NumberInput(attrs={"step": "0.01"}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Contas inativas não aceitam novos vínculos (a atual continua listada).
+        contas = ContaInter.objects.filter(ativa=True)
+        if self.instance.conta_id:
+            contas = ContaInter.objects.filter(Q(ativa=True) | Q(pk=self.instance.conta_id))
+        self.fields["conta"].queryset = contas
+
+    def clean_cpfCnpj(self):
+        cpf_cnpj = self.cleaned_data["cpfCnpj"]
+        documento = somente_digitos(cpf_cnpj)
+        if documento and Cliente.objects.filter(documento=documento).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError("Já existe um cliente com este CPF/CNPJ.")
+        return cpf_cnpj
+
 
 class BoletoForm(forms.ModelForm):
     class Meta:
@@ -63,3 +190,49 @@ class BoletoForm(forms.ModelForm):
             "data_pagamento": forms.DateInput(attrs={"type": "date"}),
             "valor": forms.NumberInput(attrs={"step": "0.01"}),
         }
+
+    def save(self, commit=True):
+        if "pdf" in self.changed_data:
+            # Arquivo trocado ou removido: o hash (ETag) é recalculado no próximo download.
+            self.instance.pdf_hash = ""
+        return super().save(commit)
+
+
+class ImportarClientesForm(forms.Form):
+    arquivo = forms.FileField(label="Arquivo CSV ou XLSX")
+    simular = forms.BooleanField(required=False, label="Apenas validar (não gravar)")
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data["arquivo"]
+        if not arquivo.name.lower().endswith((".csv", ".txt", ".xlsx", ".xlsm")):
+            raise forms.ValidationError("Envie um arquivo .csv ou .xlsx.")
+        return arquivo
+
+
+class ProcessarRetornoForm(forms.Form):
+    arquivo = forms.FileField(label="Arquivo de retorno (CNAB 240/400) ou extrato OFX")
+    simular = forms.BooleanField(required=False, label="Apenas conciliar (não gravar)")
+
+
+class ContaInterForm(forms.ModelForm):
+    """Cadastro de conta no admin: o ``client_secret`` nunca volta para a tela."""
+
+    client_secret = forms.CharField(
+        label="Client secret",
+        max_length=200,
+        required=False,
+        widget=forms.PasswordInput(render_value=False),
+        help_text="Deixe em branco para manter o atual.",
+    )
+
+    class Meta:
+        model = ContaInter
+        fields = "__all__"
+
+    def clean_client_secret(self):
+        segredo = self.cleaned_data["client_secret"]
+        if segredo:
+            return segredo
+        if self.instance.pk:
+            return self.instance.client_secret
+        raise forms.ValidationError("Informe o client secret da conta.")
@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from billing.services.arquivo_service import chamadas_do_boleto
+
+
+class Command(BaseCommand):
+    help = "Mostra as chamadas ao Inter (requisição e resposta) gravadas para um boleto, pelo índice do arquivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("boleto_id", type=int)
+
+    def handle(self, *args, **options):
+        chamadas = chamadas_do_boleto(options["boleto_id"])
+        for chamada in chamadas:
+            self.stdout.write(json.dumps(chamada, ensure_ascii=False, indent=2))
+        self.stderr.write(f"{len(chamadas)} chamada(s) do boleto {options['boleto_id']}.")
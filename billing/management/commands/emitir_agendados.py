@@ -0,0 +1,60 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services.agendamento_service import emitir_agendados
+
+
+class Command(BaseCommand):
+    help = (
+        "Emite os boletos que vencem nos próximos N dias (para rodar diariamente via cron), "
+        "distribuindo as emissões ao longo do mês."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=settings.INTER_DIAS_ANTECEDENCIA,
+            help="Antecedência em dias (padrão: INTER_DIAS_ANTECEDENCIA)",
+        )
+        parser.add_argument("--data", help="Data de referência AAAA-MM-DD (padrão: hoje)")
+        parser.add_argument("--limite", type=int, help="Máximo de boletos nesta execução; o restante fica para amanhã")
+        parser.add_argument("--workers", type=int, help="Emissões simultâneas (padrão: INTER_EMISSAO_WORKERS)")
+        parser.add_argument("--simular", action="store_true", help="Só mostra quantos seriam emitidos")
+
+    def handle(self, *args, **options):
+        try:
+            hoje = dt.date.fromisoformat(options["data"]) if options["data"] else dt.date.today()
+        except ValueError as exc:
+            raise CommandError(f"Data inválida: {options['data']}") from exc
+        if options["dias"] < 1:
+            raise CommandError("--dias deve ser maior ou igual a 1.")
+
+        relatorio = emitir_agendados(
+            hoje,
+            options["dias"],
+            limite=options["limite"],
+            workers=options["workers"],
+            simular=options["simular"],
+        )
+        inicio, fim = relatorio.datas[0], relatorio.datas[-1]
+        self.stdout.write(
+            f"Vencimentos de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}: {relatorio.selecionados} boleto(s) "
+            f"{'a emitir' if options['simular'] else 'processado(s)'}, {relatorio.adiados} adiado(s) pelo limite."
+        )
+        if relatorio.pendencias:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(relatorio.pendencias)} cliente(s) ignorado(s) por dados inválidos (veja validar_clientes)."
+                )
+            )
+        if not options["simular"]:
+            contagem = relatorio.contagem
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{contagem['emitido']} emitido(s), {contagem['falhou']} com erro, "
+                    f"{contagem['em_duvida']} em verificação, {contagem['ignorado']} ignorado(s)."
+                )
+            )
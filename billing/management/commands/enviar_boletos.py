@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import Boleto, EnvioEmail
+from billing.services.email_service import enfileirar_envios, processar_envios
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia por e-mail o PDF e a linha digitável dos boletos emitidos (outbox), "
+        "com conexões SMTP reaproveitadas e limite por domínio."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ano", type=int, help="Enfileira antes os boletos emitidos desta competência")
+        parser.add_argument("--mes", type=int, help="Competência: mês (com --ano)")
+        parser.add_argument("--so-enfileirar", action="store_true", help="Só enfileira; não envia")
+        parser.add_argument("--workers", type=int, help="Conexões SMTP simultâneas (padrão: EMAIL_WORKERS)")
+        parser.add_argument("--limite", type=int, help="Máximo de e-mails nesta execução")
+        parser.add_argument(
+            "--ate-esvaziar",
+            action="store_true",
+            help="Continua até enviar os adiados pelo limite por domínio (sem isso, ficam para a próxima execução)",
+        )
+
+    def handle(self, *args, **options):
+        if options["mes"] and not options["ano"]:
+            raise CommandError("Informe --ano junto com --mes.")
+        if options["ano"]:
+            boletos = Boleto.objects.filter(competencia_ano=options["ano"])
+            if options["mes"]:
+                boletos = boletos.filter(competencia_mes=options["mes"])
+            enfileirados = enfileirar_envios(boletos)
+            self.stdout.write(f"{enfileirados} e-mail(s) enfileirado(s).")
+        if options["so_enfileirar"]:
+            return
+
+        contagem = processar_envios(
+            workers=options["workers"], limite=options["limite"], ate_esvaziar=options["ate_esvaziar"]
+        )
+        pendentes = EnvioEmail.objects.filter(status="pendente").count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{contagem['enviado']} enviado(s), {contagem['reagendado']} reagendado(s), "
+                f"{contagem['adiado']} adiado(s) pelo limite do domínio, {contagem['falhou']} com falha, "
+                f"{contagem['descartado']} descartado(s). {pendentes} na fila."
+            )
+        )
@@ -0,0 +1,19 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from billing.services.importacao_service import exportar_clientes_csv
+
+
+class Command(BaseCommand):
+    help = "Exporta todos os clientes em CSV (separador ';'), linha a linha."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--saida", help="Arquivo de destino (padrão: stdout)")
+
+    def handle(self, *args, **options):
+        if options["saida"]:
+            with open(options["saida"], "w", newline="", encoding="utf-8") as saida:
+                saida.writelines(exportar_clientes_csv())
+        else:
+            sys.stdout.writelines(exportar_clientes_csv())
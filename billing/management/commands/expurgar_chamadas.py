@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.services.arquivo_service import expurgar_arquivo
+
+
+class Command(BaseCommand):
+    help = "Apaga do arquivo de chamadas ao Inter os dias mais antigos que o prazo de retenção."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=settings.INTER_ARQUIVO_DIAS, help="Dias mantidos (padrão: INTER_ARQUIVO_DIAS)"
+        )
+
+    def handle(self, *args, **options):
+        apagados = expurgar_arquivo(options["dias"])
+        self.stdout.write(self.style.SUCCESS(f"{apagados} arquivo(s) apagado(s)."))
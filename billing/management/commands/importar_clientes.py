@@ -0,0 +1,52 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services.importacao_service import TAMANHO_LOTE, importar_clientes, ler_linhas
+
+
+class Command(BaseCommand):
+    help = "Importa clientes de um CSV/XLSX em lotes (upsert por CPF/CNPJ) e lista as linhas rejeitadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do .csv ou .xlsx")
+        parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Linhas por lote gravado")
+        parser.add_argument("--simular", action="store_true", help="Apenas valida, sem gravar")
+        parser.add_argument("--rejeitados", help="Grava as linhas rejeitadas (amostra) neste CSV")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options["arquivo"], "rb") as stream:
+                relatorio = importar_clientes(
+                    ler_linhas(stream, options["arquivo"]),
+                    tamanho_lote=options["lote"],
+                    simular=options["simular"],
+                )
+        except (OSError, RuntimeError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for numero, _, erros in relatorio.amostra_rejeitados[:20]:
+            self.stderr.write(f"Linha {numero}: {'; '.join(erros)}")
+        if options["rejeitados"] and relatorio.amostra_rejeitados:
+            with open(options["rejeitados"], "w", newline="", encoding="utf-8") as saida:
+                escritor = csv.writer(saida, delimiter=";")
+                escritor.writerow(["linha", "erros", "dados"])
+                for numero, dados, erros in relatorio.amostra_rejeitados:
+                    escritor.writerow([numero, "; ".join(erros), dados])
+
+        acao = "validados" if options["simular"] else "importados"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{relatorio.importados} cliente(s) {acao}, {relatorio.rejeitados} rejeitado(s) "
+                f"de {relatorio.total} linha(s) em {time.perf_counter() - inicio:.1f}s."
+            )
+        )
+        if relatorio.incompletos:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{relatorio.incompletos} aceito(s) sem dados suficientes para emitir boleto "
+                    "(veja manage.py validar_clientes)."
+                )
+            )
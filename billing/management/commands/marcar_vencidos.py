@@ -0,0 +1,37 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services.atraso_service import marcar_vencidos, relatorio_atraso
+
+
+class Command(BaseCommand):
+    help = "Marca como vencidos os boletos em aberto que passaram do vencimento (rodar uma vez por dia)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--data", help="Data de referência AAAA-MM-DD (padrão: hoje)")
+        parser.add_argument("--relatorio", action="store_true", help="Mostra também o aging por faixa de atraso")
+
+    def handle(self, *args, **options):
+        try:
+            hoje = dt.date.fromisoformat(options["data"]) if options["data"] else dt.date.today()
+        except ValueError as exc:
+            raise CommandError(f"Data inválida: {options['data']}") from exc
+
+        marcados, desmarcados = marcar_vencidos(hoje)
+        self.stdout.write(
+            self.style.SUCCESS(f"{marcados} boleto(s) marcado(s) como vencido(s), {desmarcados} desmarcado(s).")
+        )
+        if not options["relatorio"]:
+            return
+        relatorio = relatorio_atraso(hoje)
+        for rotulo, faixa in zip(relatorio["faixas"], relatorio["totais"]):
+            self.stdout.write(
+                f"{rotulo:>6} dias: {faixa['quantidade']:>6} boleto(s)  R$ {faixa['valor']:>12}  "
+                f"multa R$ {faixa['multa']:>10}  mora R$ {faixa['mora']:>10}  total R$ {faixa['total']:>12}"
+            )
+        total = relatorio["total"]
+        self.stdout.write(
+            f"{len(relatorio['clientes'])} cliente(s) em atraso, {total['quantidade']} boleto(s), "
+            f"total atualizado R$ {total['total']}."
+        )
@@ -0,0 +1,75 @@
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+STAMP_FILENAME = ".collectstatic.sha1"
+
+
+def _migracoes_pendentes() -> bool:
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    plano = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return bool(plano)
+
+
+def _impressao_digital_estaticos() -> str:
+    """Resume nome, tamanho e mtime de todos os arquivos encontrados pelos finders."""
+    digest = hashlib.sha1()
+    entradas = []
+    for finder in finders.get_finders():
+        for caminho, storage in finder.list([]):
+            stat = os.stat(storage.path(caminho))
+            entradas.append(f"{caminho}:{stat.st_size}:{int(stat.st_mtime)}")
+    for entrada in sorted(entradas):
+        digest.update(entrada.encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepara o container para subir: aplica migrações, coleta estáticos e cria o "
+        "superusuário apenas quando há algo pendente."
+    )
+
+    def handle(self, *args, **options):
+        if _migracoes_pendentes():
+            call_command("migrate", interactive=False, verbosity=options["verbosity"])
+        else:
+            self.stdout.write("Migrações em dia; nada a aplicar.")
+
+        self._coletar_estaticos(options["verbosity"])
+        self._criar_superusuario()
+
+    def _coletar_estaticos(self, verbosity: int) -> None:
+        stamp_path = Path(settings.STATIC_ROOT) / STAMP_FILENAME
+        impressao = _impressao_digital_estaticos()
+        forcar = os.getenv("COLLECTSTATIC", "auto") == "always"
+        if not forcar and stamp_path.exists() and stamp_path.read_text().strip() == impressao:
+            self.stdout.write("Arquivos estáticos inalterados; collectstatic ignorado.")
+            return
+
+        call_command("collectstatic", interactive=False, verbosity=verbosity)
+        stamp_path.parent.mkdir(parents=True, exist_ok=True)
+        stamp_path.write_text(impressao)
+
+    def _criar_superusuario(self) -> None:
+        User = get_user_model()
+        username = os.getenv("DJANGO_SUPERUSER_USERNAME")
+        password = os.getenv("DJANGO_SUPERUSER_PASSWORD")
+        if not username or not password:
+            return
+        if User.objects.filter(**{User.USERNAME_FIELD: username}).exists():
+            return
+        User.objects.create_superuser(
+            username,
+            os.getenv("DJANGO_SUPERUSER_EMAIL", ""),
+            password,
+        )
+        self.stdout.write(f"Superusuário '{username}' criado.")
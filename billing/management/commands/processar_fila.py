@@ -0,0 +1,57 @@
+import datetime as dt
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.services.reserva_service import EMISSAO, PDF, TAREFAS, identificador_worker, processar_fila
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de fila: reserva lotes de boletos novos (emissão) ou emitidos sem PDF (pdf) e os "
+        "processa, ou executa as tarefas gravadas pela interface (tarefas). Pode rodar em vários "
+        "containers contra o mesmo banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=[EMISSAO, PDF, TAREFAS], help="Fila a processar")
+        parser.add_argument("--lote", type=int, help="Boletos reservados por vez (padrão: FILA_LOTE)")
+        parser.add_argument(
+            "--duracao", type=int, help="Duração da reserva em segundos (padrão: FILA_DURACAO_RESERVA)"
+        )
+        parser.add_argument("--workers", type=int, help="Chamadas simultâneas ao Inter (padrão: INTER_EMISSAO_WORKERS)")
+        parser.add_argument("--continuo", action="store_true", help="Não para quando a fila esvazia")
+        parser.add_argument("--intervalo", type=float, default=10.0, help="Espera (s) com a fila vazia em --continuo")
+
+    def handle(self, *args, **options):
+        worker = identificador_worker()
+        parar = threading.Event()
+        # SIGTERM (docker stop) termina o lote atual e devolve o restante.
+        signal.signal(signal.SIGTERM, lambda *_: parar.set())
+        duracao = dt.timedelta(seconds=options["duracao"] or settings.FILA_DURACAO_RESERVA)
+        self.stdout.write(f"Worker {worker} na fila de {options['tipo']}.")
+        try:
+            contagem = processar_fila(
+                options["tipo"],
+                worker=worker,
+                lote=options["lote"],
+                duracao=duracao,
+                workers=options["workers"],
+                continuo=options["continuo"],
+                intervalo=options["intervalo"],
+                parar=parar,
+            )
+        except KeyboardInterrupt:
+            return
+        if options["tipo"] == TAREFAS:
+            resumo = f"{contagem['concluida']} tarefa(s) concluída(s), {contagem['falhou']} com falha."
+        elif options["tipo"] == EMISSAO:
+            resumo = (
+                f"{contagem['emitido']} emitido(s), {contagem['falhou']} com erro, "
+                f"{contagem['em_duvida']} em verificação, {contagem['ignorado']} ignorado(s)."
+            )
+        else:
+            resumo = f"{contagem['baixado']} PDF(s) baixado(s), {contagem['sem_pdf']} ainda indisponível(is)."
+        self.stdout.write(self.style.SUCCESS(resumo))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services.retorno_service import TAMANHO_LOTE, processar_retorno
+
+
+class Command(BaseCommand):
+    help = "Liquida boletos pagos a partir de um arquivo de retorno CNAB 240/400 ou extrato OFX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do .ret/.txt (CNAB) ou .ofx")
+        parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Registros por lote gravado")
+        parser.add_argument("--simular", action="store_true", help="Apenas concilia, sem gravar")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options["arquivo"], "rb") as stream:
+                relatorio = processar_retorno(stream, tamanho_lote=options["lote"], simular=options["simular"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for linha, motivo in relatorio.amostra_pendencias[:20]:
+            self.stderr.write(f"Linha {linha}: {motivo}")
+        acao = "a liquidar" if options["simular"] else "liquidado(s)"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{relatorio.formato.upper()}: {relatorio.liquidados} boleto(s) {acao}, "
+                f"{relatorio.ja_pagos} já pago(s), {relatorio.divergentes} com valor divergente, "
+                f"{relatorio.nao_encontrados} sem correspondência, "
+                f"{relatorio.ignorados} lançamento(s) ignorado(s) de {relatorio.total} "
+                f"em {time.perf_counter() - inicio:.1f}s."
+            )
+        )
@@ -0,0 +1,106 @@
+import datetime as dt
+import getpass
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import Cliente
+from billing.services.reajuste_service import fator_reajuste, reajustar_clientes
+
+
+def _decimal(valor: str) -> Decimal:
+    try:
+        return Decimal(valor.replace(",", "."))
+    except InvalidOperation as exc:
+        raise CommandError(f"Número inválido: {valor}") from exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Reajusta o valorNominal dos clientes por um percentual ou por índices mensais compostos "
+        "(IGP-M/IPCA), com prévia, trilha de auditoria e atualização opcional dos boletos não emitidos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--percentual", help="Percentual único, ex.: 4,5")
+        parser.add_argument("--indices", nargs="+", default=[], help="Índices mensais em %% a compor, ex.: 0,5 0,32 -0,1")
+        parser.add_argument("--descricao", default="", help="Ex.: IGP-M 2025 (padrão: o percentual)")
+        parser.add_argument("--uf", help="Só clientes desta UF")
+        parser.add_argument("--etiqueta", help="Só clientes com esta etiqueta")
+        parser.add_argument("--conta", type=int, help="Só clientes desta ContaInter (id)")
+        parser.add_argument("--exceto-etiqueta", action="append", default=[], help="Não reajusta esta etiqueta")
+        parser.add_argument("--exceto", type=int, nargs="+", default=[], help="Ids de clientes a não reajustar")
+        parser.add_argument("--todos", action="store_true", help="Inclui clientes inativos")
+        parser.add_argument(
+            "--regerar-boletos",
+            nargs="?",
+            const="",
+            metavar="AAAA-MM",
+            help="Atualiza boletos ainda não emitidos a partir desta competência (padrão: mês que vem)",
+        )
+        parser.add_argument("--simular", action="store_true", help="Apenas mostra a prévia, sem gravar")
+
+    def handle(self, *args, **options):
+        if options["percentual"] is None and not options["indices"]:
+            raise CommandError("Informe --percentual ou --indices.")
+        try:
+            fator = fator_reajuste(
+                _decimal(options["percentual"]) if options["percentual"] is not None else None,
+                [_decimal(i) for i in options["indices"]],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        clientes = Cliente.objects.all()
+        filtro = []
+        if not options["todos"]:
+            clientes = clientes.filter(ativo=True)
+            filtro.append("ativos")
+        for campo, chave in (("uf", "uf"), ("etiqueta", "etiqueta"), ("conta_id", "conta")):
+            if options[chave]:
+                valor = options[chave].upper() if chave == "uf" else options[chave]
+                clientes = clientes.filter(**{campo: valor})
+                filtro.append(f"{chave}={valor}")
+        if options["exceto_etiqueta"]:
+            clientes = clientes.exclude(etiqueta__in=options["exceto_etiqueta"])
+            filtro.append(f"exceto etiquetas {', '.join(options['exceto_etiqueta'])}")
+        if options["exceto"]:
+            clientes = clientes.exclude(id__in=options["exceto"])
+            filtro.append(f"exceto ids {', '.join(map(str, options['exceto']))}")
+
+        regerar = None
+        if options["regerar_boletos"] is not None:
+            if options["regerar_boletos"]:
+                try:
+                    ano, mes = (int(p) for p in options["regerar_boletos"].split("-"))
+                except ValueError as exc:
+                    raise CommandError(f"Competência inválida: {options['regerar_boletos']}") from exc
+            else:
+                hoje = dt.date.today()
+                ano, mes = (hoje.year + 1, 1) if hoje.month == 12 else (hoje.year, hoje.month + 1)
+            regerar = (ano, mes)
+
+        percentual = (fator - 1) * 100
+        previsao = reajustar_clientes(
+            clientes,
+            fator,
+            descricao=options["descricao"] or f"Reajuste de {percentual:.4f}%",
+            filtro="; ".join(filtro),
+            simular=options["simular"],
+            regerar_a_partir=regerar,
+            criado_por=getpass.getuser(),
+        )
+
+        self.stdout.write(f"Fator {previsao.fator} ({percentual:+.4f}%) sobre {previsao.quantidade} cliente(s):")
+        for anterior, novo, quantidade in previsao.valores[:20]:
+            self.stdout.write(f"  R$ {anterior:>10} -> R$ {novo:>10}  ({quantidade} cliente(s))")
+        if len(previsao.valores) > 20:
+            self.stdout.write(f"  ... e mais {len(previsao.valores) - 20} valor(es) distinto(s).")
+        resumo = f"Total mensal: R$ {previsao.total_anterior} -> R$ {previsao.total_novo}"
+        if regerar:
+            resumo += f"; {previsao.boletos} boleto(s) não emitido(s) a partir de {regerar[1]:02d}/{regerar[0]}"
+        self.stdout.write(resumo + ".")
+        if options["simular"]:
+            self.stdout.write(self.style.WARNING("Simulação: nada foi gravado."))
+        elif previsao.reajuste:
+            self.stdout.write(self.style.SUCCESS(f"Reajuste #{previsao.reajuste.pk} aplicado."))
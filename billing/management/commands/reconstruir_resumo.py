@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from billing.services.resumo_service import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero os rollups do painel de recebíveis a partir dos boletos."
+
+    def handle(self, *args, **options):
+        linhas = reconstruir_resumo()
+        self.stdout.write(self.style.SUCCESS(f"Resumo reconstruído: {linhas} linha(s)."))
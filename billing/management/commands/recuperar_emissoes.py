@@ -0,0 +1,31 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+
+from billing.services.emissao_service import recuperar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        "Consulta no Inter, pelo seuNumero, as emissões que ficaram sem confirmação "
+        "(queda do processo ou timeout) e atualiza os boletos sem reemitir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--idade-minima",
+            type=int,
+            default=5,
+            help="Só verifica intenções paradas há pelo menos N minutos (padrão: 5)",
+        )
+
+    def handle(self, *args, **options):
+        contagem = recuperar_pendentes(
+            None, idade_minima=dt.timedelta(minutes=options["idade_minima"])
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{contagem['confirmadas']} confirmada(s), {contagem['descartadas']} descartada(s), "
+                f"{contagem['falhas']} com erro na consulta."
+            )
+        )
@@ -0,0 +1,69 @@
+import datetime as dt
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services.arquivo_service import arquivos_do_periodo, ler_registros
+from billing.services.reproducao_service import ServidorMock, reproduzir
+
+
+def _data(valor: str) -> dt.date:
+    return dt.date.fromisoformat(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reenvia as chamadas gravadas no arquivo do Inter para um servidor de teste e mede latência "
+        "e vazão. Sem --alvo, sobe um mock local que responde com as próprias gravações."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--de", type=_data, help="Primeiro dia (AAAA-MM-DD)")
+        parser.add_argument("--ate", type=_data, help="Último dia (AAAA-MM-DD)")
+        parser.add_argument("--familia", action="append", help="Só essa família (emissao, token, pdf...); repetível")
+        parser.add_argument("--alvo", help="URL base do mock (ex.: http://localhost:9000)")
+        parser.add_argument("--com-latencia", action="store_true", help="O mock local espera o tempo gravado")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--ritmo", type=float, default=0.0, help="0 = o mais rápido possível; 1 = ritmo original")
+        parser.add_argument("--limite", type=int, help="Máximo de chamadas")
+
+    def handle(self, *args, **options):
+        caminhos = arquivos_do_periodo(options["de"], options["ate"])
+        if not caminhos:
+            raise CommandError("Nenhum arquivo de chamadas no período.")
+        familias = set(options["familia"] or ())
+        registros = []
+        for registro in ler_registros(caminhos):
+            if familias and registro.get("familia") not in familias:
+                continue
+            registros.append(registro)
+            if options["limite"] and len(registros) >= options["limite"]:
+                break
+        if not registros:
+            raise CommandError("Nenhuma chamada gravada com esses filtros.")
+
+        mock = None
+        alvo = options["alvo"]
+        if not alvo:
+            mock = ServidorMock(registros, com_latencia=options["com_latencia"])
+            alvo = mock.url
+            threading.Thread(target=mock.serve_forever, name="mock-inter", daemon=True).start()
+        self.stdout.write(f"Reproduzindo {len(registros)} chamada(s) de {len(caminhos)} arquivo(s) contra {alvo}.")
+        try:
+            relatorio = reproduzir(registros, alvo, workers=options["workers"], ritmo=options["ritmo"])
+        finally:
+            if mock is not None:
+                mock.shutdown()
+                mock.server_close()
+
+        status = ", ".join(f"{codigo}: {quantidade}" for codigo, quantidade in sorted(relatorio.status.items()))
+        self.stdout.write(
+            f"{relatorio.total} chamada(s) em {relatorio.duracao:.2f}s ({relatorio.vazao:.1f}/s); "
+            f"status {status or '-'}; {relatorio.divergentes} diferente(s) do gravado; {relatorio.erros} erro(s) de conexão."
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Latência p50 {relatorio.percentil(50):.1f} ms, p95 {relatorio.percentil(95):.1f} ms, "
+                f"p99 {relatorio.percentil(99):.1f} ms."
+            )
+        )
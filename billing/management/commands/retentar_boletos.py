@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from billing.models import Boleto
+from billing.services.emissao_service import boletos_retentaveis, retentar_falhas
+
+
+class Command(BaseCommand):
+    help = (
+        "Reenvia ao Inter, em paralelo, os boletos que certamente não foram registrados "
+        "(cobrança não enviada ou erro de autenticação)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ano", type=int, help="Competência: ano")
+        parser.add_argument("--mes", type=int, help="Competência: mês")
+        parser.add_argument(
+            "--sem-classificacao",
+            action="store_true",
+            help="Inclui boletos com erro anterior à classificação (tipo em branco)",
+        )
+        parser.add_argument("--workers", type=int, help="Emissões simultâneas (padrão: INTER_EMISSAO_WORKERS)")
+        parser.add_argument("--simular", action="store_true", help="Só lista quantos seriam reenviados")
+
+    def handle(self, *args, **options):
+        queryset = Boleto.objects.all()
+        if options["ano"]:
+            queryset = queryset.filter(competencia_ano=options["ano"])
+        if options["mes"]:
+            queryset = queryset.filter(competencia_mes=options["mes"])
+
+        incluir = options["sem_classificacao"]
+        total = boletos_retentaveis(queryset, incluir_sem_classificacao=incluir).count()
+        if options["simular"] or not total:
+            self.stdout.write(f"{total} boleto(s) elegível(is) para retentativa.")
+            return
+
+        contagem = retentar_falhas(
+            None, queryset, incluir_sem_classificacao=incluir, workers=options["workers"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} reenviado(s): {contagem['emitido']} emitido(s), {contagem['falhou']} com erro, "
+                f"{contagem['em_duvida']} em verificação, {contagem['ignorado']} ignorado(s)."
+            )
+        )
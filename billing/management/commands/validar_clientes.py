@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from billing.models import Cliente
+from billing.validacao import validar_clientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere, sem chamar o Inter, se os clientes têm os dados exigidos na emissão "
+        "(CPF/CNPJ, valor, endereço, UF e CEP coerentes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todos", action="store_true", help="Inclui clientes inativos")
+        parser.add_argument("--uf", help="Só clientes desta UF")
+        parser.add_argument("--etiqueta", help="Só clientes com esta etiqueta")
+        parser.add_argument("--limite", type=int, default=50, help="Máximo de clientes listados (padrão: 50)")
+
+    def handle(self, *args, **options):
+        queryset = Cliente.objects.all()
+        if not options["todos"]:
+            queryset = queryset.filter(ativo=True)
+        if options["uf"]:
+            queryset = queryset.filter(uf=options["uf"].upper())
+        if options["etiqueta"]:
+            queryset = queryset.filter(etiqueta=options["etiqueta"])
+
+        relatorio = validar_clientes(queryset)
+        for cliente_id, problemas in list(relatorio.invalidos.items())[: options["limite"]]:
+            self.stdout.write(f"#{cliente_id} {relatorio.nomes[cliente_id]}: {'; '.join(problemas)}")
+
+        resumo = f"{relatorio.total} cliente(s) verificado(s), {len(relatorio.invalidos)} com pendência."
+        if relatorio.invalidos:
+            self.stdout.write(self.style.WARNING(resumo))
+        else:
+            self.stdout.write(self.style.SUCCESS(resumo))
@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def popular_resumo(apps, schema_editor):
+    Boleto = apps.get_model("billing", "Boleto")
+    ResumoRecebiveis = apps.get_model("billing", "ResumoRecebiveis")
+    ResumoCliente = apps.get_model("billing", "ResumoCliente")
+
+    grupos = (
+        Boleto.objects.values("competencia_ano", "competencia_mes", "data_vencimento", "status", uf=F("cliente__uf"))
+        .annotate(quantidade=Count("id"), valor_total=Sum("valor"))
+        .order_by()
+    )
+    ResumoRecebiveis.objects.bulk_create(
+        [ResumoRecebiveis(**{**g, "uf": g["uf"] or ""}) for g in grupos], batch_size=1000
+    )
+    grupos_cliente = (
+        Boleto.objects.values("cliente_id", "status")
+        .annotate(quantidade=Count("id"), valor_total=Sum("valor"))
+        .order_by()
+    )
+    ResumoCliente.objects.bulk_create([ResumoCliente(**g) for g in grupos_cliente], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_boleto_codigo_solicitacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoRecebiveis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia_ano', models.PositiveSmallIntegerField()),
+                ('competencia_mes', models.PositiveSmallIntegerField()),
+                ('data_vencimento', models.DateField()),
+                ('uf', models.CharField(blank=True, max_length=2)),
+                ('status', models.CharField(choices=[('novo', 'Novo'), ('emitido', 'Emitido'), ('pago', 'Pago'), ('cancelado', 'Cancelado'), ('erro', 'Erro')], max_length=10)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'data_vencimento'], name='billing_res_status_20c937_idx')],
+                'unique_together': {('competencia_ano', 'competencia_mes', 'data_vencimento', 'uf', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('novo', 'Novo'), ('emitido', 'Emitido'), ('pago', 'Pago'), ('cancelado', 'Cancelado'), ('erro', 'Erro')], max_length=10)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to='billing.cliente')),
+            ],
+            options={
+                'unique_together': {('cliente', 'status')},
+            },
+        ),
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+from billing.utils import normalizar_texto, somente_digitos
+
+
+def popular_busca(apps, schema_editor):
+    Cliente = apps.get_model("billing", "Cliente")
+    clientes = list(Cliente.objects.only("id", "nome", "cpfCnpj"))
+    for cliente in clientes:
+        cliente.busca = normalizar_texto(cliente.nome)[:200]
+        cliente.documento = somente_digitos(cliente.cpfCnpj)[:14]
+    Cliente.objects.bulk_update(clientes, ["busca", "documento"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_resumo_recebiveis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='documento',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=14),
+        ),
+        migrations.RunPython(popular_busca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_cliente_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='ativo',
+            field=models.BooleanField(db_index=True, default=True, verbose_name='Ativo'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='etiqueta',
+            field=models.CharField(blank=True, db_index=True, max_length=50, verbose_name='Etiqueta'),
+        ),
+    ]
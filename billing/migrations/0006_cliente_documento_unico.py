@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def preparar_documento(apps, schema_editor):
+    Cliente = apps.get_model("billing", "Cliente")
+    Cliente.objects.filter(documento="").update(documento=None)
+    duplicados = list(
+        Cliente.objects.exclude(documento=None)
+        .values("documento")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .values_list("documento", flat=True)[:20]
+    )
+    if duplicados:
+        raise RuntimeError(
+            "Existem clientes com CPF/CNPJ repetido; unifique-os antes de migrar: " + ", ".join(duplicados)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_cliente_ativo_etiqueta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='documento',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.RunPython(preparar_documento, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cliente',
+            name='documento',
+            field=models.CharField(blank=True, editable=False, max_length=14, null=True, unique=True),
+        ),
+    ]
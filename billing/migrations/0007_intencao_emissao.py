@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_cliente_documento_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntencaoEmissao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seu_numero', models.CharField(max_length=20, unique=True)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('confirmada', 'Confirmada'), ('falhou', 'Falhou'), ('descartada', 'Descartada')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveIntegerField(default=1)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('boleto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='intencao', to='billing.boleto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'atualizado_em'], name='billing_int_status_dfdec7_idx')],
+            },
+        ),
+    ]
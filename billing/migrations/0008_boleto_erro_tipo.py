@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_intencao_emissao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleto',
+            name='erro_status_http',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='boleto',
+            name='erro_tipo',
+            field=models.CharField(blank=True, choices=[('validacao', 'Validação'), ('autenticacao', 'Autenticação'), ('cota', 'Cota excedida'), ('transitorio', 'Transitório'), ('rejeicao', 'Rejeitado pelo banco')], max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='boleto',
+            index=models.Index(fields=['status', 'erro_tipo'], name='billing_bol_status_364e87_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_boleto_erro_tipo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContaInter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('conta_corrente', models.CharField(max_length=20, unique=True, verbose_name='Conta corrente')),
+                ('client_id', models.CharField(max_length=100, verbose_name='Client ID')),
+                ('client_secret', models.CharField(max_length=200, verbose_name='Client secret')),
+                ('cert_path', models.CharField(help_text='Caminho absoluto ou relativo a config/inter/', max_length=255, verbose_name='Certificado')),
+                ('key_path', models.CharField(help_text='Caminho absoluto ou relativo a config/inter/', max_length=255, verbose_name='Chave')),
+                ('limite_por_minuto', models.PositiveIntegerField(default=100, help_text='0 = sem limite', verbose_name='Limite de requisições por minuto')),
+                ('ativa', models.BooleanField(default=True, verbose_name='Ativa')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='conta',
+            field=models.ForeignKey(blank=True, help_text='Vazio = conta padrão do .env', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', to='billing.containter', verbose_name='Conta Inter'),
+        ),
+    ]
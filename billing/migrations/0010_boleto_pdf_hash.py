@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0009_conta_inter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleto',
+            name='pdf_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def popular_ultimo_pagamento(apps, schema_editor):
+    Cliente = apps.get_model("billing", "Cliente")
+    Boleto = apps.get_model("billing", "Boleto")
+    ultimo = (
+        Boleto.objects.filter(cliente=OuterRef("pk"), status="pago")
+        .values("cliente")
+        .annotate(ultimo=Max("data_pagamento"))
+        .values("ultimo")[:1]
+    )
+    Cliente.objects.update(ultimo_pagamento=Subquery(ultimo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_boleto_pdf_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='ultimo_pagamento',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Último pagamento'),
+        ),
+        migrations.RunPython(popular_ultimo_pagamento, migrations.RunPython.noop),
+    ]
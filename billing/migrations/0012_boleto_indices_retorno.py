@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0011_cliente_ultimo_pagamento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='boleto',
+            index=models.Index(fields=['nosso_numero'], name='billing_bol_nosso_n_9298b7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='boleto',
+            index=models.Index(fields=['linha_digitavel'], name='billing_bol_linha_d_52d00a_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import datetime as dt
+
+from django.db import migrations, models
+
+
+def marcar_vencidos(apps, schema_editor):
+    Boleto = apps.get_model("billing", "Boleto")
+    Boleto.objects.filter(status="emitido", data_vencimento__lt=dt.date.today()).update(vencido=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0012_boleto_indices_retorno'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleto',
+            name='vencido',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Vencido'),
+        ),
+        migrations.AddIndex(
+            model_name='boleto',
+            index=models.Index(fields=['status', 'data_vencimento'], name='billing_bol_status_79de91_idx'),
+        ),
+        migrations.RunPython(marcar_vencidos, migrations.RunPython.noop),
+    ]
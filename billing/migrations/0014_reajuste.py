@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0013_boleto_vencido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reajuste',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=100, verbose_name='Descrição')),
+                ('fator', models.DecimalField(decimal_places=8, max_digits=12, verbose_name='Fator aplicado')),
+                ('filtro', models.TextField(blank=True, verbose_name='Clientes selecionados')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Clientes reajustados')),
+                ('total_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Total anterior')),
+                ('total_novo', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Total novo')),
+                ('boletos_atualizados', models.PositiveIntegerField(default=0, verbose_name='Boletos atualizados')),
+                ('criado_por', models.CharField(blank=True, max_length=150, verbose_name='Aplicado por')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReajusteItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor_anterior', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_novo', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('cliente', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reajustes', to='billing.cliente')),
+                ('reajuste', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='billing.reajuste')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0014_reajuste'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario', models.EmailField(max_length=254, verbose_name='Destinatário')),
+                ('dominio', models.CharField(editable=False, max_length=254)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('falhou', 'Falhou'), ('descartado', 'Descartado')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('lote', models.CharField(blank=True, editable=False, max_length=32)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('boleto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='envio_email', to='billing.boleto')),
+            ],
+            options={
+                'verbose_name': 'Envio de e-mail',
+                'verbose_name_plural': 'Envios de e-mail',
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='billing_env_status_7a4afd_idx'), models.Index(fields=['lote'], name='billing_env_lote_936f29_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0015_envio_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleto',
+            name='reservado_ate',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='boleto',
+            name='reservado_por',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='boleto',
+            index=models.Index(fields=['status', 'reservado_ate'], name='billing_bol_status_4dc483_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0016_reserva_boleto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('descricao', models.CharField(max_length=150, verbose_name='Descrição')),
+                ('status', models.CharField(choices=[('rodando', 'Rodando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='rodando', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processados', models.PositiveIntegerField(default=0)),
+                ('falhas', models.PositiveIntegerField(default=0)),
+                ('vazao', models.FloatField(default=0, verbose_name='Itens por segundo')),
+                ('mensagens', models.JSONField(blank=True, default=list)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_por', models.CharField(blank=True, max_length=150)),
+                ('iniciada_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizada_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finalizada_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def separar_transitorios(apps, schema_editor):
+    # "transitorio" e "cota" misturavam falhas em que a cobrança não saiu com
+    # respostas que não dizem se o banco a registrou. Só as descartadas por
+    # recuperar_emissoes (consultadas e não encontradas) são seguras para reenviar;
+    # as demais voltam a pendente para serem consultadas pelo seuNumero.
+    Boleto = apps.get_model('billing', 'Boleto')
+    IntencaoEmissao = apps.get_model('billing', 'IntencaoEmissao')
+    antigos = Boleto.objects.filter(erro_tipo__in=['transitorio', 'cota'])
+    antigos.filter(intencao__status='descartada').update(erro_tipo='rejeitado_transitorio')
+    IntencaoEmissao.objects.filter(
+        boleto__erro_tipo__in=['transitorio', 'cota'], status='falhou'
+    ).update(status='pendente')
+    antigos.update(erro_tipo='resultado_incerto')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0017_tarefa'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='boleto',
+            name='erro_tipo',
+            field=models.CharField(blank=True, choices=[('validacao', 'Validação'), ('autenticacao', 'Autenticação'), ('rejeitado_transitorio', 'Não enviado (pode reenviar)'), ('resultado_incerto', 'Resultado incerto (consultar no banco)'), ('rejeicao', 'Rejeitado pelo banco')], max_length=24),
+        ),
+        migrations.RunPython(separar_transitorios, migrations.RunPython.noop),
+    ]
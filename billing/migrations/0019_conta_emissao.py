@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery
+
+
+def preencher_conta(apps, schema_editor):
+    # Sem histórico da conta usada, a melhor aproximação para o que já foi emitido é
+    # a conta atual do cliente.
+    Boleto = apps.get_model('billing', 'Boleto')
+    Cliente = apps.get_model('billing', 'Cliente')
+    IntencaoEmissao = apps.get_model('billing', 'IntencaoEmissao')
+    conta_do_cliente = Subquery(Cliente.objects.filter(pk=OuterRef('cliente_id')).values('conta_id')[:1])
+    Boleto.objects.filter(~Q(nosso_numero='') | ~Q(codigo_solicitacao='')).update(conta_id=conta_do_cliente)
+    IntencaoEmissao.objects.update(
+        conta_id=Subquery(
+            Boleto.objects.filter(pk=OuterRef('boleto_id')).values('cliente__conta_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0018_erro_tipo_incerto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleto',
+            name='conta',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='boletos', to='billing.containter', verbose_name='Conta Inter da emissão'),
+        ),
+        migrations.AddField(
+            model_name='intencaoemissao',
+            name='conta',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='intencoes', to='billing.containter'),
+        ),
+        migrations.RunPython(preencher_conta, migrations.RunPython.noop),
+    ]
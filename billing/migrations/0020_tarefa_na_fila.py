@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0019_conta_emissao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='parametros',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='tarefa',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Na fila'), ('rodando', 'Rodando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=10),
+        ),
+    ]
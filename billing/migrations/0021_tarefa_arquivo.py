@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0020_tarefa_na_fila'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='arquivo',
+            field=models.FileField(blank=True, upload_to='tarefas/'),
+        ),
+    ]
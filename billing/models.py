@@ -1,5 +1,10 @@
+import hashlib
 
+from django.core.files.base import ContentFile
 from django.db import models
+from django.utils import timezone
+
+from .utils import normalizar_texto, somente_digitos
 
 UF_CHOICES = [
     ('AC','AC'),('AL','AL'),('AP','AP'),('AM','AM'),('BA','BA'),('CE','CE'),
@@ -9,6 +14,27 @@ UF_CHOICES = [
     ('SP','SP'),('SE','SE'),('TO','TO'),
 ]
 
+class ContaInter(models.Model):
+    """Conta corrente no Inter com credenciais próprias (cobrança em nome de outra empresa).
+
+    Clientes sem conta usam as credenciais do ``.env``.
+    """
+
+    nome = models.CharField('Nome', max_length=100)
+    conta_corrente = models.CharField('Conta corrente', max_length=20, unique=True)
+    client_id = models.CharField('Client ID', max_length=100)
+    client_secret = models.CharField('Client secret', max_length=200)
+    cert_path = models.CharField('Certificado', max_length=255, help_text='Caminho absoluto ou relativo a config/inter/')
+    key_path = models.CharField('Chave', max_length=255, help_text='Caminho absoluto ou relativo a config/inter/')
+    limite_por_minuto = models.PositiveIntegerField(
+        'Limite de requisições por minuto', default=100, help_text='0 = sem limite'
+    )
+    ativa = models.BooleanField('Ativa', default=True)
+
+    def __str__(self):
+        return f"{self.nome} ({self.conta_corrente})"
+
+
 class Cliente(models.Model):
     valorNominal = models.DecimalField('Valor nominal', max_digits=12, decimal_places=2)
     dataVencimento = models.PositiveSmallIntegerField('Dia do vencimento (1..31)')
@@ -24,6 +50,36 @@ class Cliente(models.Model):
     cidade = models.CharField('Cidade', max_length=100, blank=True)
     uf = models.CharField('UF', max_length=2, choices=UF_CHOICES, blank=True)
     cep = models.CharField('CEP', max_length=9, blank=True)
+    ativo = models.BooleanField('Ativo', default=True, db_index=True)
+    etiqueta = models.CharField('Etiqueta', max_length=50, blank=True, db_index=True)
+    conta = models.ForeignKey(
+        ContaInter, on_delete=models.PROTECT, related_name='clientes', blank=True, null=True,
+        verbose_name='Conta Inter', help_text='Vazio = conta padrão do .env',
+    )
+
+    # Colunas derivadas para busca por prefixo (preenchidas em save()).
+    busca = models.CharField(max_length=200, blank=True, editable=False, db_index=True)
+    documento = models.CharField(max_length=14, blank=True, null=True, editable=False, unique=True)
+    # Mantido por ``registrar_transicoes`` junto com ``ResumoCliente`` (ver resumo_service).
+    ultimo_pagamento = models.DateField('Último pagamento', blank=True, null=True, editable=False)
+
+    def atualizar_campos_busca(self):
+        self.busca = normalizar_texto(self.nome)[:200]
+        self.documento = somente_digitos(self.cpfCnpj)[:14] or None
+
+    def save(self, *args, **kwargs):
+        self.atualizar_campos_busca()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"nome", "cpfCnpj"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"busca", "documento"}
+        elif update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            # Um cadastro aberto antes de um pagamento não pode sobrescrever ``ultimo_pagamento``.
+            kwargs["update_fields"] = [
+                campo.name
+                for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != "ultimo_pagamento"
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nome} ({self.cpfCnpj})"
@@ -47,15 +103,255 @@ class Boleto(models.Model):
     codigo_barras = models.CharField(max_length=100, blank=True)
     tx_id = models.CharField(max_length=100, blank=True)
     codigo_solicitacao = models.CharField(max_length=100, blank=True)
+    # Conta que emitiu a cobrança (vazio = conta padrão do .env). Cancelamento, PDF e
+    # consultas usam esta, não a conta atual do cliente, que pode ter mudado.
+    conta = models.ForeignKey(
+        ContaInter, on_delete=models.PROTECT, related_name='boletos', blank=True, null=True,
+        editable=False, verbose_name='Conta Inter da emissão',
+    )
+    ERRO_TIPO_CHOICES = [
+        ('validacao', 'Validação'),
+        ('autenticacao', 'Autenticação'),
+        ('rejeitado_transitorio', 'Não enviado (pode reenviar)'),
+        ('resultado_incerto', 'Resultado incerto (consultar no banco)'),
+        ('rejeicao', 'Rejeitado pelo banco'),
+    ]
+    # Tipos de erro em que o banco certamente não registrou a cobrança e reenviar o
+    # mesmo boleto pode dar certo. ``resultado_incerto`` (timeout, 408, 429, 5xx) fica
+    # de fora: só ``recuperar_emissoes``, consultando pelo seuNumero, o resolve.
+    ERROS_RETENTAVEIS = ('autenticacao', 'rejeitado_transitorio')
+
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='novo')
     erro_msg = models.TextField(blank=True)
+    erro_tipo = models.CharField(max_length=24, choices=ERRO_TIPO_CHOICES, blank=True)
+    erro_status_http = models.PositiveSmallIntegerField(blank=True, null=True)
     pdf = models.FileField(upload_to='boletos/', blank=True, null=True)
+    # SHA-256 do PDF guardado; vira o ETag do download (vazio = calcular na próxima leitura).
+    pdf_hash = models.CharField(max_length=64, blank=True, editable=False)
     data_pagamento = models.DateField(blank=True, null=True)
+    # Marcado pela varredura noturna (manage.py marcar_vencidos) quando passa do vencimento em aberto.
+    vencido = models.BooleanField('Vencido', default=False, editable=False)
+    # Reserva (lease) do worker que está processando o boleto (ver reserva_service).
+    reservado_por = models.CharField(max_length=64, blank=True, editable=False)
+    reservado_ate = models.DateTimeField(blank=True, null=True, editable=False)
 
     criado_em = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('cliente', 'competencia_ano', 'competencia_mes')
+        indexes = [
+            models.Index(fields=['status', 'erro_tipo']),
+            models.Index(fields=['status', 'data_vencimento']),
+            models.Index(fields=['status', 'reservado_ate']),
+            # Conciliação dos arquivos de retorno (ver retorno_service).
+            models.Index(fields=['nosso_numero']),
+            models.Index(fields=['linha_digitavel']),
+        ]
 
     def __str__(self):
         return f"Boleto {self.id} - {self.cliente.nome} {self.competencia_mes:02d}/{self.competencia_ano}"
+
+    def guardar_pdf(self, nome: str, conteudo: bytes, *, gravar: bool = True) -> None:
+        """Grava o arquivo e o hash; ``gravar=False`` deixa o UPDATE para um ``bulk_update``."""
+        self.pdf.save(nome, ContentFile(conteudo), save=False)
+        self.pdf_hash = hashlib.sha256(conteudo).hexdigest()
+        if gravar:
+            self.save(update_fields=['pdf', 'pdf_hash'])
+
+    def calcular_pdf_hash(self) -> str:
+        """Calcula (lendo o arquivo em blocos) e grava o hash de um PDF sem ``pdf_hash``."""
+        digest = hashlib.sha256()
+        with self.pdf.open('rb') as arquivo:
+            for bloco in arquivo.chunks():
+                digest.update(bloco)
+        self.pdf_hash = digest.hexdigest()
+        Boleto.objects.filter(pk=self.pk).update(pdf_hash=self.pdf_hash)
+        return self.pdf_hash
+
+
+class ResumoRecebiveis(models.Model):
+    """Rollup de boletos por competência, vencimento, UF e status.
+
+    Mantido incrementalmente pelos sinais de ``Boleto`` (ver ``billing/signals.py``)
+    e reconstruído por completo com ``manage.py reconstruir_resumo``.
+    """
+
+    competencia_ano = models.PositiveSmallIntegerField()
+    competencia_mes = models.PositiveSmallIntegerField()
+    data_vencimento = models.DateField()
+    uf = models.CharField(max_length=2, blank=True)
+    status = models.CharField(max_length=10, choices=Boleto.STATUS_CHOICES)
+    quantidade = models.IntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('competencia_ano', 'competencia_mes', 'data_vencimento', 'uf', 'status')
+        indexes = [
+            models.Index(fields=['status', 'data_vencimento']),
+        ]
+
+    def __str__(self):
+        return f"{self.competencia_mes:02d}/{self.competencia_ano} {self.uf or '--'} {self.status}: {self.quantidade}"
+
+
+class ResumoCliente(models.Model):
+    """Rollup de boletos por cliente e status, mantido junto com ``ResumoRecebiveis``."""
+
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='resumos')
+    status = models.CharField(max_length=10, choices=Boleto.STATUS_CHOICES)
+    quantidade = models.IntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('cliente', 'status')
+
+    def __str__(self):
+        return f"{self.cliente_id} {self.status}: {self.quantidade}"
+
+
+class IntencaoEmissao(models.Model):
+    """Registro gravado *antes* de chamar o banco para emitir um boleto.
+
+    Se o processo morrer entre o POST no Inter e a gravação do resultado, a
+    intenção fica ``pendente`` e ``manage.py recuperar_emissoes`` consulta o Inter
+    pelo ``seu_numero`` em vez de emitir de novo.
+    """
+
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('confirmada', 'Confirmada'),
+        ('falhou', 'Falhou'),
+        ('descartada', 'Descartada'),
+    ]
+    boleto = models.OneToOneField(Boleto, on_delete=models.CASCADE, related_name='intencao')
+    # Conta para a qual o POST foi (ou será) enviado: é nela que a recuperação consulta.
+    conta = models.ForeignKey(
+        ContaInter, on_delete=models.PROTECT, related_name='intencoes', blank=True, null=True, editable=False,
+    )
+    seu_numero = models.CharField(max_length=20, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField(default=1)
+    ultimo_erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'atualizado_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.seu_numero} ({self.status})"
+
+
+class EnvioEmail(models.Model):
+    """Outbox do envio do boleto (PDF e linha digitável) ao e-mail do cliente.
+
+    Gravado ao enfileirar e processado por ``manage.py enviar_boletos`` (ver
+    email_service); falhas transitórias voltam para ``pendente`` com nova
+    ``proxima_tentativa``.
+    """
+
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('falhou', 'Falhou'),
+        ('descartado', 'Descartado'),
+    ]
+    boleto = models.OneToOneField(Boleto, on_delete=models.CASCADE, related_name='envio_email')
+    destinatario = models.EmailField('Destinatário')
+    dominio = models.CharField(max_length=254, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    # Marca do worker que reservou o envio (vazio fora de ``enviando``).
+    lote = models.CharField(max_length=32, blank=True, editable=False)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa']),
+            models.Index(fields=['lote']),
+        ]
+        verbose_name = 'Envio de e-mail'
+        verbose_name_plural = 'Envios de e-mail'
+
+    def save(self, *args, **kwargs):
+        self.dominio = self.destinatario.rsplit('@', 1)[-1].lower()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.destinatario} ({self.status})"
+
+
+class Reajuste(models.Model):
+    """Registro de um reajuste em massa de ``Cliente.valorNominal`` (ver reajuste_service)."""
+
+    descricao = models.CharField('Descrição', max_length=100)
+    fator = models.DecimalField('Fator aplicado', max_digits=12, decimal_places=8)
+    filtro = models.TextField('Clientes selecionados', blank=True)
+    quantidade = models.PositiveIntegerField('Clientes reajustados', default=0)
+    total_anterior = models.DecimalField('Total anterior', max_digits=16, decimal_places=2, default=0)
+    total_novo = models.DecimalField('Total novo', max_digits=16, decimal_places=2, default=0)
+    boletos_atualizados = models.PositiveIntegerField('Boletos atualizados', default=0)
+    criado_por = models.CharField('Aplicado por', max_length=150, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.descricao} ({self.quantidade} clientes)"
+
+
+class ReajusteItem(models.Model):
+    reajuste = models.ForeignKey(Reajuste, on_delete=models.CASCADE, related_name='itens')
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, related_name='reajustes')
+    valor_anterior = models.DecimalField(max_digits=12, decimal_places=2)
+    valor_novo = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.cliente_id}: {self.valor_anterior} -> {self.valor_novo}"
+
+
+class Tarefa(models.Model):
+    """Processamento em lote disparado pela interface (ver progresso_service).
+
+    A view só grava a tarefa ``pendente`` com seus ``parametros``; quem a executa é o
+    worker ``processar_fila tarefas``, fora do processo web. ``atualizada_em`` só muda
+    quando o lote avança: uma tarefa ``rodando`` que não é atualizada há muito tempo
+    está parada (banco lento ou processo interrompido).
+    """
+
+    STATUS_CHOICES = [
+        ('pendente', 'Na fila'),
+        ('rodando', 'Rodando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+    tipo = models.CharField(max_length=20)
+    descricao = models.CharField('Descrição', max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    # Argumentos (JSON) do executor de ``tipo``; ver reserva_service.EXECUTORES.
+    parametros = models.JSONField(default=dict, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processados = models.PositiveIntegerField(default=0)
+    falhas = models.PositiveIntegerField(default=0)
+    vazao = models.FloatField('Itens por segundo', default=0)
+    # [nível, texto] dos avisos por item, limitados a progresso_service.LIMITE_MENSAGENS.
+    mensagens = models.JSONField(default=list, blank=True)
+    erro = models.TextField(blank=True)
+    # Resultado para download (PDF único), apagado por progresso_service.expurgar_arquivos.
+    arquivo = models.FileField(upload_to='tarefas/', blank=True)
+    criado_por = models.CharField(max_length=150, blank=True)
+    iniciada_em = models.DateTimeField(auto_now_add=True)
+    atualizada_em = models.DateTimeField(default=timezone.now)
+    finalizada_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-iniciada_em']
+
+    def __str__(self):
+        return f"{self.descricao} ({self.processados}/{self.total})"
@@ -0,0 +1,75 @@
+import calendar
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.db.models import Exists, OuterRef, Q, QuerySet
+
+from ..models import Boleto, Cliente
+from ..validacao import validar_clientes
+from .emissao_service import EM_DUVIDA, EMITIDO, FALHOU, IGNORADO, criar_boletos, emitir_lote
+
+
+@dataclass
+class RelatorioAgendamento:
+    datas: List[dt.date] = field(default_factory=list)
+    selecionados: int = 0
+    pendencias: Dict[int, List[str]] = field(default_factory=dict)
+    adiados: int = 0
+    contagem: Dict[str, int] = field(
+        default_factory=lambda: {EMITIDO: 0, FALHOU: 0, EM_DUVIDA: 0, IGNORADO: 0}
+    )
+
+
+def clientes_com_vencimento(data: dt.date) -> QuerySet:
+    """Clientes ativos que vencem em ``data`` e ainda não têm boleto nessa competência."""
+    ultimo_dia = calendar.monthrange(data.year, data.month)[1]
+    if data.day == ultimo_dia:
+        # Dia 31 em mês de 30 dias (ou 29..31 em fevereiro) vence no último dia.
+        dia = Q(dataVencimento__gte=data.day)
+    else:
+        dia = Q(dataVencimento=data.day)
+    emitido = Boleto.objects.filter(
+        cliente=OuterRef("pk"), competencia_ano=data.year, competencia_mes=data.month
+    )
+    return Cliente.objects.filter(dia, ativo=True).exclude(Exists(emitido))
+
+
+def emitir_agendados(
+    hoje: dt.date,
+    dias_antecedencia: int,
+    *,
+    limite: Optional[int] = None,
+    workers: Optional[int] = None,
+    simular: bool = False,
+) -> RelatorioAgendamento:
+    """Emite os boletos que vencem entre amanhã e ``hoje + dias_antecedencia``.
+
+    Feito para rodar uma vez por dia: em regime, cada execução só encontra os
+    clientes do último dia da janela, espalhando a emissão pelo mês. Dias perdidos
+    (cron parado) são recuperados na próxima execução, enquanto ainda estiverem na
+    janela. ``limite`` limita os boletos por execução; o excedente, começando pelos
+    vencimentos mais distantes, fica para o dia seguinte.
+    """
+    relatorio = RelatorioAgendamento(
+        datas=[hoje + dt.timedelta(days=n) for n in range(1, dias_antecedencia + 1)]
+    )
+    restante = limite
+    for data in relatorio.datas:
+        clientes = clientes_com_vencimento(data).select_related("conta").order_by("id")
+        validacao = validar_clientes(clientes)
+        relatorio.pendencias.update(validacao.invalidos)
+        aptos = validacao.validos
+        if restante is not None:
+            relatorio.adiados += max(0, aptos - restante)
+            aptos = min(aptos, restante)
+            restante -= aptos
+        relatorio.selecionados += aptos
+        if simular or not aptos:
+            continue
+
+        aptos_clientes = list(clientes.exclude(id__in=list(validacao.invalidos))[:aptos])
+        boletos, _ = criar_boletos(aptos_clientes, data.year, data.month)
+        for _, resultado in emitir_lote(None, boletos, workers=workers):
+            relatorio.contagem[resultado.situacao] += 1
+    return relatorio
@@ -0,0 +1,366 @@
+import atexit
+import contextlib
+import contextvars
+import datetime as dt
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Registros juntados num mesmo membro gzip: quanto maior o lote, melhor a compressão
+# (as chaves se repetem); o intervalo limita quanto fica só em memória.
+REGISTROS_POR_MEMBRO = 200
+INTERVALO_GRAVACAO = 1.0
+# Fila entre o caminho da requisição e a thread de gravação; cheia, o registro é descartado.
+TAMANHO_FILA = 10000
+LIMITE_TEXTO = 4096
+# Campos com segredos ou conteúdo grande que não vão para o arquivo como estão.
+CAMPOS_SEGREDO = frozenset({"client_secret", "access_token", "refresh_token"})
+CAMPOS_ARQUIVO = frozenset({"pdf", "pdfBytes"})
+# Dados pessoais do pagador (no pedido e nas respostas): viram um pseudônimo estável,
+# que ainda permite achar as chamadas de um mesmo pagador sem expor o dado.
+CAMPOS_PESSOAIS = frozenset(
+    {
+        "nome",
+        "cpfCnpj",
+        "endereco",
+        "numero",
+        "complemento",
+        "bairro",
+        "cidade",
+        "cep",
+        "email",
+        "ddd",
+        "telefone",
+        "nomePagador",
+        "cpfCnpjPagador",
+    }
+)
+CABECALHOS_GRAVADOS = ("x-conta-corrente", "content-type")
+
+_boleto_atual: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("boleto_atual", default=None)
+
+
+@contextlib.contextmanager
+def referente_a(boleto_id: Optional[int]):
+    """Associa as chamadas ao Inter feitas dentro do bloco ao boleto (para o índice)."""
+    token = _boleto_atual.set(boleto_id)
+    try:
+        yield
+    finally:
+        _boleto_atual.reset(token)
+
+
+def _resumir_arquivo(valor: Any) -> Dict[str, Any]:
+    bruto = valor.encode() if isinstance(valor, str) else bytes(valor or b"")
+    return {"omitido": "arquivo", "tamanho": len(bruto), "sha256": hashlib.sha256(bruto).hexdigest()}
+
+
+def pseudonimo(valor: Any) -> Any:
+    """HMAC (com a SECRET_KEY) do dado pessoal; vazio continua vazio.
+
+    Um hash simples de um CPF seria revertido por força bruta: sem a chave, não.
+    """
+    if valor is None or valor == "":
+        return valor
+    assinatura = hmac.new(settings.SECRET_KEY.encode(), str(valor).encode(), hashlib.sha256).hexdigest()
+    return f"pii:{assinatura[:16]}"
+
+
+def _limpar_campo(chave: str, valor: Any) -> Any:
+    if chave in CAMPOS_SEGREDO:
+        return "***"
+    if chave in CAMPOS_ARQUIVO:
+        return _resumir_arquivo(valor)
+    if chave in CAMPOS_PESSOAIS and not isinstance(valor, (dict, list)):
+        return pseudonimo(valor)
+    return _limpar(valor)
+
+
+def _limpar(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        limpo = {chave: _limpar_campo(chave, item) for chave, item in valor.items()}
+        # Violação de validação do Inter: {"propriedade": "pagador.cpfCnpj", "valor": "..."}.
+        if str(valor.get("propriedade", "")).rpartition(".")[2] in CAMPOS_PESSOAIS and "valor" in limpo:
+            limpo["valor"] = pseudonimo(valor["valor"])
+        return limpo
+    if isinstance(valor, list):
+        return [_limpar(item) for item in valor]
+    return valor
+
+
+def _corpo(conteudo: Optional[bytes], tipo: str) -> Any:
+    """Resposta como JSON (sem segredos nem PDFs em base64) ou texto limitado."""
+    if not conteudo:
+        return None
+    if "json" in tipo:
+        try:
+            return _limpar(json.loads(conteudo))
+        except ValueError:
+            pass
+    if "pdf" in tipo or conteudo[:4] == b"%PDF":
+        return _resumir_arquivo(conteudo)
+    texto = conteudo.decode("utf-8", "replace")
+    return texto if len(texto) <= LIMITE_TEXTO else texto[:LIMITE_TEXTO] + "…"
+
+
+def _montar_registro(bruto: Dict[str, Any]) -> Dict[str, Any]:
+    # Roda na thread de gravação: a requisição só enfileirou os valores crus.
+    requisicao = bruto.pop("requisicao")
+    resposta = bruto.pop("resposta", None)
+    cabecalhos = {k.lower(): v for k, v in (requisicao.get("headers") or {}).items()}
+    registro = dict(bruto)
+    registro["requisicao"] = {
+        "headers": {k: cabecalhos[k] for k in CABECALHOS_GRAVADOS if k in cabecalhos},
+        "json": _limpar(requisicao.get("json")),
+        "data": _limpar(requisicao.get("data")),
+        "params": _limpar(requisicao.get("params")),
+    }
+    if resposta is not None:
+        status, tipo, conteudo = resposta
+        registro["resposta"] = {"status": status, "content_type": tipo, "corpo": _corpo(conteudo, tipo)}
+    return registro
+
+
+@dataclass
+class _Pendentes:
+    registros: List[bytes] = field(default_factory=list)
+    boletos: List[int] = field(default_factory=list)
+
+
+class ArquivoChamadas:
+    """Arquivo append-only das chamadas ao Inter: um ``.jsonl.gz`` por dia (UTC).
+
+    ``registrar`` só coloca os valores numa fila; uma thread monta os registros e
+    grava cada lote como um membro gzip independente (a concatenação continua um
+    gzip válido, legível por ``zcat``). O ``.idx`` do dia guarda ``boleto_id offset``
+    do membro onde estão as chamadas do boleto. Vários processos podem gravar no
+    mesmo dia: cada membro e cada linha do índice vão num único ``write`` em modo
+    ``O_APPEND``. Com ``dias``, a cada dia novo os arquivos mais antigos que isso
+    são apagados.
+    """
+
+    def __init__(self, diretorio: Path, dias: int = 0) -> None:
+        self.diretorio = Path(diretorio)
+        self.dias = dias
+        self.descartados = 0
+        self._expurgado_em: Optional[str] = None
+        self._fila: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(TAMANHO_FILA)
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def registrar(self, registro: Dict[str, Any]) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            self._iniciar()
+        try:
+            self._fila.put_nowait(registro)
+        except queue.Full:
+            self.descartados += 1
+
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processo filho (fork do gunicorn): a thread e a fila do pai não vieram junto.
+                self._pid = os.getpid()
+                self._fila = queue.Queue(TAMANHO_FILA)
+                self._thread = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._rodar, name="arquivo-inter", daemon=True)
+                self._thread.start()
+                atexit.register(self.fechar)
+
+    def fechar(self) -> None:
+        """Grava o que estiver na fila e para a thread (chamado também na saída do processo)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join(timeout=10)
+
+    def _rodar(self) -> None:
+        pendentes: Dict[str, _Pendentes] = {}
+        limite = time.monotonic() + INTERVALO_GRAVACAO
+        while True:
+            try:
+                bruto = self._fila.get(timeout=max(limite - time.monotonic(), 0.01))
+            except queue.Empty:
+                bruto = {}
+            if bruto is None:
+                self._gravar(pendentes)
+                return
+            if bruto:
+                try:
+                    registro = _montar_registro(bruto)
+                    dia = registro["em"][:10]
+                    lote = pendentes.setdefault(dia, _Pendentes())
+                    lote.registros.append(json.dumps(registro, ensure_ascii=False, default=str).encode() + b"\n")
+                    if registro.get("boleto_id"):
+                        lote.boletos.append(registro["boleto_id"])
+                except Exception:  # noqa: BLE001 - o arquivo nunca derruba a emissão
+                    logger.exception("Registro de chamada ao Inter descartado.")
+            if time.monotonic() >= limite or sum(len(p.registros) for p in pendentes.values()) >= REGISTROS_POR_MEMBRO:
+                self._gravar(pendentes)
+                pendentes = {}
+                limite = time.monotonic() + INTERVALO_GRAVACAO
+
+    def _gravar(self, pendentes: Dict[str, _Pendentes]) -> None:
+        hoje = dt.date.today().isoformat()
+        if self.dias and self._expurgado_em != hoje:
+            self._expurgado_em = hoje
+            try:
+                expurgar_arquivo(self.dias, diretorio=self.diretorio)
+            except OSError:
+                logger.exception("Falha ao expurgar o arquivo de chamadas ao Inter.")
+        for dia, lote in pendentes.items():
+            if not lote.registros:
+                continue
+            try:
+                self.diretorio.mkdir(parents=True, exist_ok=True)
+                membro = gzip.compress(b"".join(lote.registros), compresslevel=6)
+                offset = _anexar(self.diretorio / f"inter-{dia}.jsonl.gz", membro)
+                if lote.boletos:
+                    indice = "".join(f"{boleto_id} {offset}\n" for boleto_id in dict.fromkeys(lote.boletos))
+                    _anexar(self.diretorio / f"inter-{dia}.idx", indice.encode())
+            except OSError:
+                logger.exception("Falha ao gravar o arquivo de chamadas ao Inter (%s).", dia)
+
+
+def _anexar(caminho: Path, dados: bytes) -> int:
+    """Anexa ``dados`` num único write e retorna o offset em que começaram."""
+    fd = os.open(caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+    try:
+        escritos = os.write(fd, dados)
+        inicio = os.lseek(fd, 0, os.SEEK_CUR) - escritos
+        while escritos < len(dados):  # write parcial (raro em arquivo local)
+            escritos += os.write(fd, dados[escritos:])
+    finally:
+        os.close(fd)
+    return inicio
+
+
+_arquivo: Optional[ArquivoChamadas] = None
+
+
+def arquivo() -> Optional[ArquivoChamadas]:
+    global _arquivo
+    if not settings.INTER_ARQUIVO:
+        return None
+    if _arquivo is None:
+        _arquivo = ArquivoChamadas(Path(settings.INTER_ARQUIVO_DIR), settings.INTER_ARQUIVO_DIAS)
+    return _arquivo
+
+
+def registrar_chamada(
+    *,
+    conta_corrente: str,
+    familia: str,
+    metodo: str,
+    url: str,
+    kwargs: Dict[str, Any],
+    inicio: float,
+    response=None,
+    erro: Optional[BaseException] = None,
+) -> None:
+    """Enfileira a chamada (requisição e resposta crus); o resto é feito fora do caminho da requisição."""
+    destino = arquivo()
+    if destino is None:
+        return
+    registro: Dict[str, Any] = {
+        "em": dt.datetime.now(dt.timezone.utc).isoformat(timespec="milliseconds"),
+        "ms": round((time.monotonic() - inicio) * 1000, 1),
+        "boleto_id": _boleto_atual.get(),
+        "conta": conta_corrente,
+        "familia": familia,
+        "metodo": metodo,
+        "url": url,
+        "requisicao": {k: kwargs.get(k) for k in ("headers", "json", "data", "params")},
+    }
+    if response is not None:
+        registro["resposta"] = (response.status_code, response.headers.get("Content-Type", ""), response.content)
+    if erro is not None:
+        registro["erro"] = f"{erro.__class__.__name__}: {erro}"
+    destino.registrar(registro)
+
+
+def _dia_do_arquivo(caminho: Path) -> dt.date:
+    return dt.date.fromisoformat(caminho.name[len("inter-"):len("inter-AAAA-MM-DD")])
+
+
+def arquivos_do_periodo(de: Optional[dt.date] = None, ate: Optional[dt.date] = None) -> List[Path]:
+    diretorio = Path(settings.INTER_ARQUIVO_DIR)
+    caminhos = []
+    for caminho in sorted(diretorio.glob("inter-*.jsonl.gz")):
+        dia = _dia_do_arquivo(caminho)
+        if (de is None or dia >= de) and (ate is None or dia <= ate):
+            caminhos.append(caminho)
+    return caminhos
+
+
+def expurgar_arquivo(dias: int, *, diretorio: Optional[Path] = None, hoje: Optional[dt.date] = None) -> int:
+    """Apaga os ``.jsonl.gz``/``.idx`` de dias anteriores aos últimos ``dias``. Retorna quantos arquivos."""
+    diretorio = Path(settings.INTER_ARQUIVO_DIR if diretorio is None else diretorio)
+    corte = (hoje or dt.date.today()) - dt.timedelta(days=dias)
+    apagados = 0
+    for caminho in sorted(diretorio.glob("inter-*.*")):
+        try:
+            dia = _dia_do_arquivo(caminho)
+        except ValueError:
+            continue
+        if dia < corte:
+            # Outro processo pode ter apagado o mesmo arquivo primeiro.
+            caminho.unlink(missing_ok=True)
+            apagados += 1
+    return apagados
+
+
+def ler_registros(caminhos: List[Path]) -> Iterator[Dict[str, Any]]:
+    for caminho in caminhos:
+        with gzip.open(caminho, "rt", encoding="utf-8") as stream:
+            for linha in stream:
+                if linha.strip():
+                    yield json.loads(linha)
+
+
+def _ler_membro(caminho: Path, offset: int) -> bytes:
+    descompressor = zlib.decompressobj(wbits=31)
+    partes = []
+    with open(caminho, "rb") as stream:
+        stream.seek(offset)
+        while not descompressor.eof:
+            bloco = stream.read(64 * 1024)
+            if not bloco:
+                break
+            partes.append(descompressor.decompress(bloco))
+    return b"".join(partes)
+
+
+def chamadas_do_boleto(boleto_id: int) -> List[Dict[str, Any]]:
+    """Chamadas de um boleto pelo índice: só os membros gzip que o contêm são lidos."""
+    alvo = str(boleto_id)
+    registros = []
+    for indice in sorted(Path(settings.INTER_ARQUIVO_DIR).glob("inter-*.idx")):
+        offsets = []
+        with open(indice, encoding="ascii") as stream:
+            for linha in stream:
+                chave, _, offset = linha.partition(" ")
+                if chave == alvo:
+                    offsets.append(int(offset))
+        dados = indice.with_suffix(".jsonl.gz")
+        for offset in dict.fromkeys(offsets):
+            for linha in _ler_membro(dados, offset).splitlines():
+                registro = json.loads(linha)
+                if registro.get("boleto_id") == boleto_id:
+                    registros.append(registro)
+    return registros
@@ -0,0 +1,152 @@
+import datetime as dt
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Func, IntegerField, Sum, Value, When
+
+from inter_api.payload import MORA_PADRAO, MULTA_PADRAO
+
+from ..models import Boleto
+
+ZERO = Decimal("0.00")
+CENTAVO = Decimal("0.01")
+# Limite superior (em dias de atraso) de cada faixa; a última é aberta.
+FAIXAS: Tuple[Tuple[str, Optional[int]], ...] = (
+    ("0-30", 30),
+    ("31-60", 60),
+    ("61-90", 90),
+    ("90+", None),
+)
+
+
+class DiasDesde(Func):
+    """Dias corridos de ``expressao`` (uma data) até ``data``, calculados no banco."""
+
+    output_field = IntegerField()
+    template = "(%(expressions)s)"
+    arg_joiner = " - "  # PostgreSQL: date - date já é inteiro
+
+    def __init__(self, expressao, data: dt.date):
+        super().__init__(Value(data), expressao)
+
+    def as_sqlite(self, compiler, connection, **extra):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra,
+        )
+
+    def as_mysql(self, compiler, connection, **extra):
+        return self.as_sql(compiler, connection, template="DATEDIFF(%(expressions)s)", arg_joiner=", ", **extra)
+
+
+def marcar_vencidos(hoje: Optional[dt.date] = None) -> Tuple[int, int]:
+    """Marca os boletos em aberto que passaram do vencimento. Retorna ``(marcados, desmarcados)``.
+
+    Um UPDATE pelo índice ``(status, data_vencimento)``; ``vencido`` não entra no
+    rollup, então não há transições a registrar. São desmarcados os boletos que
+    voltaram a vencer no futuro (vencimento alterado) e os que saíram de ``emitido``
+    (pagos, cancelados) depois de marcados.
+    """
+    hoje = hoje or dt.date.today()
+    em_aberto = Boleto.objects.filter(status="emitido")
+    marcados = em_aberto.filter(data_vencimento__lt=hoje, vencido=False).update(vencido=True)
+    desmarcados = em_aberto.filter(data_vencimento__gte=hoje, vencido=True).update(vencido=False)
+    # status__in em vez de exclude: a consulta continua usando o índice por status.
+    fechados = [status for status, _ in Boleto.STATUS_CHOICES if status != "emitido"]
+    desmarcados += Boleto.objects.filter(status__in=fechados, vencido=True).update(vencido=False)
+    return marcados, desmarcados
+
+
+def _encargos(quantidade: int, valor: Decimal, valor_dias: Decimal) -> Tuple[Decimal, Decimal]:
+    """Multa e mora de um grupo de boletos, nas mesmas regras enviadas na emissão.
+
+    Multa ``VALORFIXO`` soma o valor fixo por boleto (``PERCENTUAL`` aplica sobre o
+    valor); mora ``TAXAMENSAL`` é juro simples pró-rata dia (taxa/30 por dia). As duas
+    são lineares, então bastam ``quantidade``, ``Σ valor`` e ``Σ valor × dias``.
+    """
+    multa_base = Decimal(str(MULTA_PADRAO["valor"]))
+    if MULTA_PADRAO["codigo"] == "PERCENTUAL":
+        multa = valor * multa_base / 100
+    else:
+        multa = multa_base * quantidade
+    mora = valor_dias * Decimal(str(MORA_PADRAO["taxa"])) / 100 / 30
+    return multa.quantize(CENTAVO, ROUND_HALF_UP), mora.quantize(CENTAVO, ROUND_HALF_UP)
+
+
+def _vazio() -> Dict[str, Any]:
+    return {"quantidade": 0, "valor": ZERO, "multa": ZERO, "mora": ZERO, "total": ZERO}
+
+
+def _acumular(destino: Dict[str, Any], origem: Dict[str, Any]) -> None:
+    for chave in ("quantidade", "valor", "multa", "mora", "total"):
+        destino[chave] += origem[chave]
+
+
+def relatorio_atraso(hoje: Optional[dt.date] = None) -> Dict[str, Any]:
+    """Aging dos boletos em aberto vencidos, por cliente e faixa de atraso.
+
+    Tudo sai de uma única consulta agregada: o banco calcula os dias de atraso,
+    classifica na faixa e soma por ``(cliente, faixa)``; aqui só se aplicam as
+    taxas aos totais, sem percorrer boleto a boleto.
+    """
+    hoje = hoje or dt.date.today()
+    dias = DiasDesde(F("data_vencimento"), hoje)
+    faixa = Case(
+        *[When(dias__lte=limite, then=Value(i)) for i, (_, limite) in enumerate(FAIXAS) if limite is not None],
+        default=Value(len(FAIXAS) - 1),
+        output_field=IntegerField(),
+    )
+    grupos = (
+        Boleto.objects.filter(status="emitido", data_vencimento__lt=hoje)
+        .annotate(dias=dias)
+        .annotate(faixa=faixa)
+        .values("cliente_id", "cliente__nome", "cliente__cpfCnpj", "faixa")
+        .annotate(
+            quantidade=Count("id"),
+            principal=Sum("valor"),
+            valor_dias=Sum(
+                ExpressionWrapper(F("valor") * F("dias"), output_field=DecimalField(max_digits=20, decimal_places=2))
+            ),
+        )
+        .order_by()
+    )
+
+    clientes: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+    totais = [_vazio() for _ in FAIXAS]
+    total_geral = _vazio()
+    for grupo in grupos:
+        cliente = clientes.get(grupo["cliente_id"])
+        if cliente is None:
+            cliente = clientes[grupo["cliente_id"]] = {
+                "id": grupo["cliente_id"],
+                "nome": grupo["cliente__nome"],
+                "cpfCnpj": grupo["cliente__cpfCnpj"],
+                "faixas": [_vazio() for _ in FAIXAS],
+                "total": _vazio(),
+            }
+        valor = grupo["principal"] or ZERO
+        multa, mora = _encargos(grupo["quantidade"], valor, Decimal(grupo["valor_dias"] or 0))
+        celula = {
+            "quantidade": grupo["quantidade"],
+            "valor": valor,
+            "multa": multa,
+            "mora": mora,
+            "total": valor + multa + mora,
+        }
+        for destino in (cliente["faixas"][grupo["faixa"]], cliente["total"], totais[grupo["faixa"]], total_geral):
+            _acumular(destino, celula)
+
+    linhas: List[Dict[str, Any]] = sorted(clientes.values(), key=lambda c: c["total"]["total"], reverse=True)
+    return {
+        "hoje": hoje,
+        "faixas": [rotulo for rotulo, _ in FAIXAS],
+        "clientes": linhas,
+        "totais": totais,
+        "total": total_geral,
+        "multa": MULTA_PADRAO,
+        "mora": MORA_PADRAO,
+    }
@@ -0,0 +1,37 @@
+from typing import Any, Dict, List
+
+from django.db.models import Q, QuerySet
+
+from ..models import Cliente
+from ..utils import normalizar_texto, somente_digitos
+
+_CARACTERES_DOCUMENTO = set("0123456789.-/ ")
+# Maior code point do BMP: limite superior para transformar prefixo em intervalo.
+_FIM_PREFIXO = "\uffff"
+
+
+def _prefixo(campo: str, termo: str) -> Q:
+    # ``campo >= termo AND campo < termo + U+FFFF`` usa o índice B-tree em qualquer
+    # banco, ao contrário de LIKE, que o SQLite só otimiza em colunas NOCASE.
+    return Q(**{f"{campo}__gte": termo, f"{campo}__lt": termo + _FIM_PREFIXO})
+
+
+def filtrar_clientes(queryset: QuerySet, termo: str) -> QuerySet:
+    """Filtra por prefixo do nome normalizado ou dos dígitos do CPF/CNPJ."""
+    texto = normalizar_texto(termo)
+    if not texto:
+        return queryset
+    condicao = _prefixo("busca", texto)
+    digitos = somente_digitos(termo)
+    if digitos and set(termo.strip()) <= _CARACTERES_DOCUMENTO:
+        condicao |= _prefixo("documento", digitos)
+    return queryset.filter(condicao)
+
+
+def buscar_clientes(termo: str, limite: int = 10) -> List[Dict[str, Any]]:
+    """Sugestões para typeahead (somente consultas por prefixo, sempre indexadas)."""
+    return list(
+        filtrar_clientes(Cliente.objects.all(), termo)
+        .order_by("busca")
+        .values("id", "nome", "cpfCnpj", "cidade", "uf")[:limite]
+    )
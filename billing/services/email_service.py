@@ -0,0 +1,343 @@
+import datetime as dt
+import logging
+import math
+import smtplib
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Min, QuerySet
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ..models import Boleto, EnvioEmail
+from .emissao_service import buscar_pdf
+from .inter_service import InterAPIError, InterService, LimitadorTaxa, ServicosInter
+
+logger = logging.getLogger(__name__)
+
+# Resultados possíveis de um envio.
+ENVIADO = "enviado"
+REAGENDADO = "reagendado"
+ADIADO = "adiado"
+FALHOU = "falhou"
+DESCARTADO = "descartado"
+
+TAMANHO_LOTE = 500
+# Horizonte do limite por domínio: o que só teria vez depois disso volta para a fila
+# com ``proxima_tentativa`` na vez prevista, sem ocupar uma thread esperando.
+ESPERA_DOMINIO = 30.0
+# Um envio parado em ``enviando`` por mais que isso teve o worker interrompido.
+RESERVA_EXPIRADA = dt.timedelta(minutes=15)
+# Enquanto o lote anda, a reserva do que falta enviar é renovada nesse intervalo (segundos).
+RENOVAR_RESERVA = 60.0
+
+
+@dataclass
+class ResultadoEnvio:
+    situacao: str
+    mensagem: str = ""
+    pdf_baixado: bool = False
+
+
+def dominio_email(email: str) -> str:
+    return email.rsplit("@", 1)[-1].lower()
+
+
+def enfileirar_envios(boletos: QuerySet) -> int:
+    """Cria o envio dos boletos emitidos, com cliente com e-mail, que ainda não têm um.
+
+    Retorna quantos foram de fato criados: os que outra requisição enfileirou ao
+    mesmo tempo são ignorados pelo ``ignore_conflicts`` e não entram na conta.
+    """
+    alvos = (
+        boletos.filter(status="emitido", envio_email__isnull=True)
+        .exclude(cliente__email="")
+        .values_list("id", "cliente__email")
+    )
+    # As linhas inseridas por esta chamada levam uma marca em ``lote``, limpa na mesma
+    # transação; o UPDATE conta exatamente essas (e nenhum worker as vê marcadas).
+    marca = uuid.uuid4().hex
+    novos = [
+        EnvioEmail(boleto_id=boleto_id, destinatario=email, dominio=dominio_email(email), lote=marca)
+        for boleto_id, email in alvos
+    ]
+    if not novos:
+        return 0
+    with transaction.atomic():
+        EnvioEmail.objects.bulk_create(novos, batch_size=1000, ignore_conflicts=True)
+        return EnvioEmail.objects.filter(lote=marca).update(lote="")
+
+
+def montar_mensagem(envio: EnvioEmail, pdf: bytes) -> EmailMessage:
+    boleto = envio.boleto
+    assunto = (
+        f"Boleto {boleto.competencia_mes:02d}/{boleto.competencia_ano} - "
+        f"vencimento {boleto.data_vencimento:%d/%m/%Y}"
+    )
+    corpo = render_to_string("billing/email/boleto.txt", {"boleto": boleto, "cliente": boleto.cliente})
+    mensagem = EmailMessage(assunto, corpo, settings.DEFAULT_FROM_EMAIL, [envio.destinatario])
+    mensagem.attach(f"boleto-{boleto.competencia_mes:02d}-{boleto.competencia_ano}.pdf", pdf, "application/pdf")
+    return mensagem
+
+
+def erro_transitorio(exc: BaseException) -> bool:
+    """Respostas 4xx, queda de conexão e timeout valem nova tentativa; 5xx não."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPException, OSError, InterAPIError))
+
+
+class _ConexoesSMTP:
+    """Uma conexão SMTP por thread, aberta uma vez e reaproveitada entre mensagens."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._abertas: List = []
+        self._lock = threading.Lock()
+
+    def atual(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = get_connection(fail_silently=False)
+            conexao.open()
+            self._local.conexao = conexao
+            with self._lock:
+                self._abertas.append(conexao)
+        return conexao
+
+    def descartar(self) -> None:
+        conexao = getattr(self._local, "conexao", None)
+        self._local.conexao = None
+        if conexao is not None:
+            self._fechar(conexao)
+
+    def fechar_todas(self) -> None:
+        with self._lock:
+            abertas, self._abertas = self._abertas, []
+        for conexao in abertas:
+            self._fechar(conexao)
+
+    @staticmethod
+    def _fechar(conexao) -> None:
+        try:
+            conexao.close()
+        except Exception:  # noqa: BLE001 - conexão já perdida
+            pass
+
+
+def _enviar(conexoes: _ConexoesSMTP, vez: float, envio: EnvioEmail, inter: Optional[InterService]) -> ResultadoEnvio:
+    """Roda numa thread do pool: não toca no banco, só no SMTP, no storage e no Inter."""
+    espera = vez - time.monotonic()
+    if espera > 0:
+        time.sleep(espera)
+    boleto = envio.boleto
+    baixado = False
+    try:
+        if boleto.pdf:
+            with boleto.pdf.open("rb") as arquivo:
+                pdf = arquivo.read()
+        else:
+            pdf = buscar_pdf(inter, boleto) if inter is not None else None
+            if not pdf:
+                return ResultadoEnvio(REAGENDADO, "PDF ainda não disponível.")
+            boleto.guardar_pdf(f"boleto_{boleto.id}.pdf", pdf, gravar=False)
+            baixado = True
+        conexoes.atual().send_messages([montar_mensagem(envio, pdf)])
+    except Exception as exc:  # noqa: BLE001 - classificado abaixo; o lote segue
+        if isinstance(exc, (smtplib.SMTPException, OSError)) and not isinstance(
+            exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+        ):
+            # Conexão em estado desconhecido: a próxima mensagem abre outra.
+            conexoes.descartar()
+        situacao = REAGENDADO if erro_transitorio(exc) else FALHOU
+        return ResultadoEnvio(situacao, str(exc) or exc.__class__.__name__, baixado)
+    return ResultadoEnvio(ENVIADO, pdf_baixado=baixado)
+
+
+def liberar_reservas_expiradas() -> int:
+    limite = timezone.now() - RESERVA_EXPIRADA
+    return EnvioEmail.objects.filter(status="enviando", atualizado_em__lt=limite).update(
+        status="pendente", lote="", atualizado_em=timezone.now()
+    )
+
+
+def renovar_reserva(lote: str) -> int:
+    """Mantém em ``enviando`` o que o lote ainda não enviou, longe de ``liberar_reservas_expiradas``."""
+    return EnvioEmail.objects.filter(lote=lote, status="enviando").update(atualizado_em=timezone.now())
+
+
+def _reservar(quantidade: int) -> List[EnvioEmail]:
+    """Marca até ``quantidade`` envios vencidos como ``enviando`` para este worker."""
+    agora = timezone.now()
+    ids = list(
+        EnvioEmail.objects.filter(status="pendente", proxima_tentativa__lte=agora)
+        .order_by("proxima_tentativa", "id")
+        .values_list("id", flat=True)[:quantidade]
+    )
+    if not ids:
+        return []
+    lote = uuid.uuid4().hex
+    # Compare-and-set: só leva os que continuam pendentes (outro worker pode ter reservado).
+    EnvioEmail.objects.filter(id__in=ids, status="pendente").update(status="enviando", lote=lote, atualizado_em=agora)
+    return list(EnvioEmail.objects.filter(lote=lote).select_related("boleto__cliente", "boleto__conta"))
+
+
+def _espera_backoff(tentativas: int) -> dt.timedelta:
+    return dt.timedelta(minutes=min(2 ** tentativas, 60))
+
+
+def _registrar(resultados: List[Tuple[EnvioEmail, ResultadoEnvio]], contagem: Dict[str, int]) -> None:
+    """Grava o desfecho dos envios (chamado a cada mensagem concluída, não no fim do lote)."""
+    agora = timezone.now()
+    por_situacao: Dict[str, List[int]] = defaultdict(list)
+    falhas: List[EnvioEmail] = []
+    baixados: List[Boleto] = []
+    for envio, resultado in resultados:
+        contagem[resultado.situacao] += 1
+        if resultado.pdf_baixado:
+            baixados.append(envio.boleto)
+        if resultado.situacao in (REAGENDADO, FALHOU):
+            envio.tentativas += 1
+            envio.ultimo_erro = resultado.mensagem
+            envio.lote = ""
+            envio.atualizado_em = agora
+            if resultado.situacao == REAGENDADO and envio.tentativas < settings.EMAIL_MAX_TENTATIVAS:
+                envio.status = "pendente"
+                envio.proxima_tentativa = agora + _espera_backoff(envio.tentativas)
+            else:
+                envio.status = "falhou"
+                logger.warning("E-mail do boleto %s não enviado: %s", envio.boleto_id, resultado.mensagem)
+            falhas.append(envio)
+        else:
+            por_situacao[resultado.situacao].append(envio.pk)
+
+    fila = EnvioEmail.objects
+    if por_situacao[ENVIADO]:
+        fila.filter(pk__in=por_situacao[ENVIADO]).update(
+            status="enviado", tentativas=F("tentativas") + 1, ultimo_erro="", lote="", enviado_em=agora, atualizado_em=agora
+        )
+    # Adiados pelo limite do domínio: um UPDATE por vez prevista (uma por domínio no lote).
+    adiados: Dict[dt.datetime, List[int]] = defaultdict(list)
+    for envio, resultado in resultados:
+        if resultado.situacao == ADIADO:
+            adiados[envio.proxima_tentativa].append(envio.pk)
+    for proxima, ids in adiados.items():
+        fila.filter(pk__in=ids).update(status="pendente", lote="", proxima_tentativa=proxima, atualizado_em=agora)
+    if por_situacao[DESCARTADO]:
+        fila.filter(pk__in=por_situacao[DESCARTADO]).update(
+            status="descartado", ultimo_erro="Boleto não está mais em aberto.", lote="", atualizado_em=agora
+        )
+    if falhas:
+        fila.bulk_update(falhas, ["status", "tentativas", "proxima_tentativa", "ultimo_erro", "lote", "atualizado_em"])
+    if baixados:
+        Boleto.objects.bulk_update(baixados, ["pdf", "pdf_hash"])
+
+
+def _proxima_espera() -> Optional[float]:
+    """Segundos até o próximo envio pendente vencer, se for em até um minuto.
+
+    Adiados pelo limite de domínio vencem em segundos; reagendados por falha
+    (espera de minutos) ficam para a próxima execução.
+    """
+    proxima = EnvioEmail.objects.filter(status="pendente").aggregate(proxima=Min("proxima_tentativa"))["proxima"]
+    if proxima is None:
+        return None
+    espera = (proxima - timezone.now()).total_seconds()
+    return max(espera, 0.0) if espera <= 60 else None
+
+
+def processar_envios(
+    *,
+    workers: Optional[int] = None,
+    limite: Optional[int] = None,
+    ate_esvaziar: bool = False,
+    inter: Optional[InterService] = None,
+) -> Dict[str, int]:
+    """Envia os e-mails pendentes da outbox. Retorna a contagem por situação.
+
+    Os envios são reservados em lotes de ``TAMANHO_LOTE`` e mandados por ``workers``
+    threads, cada uma com a sua conexão SMTP aberta durante toda a execução. O
+    resultado de cada mensagem é gravado assim que ela sai, e a reserva do que ainda
+    falta é renovada a cada ``RENOVAR_RESERVA``: um lote demorado não perde a reserva
+    para outro worker (o que mandaria a mesma mensagem duas vezes). Cada
+    domínio de destino tem até ``EMAIL_LIMITE_POR_DOMINIO`` mensagens por minuto: as
+    vezes são reservadas antes do envio e o que passaria de ``ESPERA_DOMINIO`` volta
+    para a fila com a vez prevista, em vez de ocupar uma thread.
+    Falhas transitórias são reagendadas com espera crescente até
+    ``EMAIL_MAX_TENTATIVAS``. Com ``ate_esvaziar``, espera a vez dos adiados em vez de
+    parar quando não há mais nada vencido.
+    """
+    workers = workers or settings.EMAIL_WORKERS
+    contagem = {ENVIADO: 0, REAGENDADO: 0, ADIADO: 0, FALHOU: 0, DESCARTADO: 0}
+    liberar_reservas_expiradas()
+    servicos = ServicosInter(inter)
+    limitadores: Dict[str, LimitadorTaxa] = {}
+    conexoes = _ConexoesSMTP()
+    reservados = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email") as executor:
+            while limite is None or reservados < limite:
+                quantidade = TAMANHO_LOTE if limite is None else min(TAMANHO_LOTE, limite - reservados)
+                envios = _reservar(quantidade)
+                if not envios:
+                    espera = _proxima_espera() if ate_esvaziar else None
+                    if espera is None:
+                        break
+                    time.sleep(espera)
+                    continue
+                reservados += len(envios)
+
+                inicio_lote = timezone.now().replace(microsecond=0)
+                resultados: List[Tuple[EnvioEmail, ResultadoEnvio]] = []
+                agendados = []
+                lote = envios[0].lote
+                for envio in envios:
+                    if envio.boleto.status != "emitido":
+                        resultados.append((envio, ResultadoEnvio(DESCARTADO)))
+                        continue
+                    limitador = limitadores.setdefault(
+                        envio.dominio, LimitadorTaxa(settings.EMAIL_LIMITE_POR_DOMINIO)
+                    )
+                    reservada, espera = limitador.reservar(ESPERA_DOMINIO)
+                    if not reservada:
+                        # Arredondada ao segundo: os adiados de um domínio viram um só UPDATE.
+                        envio.proxima_tentativa = inicio_lote + dt.timedelta(seconds=math.ceil(espera))
+                        resultados.append((envio, ResultadoEnvio(ADIADO)))
+                        continue
+                    servico = None
+                    if not envio.boleto.pdf:
+                        try:
+                            servico = servicos.para(envio.boleto.conta, exigir_ativa=False)
+                        except (ValueError, RuntimeError):
+                            pass
+                    agendados.append((time.monotonic() + espera, envio, servico))
+                # Descartados e adiados saem da reserva antes de começar a enviar.
+                if resultados:
+                    _registrar(resultados, contagem)
+                # Na ordem das vezes reservadas: uma thread só espera se nada antes dela está pronto.
+                agendados.sort(key=lambda item: item[0])
+                pendentes = {
+                    executor.submit(_enviar, conexoes, vez, envio, servico): envio
+                    for vez, envio, servico in agendados
+                }
+                renovada_em = time.monotonic()
+                while pendentes:
+                    prontos, _ = wait(pendentes, timeout=RENOVAR_RESERVA, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        _registrar([(pendentes.pop(futuro), futuro.result())], contagem)
+                    if pendentes and time.monotonic() - renovada_em >= RENOVAR_RESERVA:
+                        renovar_reserva(lote)
+                        renovada_em = time.monotonic()
+    finally:
+        conexoes.fechar_todas()
+    return contagem
@@ -0,0 +1,512 @@
+import base64
+import calendar
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import partial
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from inter_api.payload import montar_seu_numero
+
+from ..models import Boleto, Cliente, ContaInter, EnvioEmail, IntencaoEmissao
+from .arquivo_service import referente_a
+from .inter_service import ChamadaNaoEnviada, InterAPIError, InterService, ServicosInter
+from .progresso_service import Progresso
+from .resumo_service import estado_boleto, registrar_transicoes
+
+# Resultados possíveis de ``emitir_boleto``.
+EMITIDO = "emitido"
+FALHOU = "falhou"
+EM_DUVIDA = "em_duvida"
+IGNORADO = "ignorado"
+# Clientes lidos, criados e emitidos por vez nas tarefas de geração.
+LOTE_EMISSAO = 200
+
+
+@dataclass
+class ResultadoEmissao:
+    situacao: str
+    mensagem: str = ""
+    erro_tipo: str = ""
+
+
+def classificar_erro(exc: BaseException) -> Tuple[str, Optional[int]]:
+    """Converte a exceção da emissão em ``(erro_tipo, status_http)`` de ``Boleto``.
+
+    ``resultado_incerto`` quando não dá para saber se o banco registrou a cobrança
+    (sem resposta, 408, 429 ou 5xx); ``rejeitado_transitorio`` quando o POST nem saiu.
+    """
+    if isinstance(exc, ChamadaNaoEnviada):
+        return "rejeitado_transitorio", exc.status_code
+    if isinstance(exc, InterAPIError):
+        codigo = exc.status_code
+        if codigo in (401, 403):
+            return "autenticacao", codigo
+        if codigo is None or codigo in (408, 429) or codigo >= 500:
+            return "resultado_incerto", codigo
+        return "rejeicao", codigo
+    if isinstance(exc, ValueError):
+        return "validacao", None
+    # Timeout, conexão interrompida e afins.
+    return "resultado_incerto", None
+
+
+def data_vencimento(cliente: Cliente, ano: int, mes: int) -> dt.date:
+    """Dia de vencimento do cliente, limitado ao último dia do mês."""
+    ultimo_dia = calendar.monthrange(ano, mes)[1]
+    return dt.date(ano, mes, min(cliente.dataVencimento, ultimo_dia))
+
+
+def criar_boletos(clientes: List[Cliente], ano: int, mes: int) -> Tuple[List[Boleto], List[Cliente]]:
+    """Cria de uma vez os boletos da competência. Retorna ``(novos, clientes_que_ja_tinham)``.
+
+    Consultas constantes por lote: uma leitura dos existentes, um INSERT e a
+    atualização agrupada do rollup (``bulk_create`` não dispara os sinais).
+    """
+    existentes = set(
+        Boleto.objects.filter(
+            cliente__in=clientes, competencia_ano=ano, competencia_mes=mes
+        ).values_list("cliente_id", flat=True)
+    )
+    novos = [
+        Boleto(
+            cliente=cliente,
+            competencia_ano=ano,
+            competencia_mes=mes,
+            data_vencimento=data_vencimento(cliente, ano, mes),
+            valor=cliente.valorNominal,
+        )
+        for cliente in clientes
+        if cliente.id not in existentes
+    ]
+    ja_tinham = [cliente for cliente in clientes if cliente.id in existentes]
+    if not novos:
+        return [], ja_tinham
+    try:
+        with transaction.atomic():
+            Boleto.objects.bulk_create(novos)
+            if novos[0].pk is None:
+                # Banco sem RETURNING no INSERT em massa: relê os criados.
+                por_cliente = {
+                    boleto.cliente_id: boleto
+                    for boleto in Boleto.objects.filter(
+                        cliente__in=[b.cliente for b in novos], competencia_ano=ano, competencia_mes=mes
+                    ).select_related("cliente__conta")
+                }
+                novos = [por_cliente[boleto.cliente_id] for boleto in novos]
+            estados = [estado_boleto(boleto) for boleto in novos]
+            registrar_transicoes(
+                [(None, estado) for estado in estados], ufs={c.id: c.uf for c in clientes}
+            )
+    except IntegrityError:
+        # Criação concorrente da mesma competência: resolve cliente a cliente.
+        criados: List[Boleto] = []
+        for boleto in novos:
+            boleto.pk = None
+            existente, criado = Boleto.objects.get_or_create(
+                cliente=boleto.cliente,
+                competencia_ano=ano,
+                competencia_mes=mes,
+                defaults={"data_vencimento": boleto.data_vencimento, "valor": boleto.valor},
+            )
+            if criado:
+                criados.append(existente)
+            else:
+                ja_tinham.append(boleto.cliente)
+        return criados, ja_tinham
+    for boleto, estado in zip(novos, estados):
+        # Base para o delta do rollup nos próximos save() (ver signals.py).
+        boleto._estado_resumo = estado
+    return novos, ja_tinham
+
+
+def dados_cliente(cliente: Cliente) -> Dict[str, Any]:
+    """Dicionário no formato esperado por ``InterService.emitir_boleto``."""
+    return {
+        "valorNominal": float(cliente.valorNominal),
+        "nome": cliente.nome,
+        "cpfCnpj": cliente.cpfCnpj,
+        "email": cliente.email,
+        "ddd": cliente.ddd,
+        "telefone": cliente.telefone,
+        "endereco": cliente.endereco,
+        "numero": cliente.numero,
+        "complemento": cliente.complemento,
+        "bairro": cliente.bairro,
+        "cidade": cliente.cidade,
+        "uf": cliente.uf,
+        "cep": cliente.cep,
+    }
+
+
+def _reservar_intencao(boleto: Boleto, seu_numero: str, conta: Optional[ContaInter]) -> Optional[str]:
+    """Grava (e confirma no banco) a intenção de emitir na ``conta``. Retorna um motivo se não puder emitir.
+
+    O boleto fica travado enquanto isso, como em ``reajuste_service``: um reajuste em
+    andamento termina antes, e nenhum muda o valor depois que a intenção existe. Com a
+    intenção gravada, ``boleto.valor`` passa a ser o lido sob a trava.
+    """
+    with transaction.atomic():
+        valor = Boleto.objects.select_for_update().values_list("valor", flat=True).get(pk=boleto.pk)
+        motivo = _gravar_intencao(boleto, seu_numero, conta)
+    if motivo is None:
+        boleto.valor = valor
+    return motivo
+
+
+def _gravar_intencao(boleto: Boleto, seu_numero: str, conta: Optional[ContaInter]) -> Optional[str]:
+    try:
+        with transaction.atomic():
+            IntencaoEmissao.objects.create(boleto=boleto, seu_numero=seu_numero, conta=conta)
+        return None
+    except IntegrityError:
+        pass
+
+    # Só uma falha definitiva anterior libera nova tentativa (compare-and-set); como
+    # nada foi registrado, a nova tentativa vai para a conta atual do cliente.
+    liberada = IntencaoEmissao.objects.filter(
+        boleto=boleto, status__in=["falhou", "descartada"]
+    ).update(
+        status="pendente", conta=conta, tentativas=F("tentativas") + 1, ultimo_erro="", atualizado_em=timezone.now()
+    )
+    if liberada:
+        return None
+
+    intencao = IntencaoEmissao.objects.filter(boleto=boleto).first()
+    if intencao is None:
+        return f"seuNumero {seu_numero} já reservado por outro boleto."
+    if intencao.status == "confirmada":
+        return "boleto já emitido no Inter."
+    return "emissão anterior em verificação; rode recuperar_emissoes."
+
+
+@transaction.atomic
+def _registrar_sucesso(boleto: Boleto, resultado: Dict[str, Any], conta: Optional[ContaInter]) -> None:
+    boleto.conta = conta
+    boleto.nosso_numero = resultado.get("nossoNumero", "")
+    boleto.linha_digitavel = resultado.get("linhaDigitavel", "")
+    boleto.codigo_barras = resultado.get("codigoBarras", "")
+    boleto.tx_id = resultado.get("txId", "")
+    boleto.codigo_solicitacao = resultado.get("codigoSolicitacao", "")
+    boleto.status = "emitido"
+    boleto.erro_msg = ""
+    boleto.erro_tipo = ""
+    boleto.erro_status_http = None
+    boleto.save()
+    IntencaoEmissao.objects.filter(boleto=boleto).update(
+        status="confirmada", ultimo_erro="", atualizado_em=timezone.now()
+    )
+    if settings.EMAIL_BOLETOS_AUTOMATICO and boleto.cliente.email:
+        # Outbox: o e-mail sai pelo enviar_boletos, fora do caminho da emissão.
+        EnvioEmail.objects.get_or_create(boleto=boleto, defaults={"destinatario": boleto.cliente.email})
+
+
+@transaction.atomic
+def _registrar_falha(boleto: Boleto, mensagem: str, erro_tipo: str, status_http: Optional[int] = None) -> None:
+    boleto.status = "erro"
+    boleto.erro_msg = mensagem
+    boleto.erro_tipo = erro_tipo
+    boleto.erro_status_http = status_http
+    boleto.save()
+    IntencaoEmissao.objects.filter(boleto=boleto).update(
+        status="falhou", ultimo_erro=mensagem, atualizado_em=timezone.now()
+    )
+
+
+def _registrar_duvida(boleto: Boleto, mensagem: str, status_http: Optional[int] = None) -> None:
+    # A intenção continua pendente: o banco pode ter registrado a cobrança, e só a
+    # consulta pelo seuNumero (recuperar_pendentes) decide entre confirmar e liberar.
+    boleto.erro_msg = f"Emissão em verificação: {mensagem}"
+    boleto.erro_tipo = "resultado_incerto"
+    boleto.erro_status_http = status_http
+    boleto.save(update_fields=["erro_msg", "erro_tipo", "erro_status_http"])
+    IntencaoEmissao.objects.filter(boleto=boleto).update(
+        status="pendente", ultimo_erro=mensagem, atualizado_em=timezone.now()
+    )
+
+
+def buscar_pdf(inter: InterService, boleto: Boleto) -> Optional[bytes]:
+    """Baixa o PDF do Inter pelo nosso número (ou código de solicitação), sem guardar."""
+    identificadores = [
+        (boleto.nosso_numero, "nosso_numero"),
+        (boleto.codigo_solicitacao, "codigo_solicitacao"),
+    ]
+    pdf_bytes = None
+    with referente_a(boleto.pk):
+        for ident, campo in identificadores:
+            if not ident:
+                continue
+            pdf_bytes = inter.baixar_pdf(ident, campo=campo)
+            if pdf_bytes:
+                break
+    if not pdf_bytes:
+        return None
+    if isinstance(pdf_bytes, str):
+        pdf_bytes = base64.b64decode(pdf_bytes)
+    return pdf_bytes
+
+
+def salvar_pdf(inter: InterService, boleto: Boleto) -> bool:
+    """Tenta baixar e guardar o PDF logo após a emissão."""
+    pdf_bytes = buscar_pdf(inter, boleto)
+    if not pdf_bytes:
+        return False
+    boleto.guardar_pdf(f"boleto_{boleto.id}.pdf", pdf_bytes)
+    return True
+
+
+def emitir_boleto(inter: InterService, boleto: Boleto, *, baixar_pdf: bool = True) -> ResultadoEmissao:
+    """Emite ``boleto`` no Inter de forma idempotente.
+
+    A intenção com o ``seuNumero`` determinístico é gravada antes do POST. Só uma
+    recusa certa do banco (4xx exceto 408/429) ou uma chamada que nem saiu marca a
+    intenção como ``falhou`` e libera nova tentativa; sem resposta, 408, 429 ou 5xx a
+    intenção fica pendente (``EM_DUVIDA``) até ``recuperar_pendentes`` consultar o Inter.
+    """
+    cliente_dict = dados_cliente(boleto.cliente)
+    seu_numero = montar_seu_numero(cliente_dict, boleto.data_vencimento)
+    cliente_dict["seuNumero"] = seu_numero
+
+    motivo = _reservar_intencao(boleto, seu_numero, inter.conta)
+    if motivo:
+        return ResultadoEmissao(IGNORADO, motivo)
+    cliente_dict["valorNominal"] = float(boleto.valor)
+
+    try:
+        with referente_a(boleto.pk):
+            resultado = inter.emitir_boleto(cliente_dict, boleto.data_vencimento)
+    except Exception as exc:  # noqa: BLE001 - toda falha é classificada
+        erro_tipo, status_http = classificar_erro(exc)
+        if erro_tipo == "resultado_incerto":
+            # O banco pode ter registrado a cobrança: reenviar poderia cobrar duas vezes.
+            _registrar_duvida(boleto, str(exc), status_http)
+            return ResultadoEmissao(EM_DUVIDA, str(exc), erro_tipo)
+        _registrar_falha(boleto, str(exc), erro_tipo, status_http)
+        return ResultadoEmissao(FALHOU, str(exc), erro_tipo)
+
+    _registrar_sucesso(boleto, resultado, inter.conta)
+    if baixar_pdf:
+        try:
+            salvar_pdf(inter, boleto)
+        except Exception:  # noqa: BLE001 - o PDF pode ser baixado depois
+            pass
+    return ResultadoEmissao(EMITIDO)
+
+
+def recuperar_pendentes(inter: Optional[InterService] = None, *, idade_minima: dt.timedelta = dt.timedelta(minutes=5)) -> Dict[str, int]:
+    """Resolve intenções pendentes consultando o Inter pelo ``seuNumero``.
+
+    Encontrada no banco: o boleto é confirmado com os dados retornados. Não
+    encontrada: a intenção é descartada e o boleto fica em ``erro``, liberado para
+    nova emissão. Nunca reemite por conta própria. Cada intenção é consultada na
+    conta Inter para a qual foi enviada (mesmo que o cliente tenha mudado de conta
+    depois); ``inter`` atende as enviadas à conta padrão.
+    """
+    limite = timezone.now() - idade_minima
+    contagem = {"confirmadas": 0, "descartadas": 0, "falhas": 0}
+    pendentes = IntencaoEmissao.objects.filter(status="pendente", atualizado_em__lt=limite).select_related(
+        "conta", "boleto__cliente"
+    )
+    servicos = ServicosInter(inter)
+    for intencao in pendentes.iterator(chunk_size=200):
+        boleto = intencao.boleto
+        try:
+            servico = servicos.para(intencao.conta, exigir_ativa=False)
+            with referente_a(boleto.pk):
+                resultado = servico.consultar_por_seu_numero(intencao.seu_numero, boleto.data_vencimento)
+        except Exception as exc:  # noqa: BLE001 - segue para as próximas; tenta de novo depois
+            IntencaoEmissao.objects.filter(pk=intencao.pk).update(ultimo_erro=str(exc))
+            contagem["falhas"] += 1
+            continue
+
+        if resultado:
+            _registrar_sucesso(boleto, resultado, intencao.conta)
+            contagem["confirmadas"] += 1
+            continue
+
+        with transaction.atomic():
+            mensagem = "Cobrança não encontrada no Inter após falha na emissão; pode ser reemitida."
+            IntencaoEmissao.objects.filter(pk=intencao.pk, status="pendente").update(
+                status="descartada", ultimo_erro=mensagem, atualizado_em=timezone.now()
+            )
+            boleto.status = "erro"
+            boleto.erro_msg = mensagem
+            boleto.erro_tipo = "rejeitado_transitorio"
+            boleto.erro_status_http = None
+            boleto.save()
+        contagem["descartadas"] += 1
+    return contagem
+
+
+def _emitir_em_thread(inter: InterService, boleto: Boleto) -> ResultadoEmissao:
+    try:
+        return emitir_boleto(inter, boleto)
+    finally:
+        # Cada thread abre a própria conexão com o banco; fecha ao terminar.
+        connection.close()
+
+
+def emitir_lote(
+    inter: Optional[InterService],
+    boletos: Iterable[Boleto],
+    *,
+    workers: Optional[int] = None,
+    ao_concluir: Optional[Callable[[Boleto, ResultadoEmissao], None]] = None,
+) -> List[Tuple[Boleto, ResultadoEmissao]]:
+    """Emite vários boletos em paralelo, agrupados pela conta Inter do cliente.
+
+    Cada conta tem até ``INTER_EMISSAO_WORKERS`` chamadas simultâneas e seu próprio
+    limite de taxa; ``inter`` atende os clientes sem conta (``None`` = ``.env``).
+    ``ao_concluir(boleto, resultado)`` é chamado na thread de quem chamou, à medida
+    que cada boleto termina (útil para acompanhar o progresso).
+    """
+    workers = workers or settings.INTER_EMISSAO_WORKERS
+    boletos = list(boletos)
+    servicos = ServicosInter(inter)
+    resultados: Dict[int, ResultadoEmissao] = {}
+    grupos: List[Tuple[InterService, List[int]]] = []
+
+    def concluir(indice: int, resultado: ResultadoEmissao) -> None:
+        resultados[indice] = resultado
+        if ao_concluir is not None:
+            ao_concluir(boletos[indice], resultado)
+
+    def chave(indice: int) -> int:
+        return boletos[indice].cliente.conta_id or 0
+
+    for _, indices in groupby(sorted(range(len(boletos)), key=chave), key=chave):
+        indices = list(indices)
+        try:
+            servico = servicos.para(boletos[indices[0]].cliente.conta)
+        except (ValueError, RuntimeError) as exc:
+            # Conta inativa ou sem credenciais: nenhum boleto do grupo chega ao banco.
+            erro_tipo = "validacao" if isinstance(exc, ValueError) else "autenticacao"
+            bloqueados = set(
+                IntencaoEmissao.objects.filter(
+                    boleto__in=[boletos[i] for i in indices], status__in=["pendente", "confirmada"]
+                ).values_list("boleto_id", flat=True)
+            )
+            for indice in indices:
+                boleto = boletos[indice]
+                if boleto.pk in bloqueados or boleto.status not in ("novo", "erro"):
+                    concluir(indice, ResultadoEmissao(IGNORADO, str(exc)))
+                    continue
+                _registrar_falha(boleto, str(exc), erro_tipo)
+                concluir(indice, ResultadoEmissao(FALHOU, str(exc), erro_tipo))
+            continue
+        grupos.append((servico, indices))
+
+    if workers <= 1 or len(boletos) <= 1:
+        for servico, indices in grupos:
+            for indice in indices:
+                concluir(indice, emitir_boleto(servico, boletos[indice]))
+    elif grupos:
+        close_old_connections()
+        executores = [
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="emissao") for _ in grupos
+        ]
+        try:
+            futuros = {
+                executor.submit(_emitir_em_thread, servico, boletos[indice]): indice
+                for executor, (servico, indices) in zip(executores, grupos)
+                for indice in indices
+            }
+            for futuro in as_completed(futuros):
+                concluir(futuros[futuro], futuro.result())
+        finally:
+            for executor in executores:
+                executor.shutdown()
+    return [(boleto, resultados[indice]) for indice, boleto in enumerate(boletos)]
+
+
+def aguardando_emissao(queryset: Optional[QuerySet] = None) -> QuerySet:
+    """Boletos ``novo`` sem intenção pendente/confirmada: ainda não foram ao Inter.
+
+    Com intenção pendente/confirmada o resultado depende de recuperar_emissoes.
+    """
+    queryset = Boleto.objects.all() if queryset is None else queryset
+    em_andamento = IntencaoEmissao.objects.filter(boleto=OuterRef("pk"), status__in=["pendente", "confirmada"])
+    return queryset.filter(status="novo").exclude(Exists(em_andamento))
+
+
+def boletos_retentaveis(queryset: Optional[QuerySet] = None, *, incluir_sem_classificacao: bool = False) -> QuerySet:
+    """Boletos em ``erro`` cujo tipo de falha justifica reenviar sem alterar dados."""
+    queryset = Boleto.objects.all() if queryset is None else queryset
+    condicao = Q(erro_tipo__in=Boleto.ERROS_RETENTAVEIS)
+    if incluir_sem_classificacao:
+        condicao |= Q(erro_tipo="")
+    return queryset.filter(condicao, status="erro").select_related("cliente__conta")
+
+
+def retentar_falhas(
+    inter: Optional[InterService] = None,
+    queryset: Optional[QuerySet] = None,
+    *,
+    incluir_sem_classificacao: bool = False,
+    workers: Optional[int] = None,
+    ao_concluir: Optional[Callable[[Boleto, ResultadoEmissao], None]] = None,
+) -> Dict[str, int]:
+    """Reenvia, em paralelo, os boletos com erro retentável. Retorna a contagem por situação."""
+    alvos = boletos_retentaveis(queryset, incluir_sem_classificacao=incluir_sem_classificacao)
+    contagem = {EMITIDO: 0, FALHOU: 0, EM_DUVIDA: 0, IGNORADO: 0}
+    for _, resultado in emitir_lote(inter, alvos, workers=workers, ao_concluir=ao_concluir):
+        contagem[resultado.situacao] += 1
+    return contagem
+
+
+def _registrar_resultado(progresso: Progresso, boleto: Boleto, resultado: ResultadoEmissao) -> None:
+    nome = boleto.cliente.nome
+    if resultado.situacao == FALHOU:
+        progresso.avancar(falhou=True, mensagem=f"Erro ao emitir boleto de {nome}: {resultado.mensagem}", nivel="error")
+    elif resultado.situacao == EM_DUVIDA:
+        progresso.avancar(
+            mensagem=f"Emissão de {nome} sem confirmação do banco; será verificada por recuperar_emissoes.",
+            nivel="warning",
+        )
+    elif resultado.situacao == IGNORADO:
+        progresso.avancar(mensagem=f"{nome}: {resultado.mensagem}")
+    else:
+        progresso.avancar()
+
+
+def gerar_em_lotes(progresso: Progresso, cliente_ids: List[int], ano: int, mes: int) -> None:
+    """Tarefa ``emissao``: cria e emite os boletos da competência, ``LOTE_EMISSAO`` clientes por vez.
+
+    Boletos que já existiam mas nunca foram ao Inter (uma tarefa anterior parou entre
+    a criação e a emissão) são emitidos junto com os novos.
+    """
+    # Sem transação única: cada boleto e sua intenção de emissão precisam estar
+    # gravados antes da chamada ao banco para que uma queda seja recuperável.
+    for inicio in range(0, len(cliente_ids), LOTE_EMISSAO):
+        ids = cliente_ids[inicio:inicio + LOTE_EMISSAO]
+        clientes = list(Cliente.objects.filter(id__in=ids).select_related("conta").order_by("nome", "id"))
+        # Evita duplicidade da mesma competência
+        novos, ja_tinham = criar_boletos(clientes, ano, mes)
+        if ja_tinham:
+            orfaos = list(
+                aguardando_emissao(
+                    Boleto.objects.filter(cliente__in=ja_tinham, competencia_ano=ano, competencia_mes=mes)
+                ).select_related("cliente__conta")
+            )
+            novos += orfaos
+            retomados = {boleto.cliente_id for boleto in orfaos}
+            ja_tinham = [cli for cli in ja_tinham if cli.id not in retomados]
+        for cli in ja_tinham:
+            progresso.avancar(mensagem=f"Boleto já existia: {cli.nome} {mes:02d}/{ano}")
+        removidos = len(ids) - len(novos) - len(ja_tinham)
+        if removidos:
+            progresso.avancar(removidos)
+        if novos:
+            emitir_lote(None, novos, ao_concluir=partial(_registrar_resultado, progresso))
+
+
+def retentar_em_lote(progresso: Progresso, boleto_ids: Optional[List[int]] = None) -> None:
+    """Tarefa ``retentativa``: reenvia os boletos ``boleto_ids`` (todos, sem ids) com erro retentável."""
+    queryset = Boleto.objects.all() if not boleto_ids else Boleto.objects.filter(id__in=boleto_ids)
+    retentar_falhas(None, queryset, ao_concluir=partial(_registrar_resultado, progresso))
@@ -0,0 +1,247 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import zip_longest
+from typing import IO, AbstractSet, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from ..models import Cliente
+from ..utils import normalizar_texto
+from ..validacao import (
+    converter_decimal,
+    documento_valido,
+    normalizar_cep,
+    normalizar_uf,
+    problemas_emissao,
+    uf_do_cep,
+)
+from .resumo_service import mover_uf_cliente
+
+TAMANHO_LOTE = 1000
+LIMITE_REJEITADOS = 500
+
+CAMPOS_EXPORTACAO = [
+    "nome", "cpfCnpj", "valorNominal", "dataVencimento", "email", "ddd", "telefone",
+    "endereco", "numero", "complemento", "bairro", "cidade", "uf", "cep", "ativo", "etiqueta",
+]
+CAMPOS_TEXTO = ["email", "ddd", "telefone", "endereco", "numero", "complemento", "bairro", "cidade", "etiqueta"]
+# Campos que o upsert pode sobrescrever quando o CPF/CNPJ já existe; só os que vieram
+# como coluna no arquivo são gravados (ver _gravar_lote).
+CAMPOS_ATUALIZADOS = [c for c in CAMPOS_EXPORTACAO if c != "cpfCnpj"]
+
+_CABECALHOS = {normalizar_texto(c).replace(" ", ""): c for c in CAMPOS_EXPORTACAO}
+_CABECALHOS.update({"cpf": "cpfCnpj", "cnpj": "cpfCnpj", "valor": "valorNominal", "vencimento": "dataVencimento"})
+
+
+@dataclass
+class RelatorioImportacao:
+    total: int = 0
+    importados: int = 0
+    rejeitados: int = 0
+    # Aceitos no cadastro, mas sem os dados que o Inter exige para emitir.
+    incompletos: int = 0
+    # Guarda só as primeiras rejeições para manter a memória constante.
+    amostra_rejeitados: List[Tuple[int, Dict[str, Any], List[str]]] = field(default_factory=list)
+
+    def rejeitar(self, numero: int, dados: Dict[str, Any], erros: List[str]) -> None:
+        self.rejeitados += 1
+        if len(self.amostra_rejeitados) < LIMITE_REJEITADOS:
+            self.amostra_rejeitados.append((numero, dados, erros))
+
+
+def _mapear_cabecalho(cabecalho: Iterable[Any]) -> List[Optional[str]]:
+    return [_CABECALHOS.get(normalizar_texto(c).replace(" ", "").replace("_", "")) for c in cabecalho]
+
+
+def _linha(campos: List[Optional[str]], valores: Sequence[Any]) -> Dict[str, Any]:
+    # Célula que falta no fim da linha conta como vazia: toda linha traz todas as
+    # colunas do cabeçalho, e só elas.
+    return {c: v for c, v in zip_longest(campos, valores[:len(campos)]) if c}
+
+
+def _linhas_csv(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    texto = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(texto, dialeto)
+    campos = _mapear_cabecalho(next(leitor, []))
+    for valores in leitor:
+        if any(valores):
+            yield _linha(campos, valores)
+
+
+def _linhas_xlsx(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # noqa: BLE001 - openpyxl é opcional
+        raise RuntimeError("openpyxl não está instalado; exporte a planilha como CSV.") from exc
+
+    planilha = load_workbook(stream, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    campos = _mapear_cabecalho(next(linhas, ()) or ())
+    for valores in linhas:
+        if any(v not in (None, "") for v in valores):
+            yield _linha(campos, valores)
+
+
+def ler_linhas(stream: IO[bytes], nome_arquivo: str) -> Iterator[Dict[str, Any]]:
+    """Itera as linhas do arquivo sem carregá-lo inteiro em memória."""
+    if nome_arquivo.lower().endswith((".xlsx", ".xlsm")):
+        return _linhas_xlsx(stream)
+    return _linhas_csv(stream)
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def validar_linha(dados: Dict[str, Any]) -> Tuple[Optional[Cliente], List[str]]:
+    erros: List[str] = []
+
+    nome = _texto(dados.get("nome"))
+    if not nome:
+        erros.append("nome obrigatório")
+
+    cpf_cnpj = _texto(dados.get("cpfCnpj"))
+    if not documento_valido(cpf_cnpj):
+        erros.append(f"CPF/CNPJ inválido: {cpf_cnpj or '(vazio)'}")
+
+    try:
+        valor = converter_decimal(dados.get("valorNominal"))
+        if valor <= 0:
+            raise ValueError
+        valor = valor.quantize(Decimal("0.01"))
+    except (ValueError, ArithmeticError):
+        erros.append(f"valorNominal inválido: {dados.get('valorNominal')}")
+        valor = None
+
+    try:
+        dia = int(float(_texto(dados.get("dataVencimento"))))
+        if not 1 <= dia <= 31:
+            raise ValueError
+    except ValueError:
+        erros.append(f"dataVencimento deve ser um dia entre 1 e 31: {dados.get('dataVencimento')}")
+        dia = None
+
+    uf = ""
+    if _texto(dados.get("uf")):
+        uf = normalizar_uf(_texto(dados.get("uf"))) or ""
+        if not uf:
+            erros.append(f"UF inválida: {dados.get('uf')}")
+
+    cep = ""
+    if _texto(dados.get("cep")):
+        cep = normalizar_cep(_texto(dados.get("cep"))) or ""
+        if not cep:
+            erros.append(f"CEP inválido: {dados.get('cep')}")
+        elif uf and uf_do_cep(cep) not in (None, uf):
+            erros.append(f"CEP {cep} pertence a {uf_do_cep(cep)}, não a {uf}")
+
+    textos = {campo: _texto(dados.get(campo)) for campo in CAMPOS_TEXTO}
+    if textos["email"]:
+        try:
+            validate_email(textos["email"])
+        except ValidationError:
+            erros.append(f"e-mail inválido: {textos['email']}")
+
+    if erros:
+        return None, erros
+
+    ativo = _texto(dados.get("ativo")).lower() not in {"0", "false", "nao", "não", "n"}
+    cliente = Cliente(
+        nome=nome,
+        cpfCnpj=cpf_cnpj,
+        valorNominal=valor,
+        dataVencimento=dia,
+        uf=uf,
+        cep=cep,
+        ativo=ativo,
+        **textos,
+    )
+    cliente.atualizar_campos_busca()
+    return cliente, []
+
+
+@transaction.atomic
+def _gravar_lote(clientes: List[Cliente], colunas: AbstractSet[str]) -> int:
+    """Upsert por documento; a última ocorrência no lote prevalece.
+
+    Num cliente que já existe só mudam as ``colunas`` presentes no arquivo: uma
+    planilha só com nome e valor não apaga e-mail/endereço nem reativa inativos.
+    """
+    por_documento = {c.documento: c for c in clientes}
+    ufs_atuais = (
+        dict(Cliente.objects.filter(documento__in=por_documento).values_list("documento", "uf"))
+        if "uf" in colunas
+        else {}
+    )
+    Cliente.objects.bulk_create(
+        list(por_documento.values()),
+        update_conflicts=True,
+        unique_fields=["documento"],
+        update_fields=[c for c in CAMPOS_ATUALIZADOS if c in colunas] + ["busca"],
+    )
+    # bulk_create não dispara sinais: mantém o rollup por UF coerente manualmente.
+    mudancas = {doc: uf for doc, uf in ufs_atuais.items() if uf != por_documento[doc].uf}
+    if mudancas:
+        ids = dict(Cliente.objects.filter(documento__in=mudancas).values_list("documento", "id"))
+        for doc, uf_antiga in mudancas.items():
+            mover_uf_cliente(ids[doc], uf_antiga, por_documento[doc].uf)
+    return len(por_documento)
+
+
+def importar_clientes(
+    linhas: Iterable[Dict[str, Any]],
+    *,
+    tamanho_lote: int = TAMANHO_LOTE,
+    simular: bool = False,
+) -> RelatorioImportacao:
+    """Valida e grava clientes em lotes; memória proporcional ao lote, não ao arquivo."""
+    relatorio = RelatorioImportacao()
+    lote: List[Cliente] = []
+    colunas: set = set()
+    # Linha 1 é o cabeçalho.
+    for numero, dados in enumerate(linhas, start=2):
+        relatorio.total += 1
+        colunas.update(dados)
+        cliente, erros = validar_linha(dados)
+        if erros:
+            relatorio.rejeitar(numero, dados, erros)
+            continue
+        if problemas_emissao(cliente.__dict__):
+            relatorio.incompletos += 1
+        lote.append(cliente)
+        if len(lote) >= tamanho_lote:
+            relatorio.importados += len(lote) if simular else _gravar_lote(lote, colunas)
+            lote = []
+    if lote:
+        relatorio.importados += len(lote) if simular else _gravar_lote(lote, colunas)
+    return relatorio
+
+
+class _Eco:
+    """Objeto "arquivo" que só devolve o que recebe, para o csv.writer gerar strings."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def exportar_clientes_csv(queryset=None) -> Iterator[str]:
+    """Gera o CSV linha a linha (compatível com ``StreamingHttpResponse``)."""
+    queryset = Cliente.objects.all() if queryset is None else queryset
+    escritor = csv.writer(_Eco(), delimiter=";")
+    yield "\ufeff" + escritor.writerow(CAMPOS_EXPORTACAO)
+    for linha in queryset.order_by("id").values_list(*CAMPOS_EXPORTACAO).iterator(chunk_size=2000):
+        yield escritor.writerow(["1" if v is True else "0" if v is False else v for v in linha])
@@ -1,18 +1,24 @@
 import base64
-import os
+import math
+import threading
+import time
 import unicodedata
 import datetime as dt
-from pathlib import Path
-from typing import Optional, Dict, Any, List
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
 
-import requests
-from dotenv import load_dotenv
+from django.conf import settings
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-CREDENTIALS_DIR = BASE_DIR / "config" / "inter"
-ENV_PATH = CREDENTIALS_DIR / ".env"
+from inter_api.credenciais import CredenciaisInter, credenciais_da_conta, obter_credenciais
+from inter_api.payload import montar_corpo
 
-load_dotenv(ENV_PATH)
+from .arquivo_service import registrar_chamada
+
+if TYPE_CHECKING:
+    # requests só é carregado na primeira chamada ao banco (ver inter_api.credenciais).
+    import requests
+
+    from ..models import ContaInter
 
 AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
 COBRANCA_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas"
@@ -21,47 +27,243 @@ CANCELAR_BOLETO_V2_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v2/bo
 PDF_URL_TEMPLATE = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas/{identificador}/pdf"
 
 
-def _tipo_pessoa(cpf_cnpj: str) -> str:
-    digitos = "".join(ch for ch in cpf_cnpj if ch.isdigit())
-    return "JURIDICA" if len(digitos) > 11 else "FISICA"
+class InterAPIError(RuntimeError):
+    """O Inter respondeu com erro (a requisição chegou e foi recusada)."""
+
+    def __init__(self, mensagem: str, *, status_code: Optional[int] = None, resposta: str = "") -> None:
+        super().__init__(mensagem)
+        self.status_code = status_code
+        self.resposta = resposta
+
+
+class ChamadaNaoEnviada(InterAPIError):
+    """A requisição nem saiu: circuito aberto ou prazo da operação esgotado.
+
+    Como o banco não recebeu a cobrança, a emissão pode ser repetida com segurança
+    (classificada como ``rejeitado_transitorio``).
+    """
+
+
+class Prazo:
+    """Orçamento de tempo de uma operação (token, espera do limite e chamadas somados)."""
+
+    def __init__(self, segundos: float) -> None:
+        self.fim = time.monotonic() + segundos
+
+    def restante(self) -> float:
+        return self.fim - time.monotonic()
+
+    def timeout(self, conexao: float) -> Tuple[float, float]:
+        """``timeout=(conexão, leitura)`` para o ``requests`` limitado ao que sobrou."""
+        restante = self.restante()
+        if restante <= 0:
+            raise ChamadaNaoEnviada("Prazo da operação esgotado antes de chamar o Inter.")
+        return min(conexao, restante), restante
+
 
+class Disjuntor:
+    """Circuit breaker de uma família de endpoints de uma conta.
 
-def _resolve_cert_path(raw_value: Optional[str], filename: str) -> str:
-    if raw_value:
-        candidate = Path(raw_value)
-        if not candidate.is_absolute():
-            candidate = CREDENTIALS_DIR / candidate
-    else:
-        candidate = CREDENTIALS_DIR / filename
-    return str(candidate)
+    Fechado: registra o resultado das últimas ``JANELA`` chamadas e abre quando a
+    taxa de falhas (erro de transporte, 408 ou 5xx) passa de ``taxa_falhas``.
+    Aberto: recusa as chamadas por ``espera`` segundos. Depois deixa passar uma
+    única chamada de teste (meio aberto): sucesso fecha, falha reabre.
+    """
 
+    JANELA = 20
+    MINIMO_CHAMADAS = 10
 
-def _montar_seu_numero(cliente_dict: Dict[str, Any], data_venc: dt.date) -> str:
-    fornecido = str(cliente_dict.get("seuNumero", "")).strip()
-    if fornecido:
-        sanitizado = "".join(ch for ch in fornecido if ch.isalnum()) or fornecido.replace(" ", "")
-        return sanitizado[:15]
+    def __init__(self, nome: str, taxa_falhas: float, espera: float) -> None:
+        self.nome = nome
+        self.taxa_falhas = taxa_falhas
+        self.espera = espera
+        self._resultados: deque = deque(maxlen=self.JANELA)
+        self._aberto_ate: Optional[float] = None
+        self._testando = False
+        self._lock = threading.Lock()
 
-    cpf_cnpj = "".join(ch for ch in str(cliente_dict.get("cpfCnpj", "")) if ch.isalnum()) or "SN"
-    sufixo = data_venc.strftime("%y%m%d")  # garante diferença por competência/dia
-    max_base = max(0, 15 - len(sufixo))
-    base = cpf_cnpj[-max_base:] if max_base else ""
-    resultado = (base + sufixo)[:15]
-    return resultado or sufixo[-15:]
+    @property
+    def estado(self) -> str:
+        if self._aberto_ate is None:
+            return "fechado"
+        return "aberto" if time.monotonic() < self._aberto_ate else "meio_aberto"
+
+    def liberar(self) -> None:
+        """Levanta ``ChamadaNaoEnviada`` se a chamada não deve sair agora."""
+        with self._lock:
+            if self._aberto_ate is None:
+                return
+            if time.monotonic() >= self._aberto_ate and not self._testando:
+                self._testando = True
+                return
+            restante = max(0.0, self._aberto_ate - time.monotonic())
+        raise ChamadaNaoEnviada(
+            f"Inter instável ({self.nome}): chamadas suspensas por mais {math.ceil(restante)}s."
+        )
+
+    def registrar(self, sucesso: bool) -> None:
+        with self._lock:
+            if self._aberto_ate is not None:
+                if not self._testando:
+                    return  # resposta de chamada anterior à abertura
+                self._testando = False
+                if sucesso:
+                    self._aberto_ate = None
+                    self._resultados.clear()
+                else:
+                    self._aberto_ate = time.monotonic() + self.espera
+                return
+            self._resultados.append(sucesso)
+            falhas = self._resultados.count(False)
+            if (
+                len(self._resultados) >= self.MINIMO_CHAMADAS
+                and falhas / len(self._resultados) >= self.taxa_falhas
+            ):
+                self._aberto_ate = time.monotonic() + self.espera
+
+
+class LimitadorTaxa:
+    """Espaça as chamadas para no máximo ``por_minuto`` por conta (0 = sem limite)."""
+
+    def __init__(self, por_minuto: int) -> None:
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def reservar(self, maximo: Optional[float] = None) -> Tuple[bool, float]:
+        """Reserva a vez sem esperar. Devolve ``(reservada, segundos até a vez)``.
+
+        Se a espera passaria de ``maximo`` nada é reservado (``reservada`` falso).
+        """
+        if not self.intervalo:
+            return True, 0.0
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            if maximo is not None and espera > maximo:
+                return False, espera
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        return True, max(espera, 0.0)
+
+    def aguardar(self, maximo: Optional[float] = None) -> bool:
+        """Espera a vez da chamada; devolve ``False`` sem reservar se passaria de ``maximo``."""
+        reservada, espera = self.reservar(maximo)
+        if reservada and espera > 0:
+            time.sleep(espera)
+        return reservada
+
+
+# Estado por conta corrente, compartilhado entre instâncias e threads do processo.
+_limitadores: Dict[Tuple[str, int], LimitadorTaxa] = {}
+_disjuntores: Dict[Tuple[str, str], Disjuntor] = {}
+_tokens: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+_estado_lock = threading.Lock()
+# Renova o token um pouco antes de expirar.
+MARGEM_TOKEN = 60
+
+
+def _limitador(conta_corrente: str, por_minuto: int) -> LimitadorTaxa:
+    chave = (conta_corrente, por_minuto)
+    limitador = _limitadores.get(chave)
+    if limitador is None:
+        with _estado_lock:
+            limitador = _limitadores.setdefault(chave, LimitadorTaxa(por_minuto))
+    return limitador
+
+
+def _disjuntor(conta_corrente: str, familia: str) -> Disjuntor:
+    chave = (conta_corrente, familia)
+    disjuntor = _disjuntores.get(chave)
+    if disjuntor is None:
+        with _estado_lock:
+            disjuntor = _disjuntores.setdefault(
+                chave,
+                Disjuntor(familia, settings.INTER_DISJUNTOR_TAXA_FALHAS, settings.INTER_DISJUNTOR_ESPERA),
+            )
+    return disjuntor
+
+
+def _falha_do_banco(status_code: int) -> bool:
+    return status_code == 408 or status_code >= 500
 
 
 class InterService:
-    def __init__(self) -> None:
-        self.client_id = os.getenv("CLIENT_ID")
-        self.client_secret = os.getenv("CLIENT_SECRET")
-        self.conta_corrente = os.getenv("CONTA_CORRENTE")
-        self.cert_path = _resolve_cert_path(os.getenv("CERT_PATH"), "Inter_API_Certificado.crt")
-        self.key_path = _resolve_cert_path(os.getenv("KEY_PATH"), "Inter_API_Chave.key")
+    def __init__(self, conta: Optional["ContaInter"] = None) -> None:
+        self.conta = conta
+        credenciais = self._credenciais()
+        credenciais.validar()
+        self.client_id = credenciais.client_id
+        self.client_secret = credenciais.client_secret
+        self.conta_corrente = credenciais.conta_corrente
+        self.cert_path = credenciais.cert_path
+        self.key_path = credenciais.key_path
+        limite = conta.limite_por_minuto if conta is not None else settings.INTER_LIMITE_POR_MINUTO
+        self._limitador = _limitador(self.conta_corrente, limite)
+
+    def _credenciais(self) -> CredenciaisInter:
+        if self.conta is None:
+            return obter_credenciais()
+        return credenciais_da_conta(
+            f"conta:{self.conta.pk}",
+            client_id=self.conta.client_id,
+            client_secret=self.conta.client_secret,
+            conta_corrente=self.conta.conta_corrente,
+            cert_path=self.conta.cert_path,
+            key_path=self.conta.key_path,
+        )
+
+    def _http(self) -> "requests.Session":
+        # Sessão compartilhada pelo processo para esta conta (SSLContext carregado uma vez,
+        # conexões reaproveitadas).
+        return self._credenciais().sessao
+
+    def _prazo(self) -> Prazo:
+        return Prazo(settings.INTER_PRAZO_OPERACAO)
+
+    def _enviar(self, familia: str, metodo: str, url: str, prazo: Prazo, **kwargs) -> "requests.Response":
+        disjuntor = _disjuntor(self.conta_corrente, familia)
+        timeout = prazo.timeout(settings.INTER_TIMEOUT_CONEXAO)
+        disjuntor.liberar()
+        sucesso = False
+        inicio = time.monotonic()
+        response = None
+        erro: Optional[BaseException] = None
+        try:
+            response = self._http().request(metodo, url, timeout=timeout, **kwargs)
+            sucesso = not _falha_do_banco(response.status_code)
+            return response
+        except Exception as exc:
+            erro = exc
+            raise
+        finally:
+            disjuntor.registrar(sucesso)
+            registrar_chamada(
+                conta_corrente=self.conta_corrente,
+                familia=familia,
+                metodo=metodo,
+                url=url,
+                kwargs=kwargs,
+                inicio=inicio,
+                response=response,
+                erro=erro,
+            )
 
-        if not all([self.client_id, self.client_secret, self.conta_corrente]):
-            raise RuntimeError("CLIENT_ID, CLIENT_SECRET e CONTA_CORRENTE precisam estar definidos no .env.")
+    def _requisitar(self, familia: str, metodo: str, url: str, *, prazo: Prazo, **kwargs) -> "requests.Response":
+        if not self._limitador.aguardar(prazo.restante()):
+            raise ChamadaNaoEnviada("Prazo da operação esgotado aguardando o limite de requisições.")
+        response = self._enviar(familia, metodo, url, prazo, **kwargs)
+        if response.status_code == 401:
+            # Token revogado antes do prazo: força nova autenticação na próxima chamada.
+            for chave in [c for c in _tokens if c[0] == self.conta_corrente]:
+                _tokens.pop(chave, None)
+        return response
+
+    def _obter_token(self, scope: str, prazo: Prazo) -> str:
+        chave = (self.conta_corrente, self.client_id, scope)
+        em_cache = _tokens.get(chave)
+        if em_cache and em_cache[1] > time.monotonic():
+            return em_cache[0]
 
-    def _obter_token(self, scope: str) -> str:
         payload = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -69,96 +271,63 @@ class InterService:
             "scope": scope,
         }
 
-        response = requests.post(
+        response = self._enviar(
+            "token",
+            "POST",
             AUTH_URL,
+            prazo,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             data=payload,
-            cert=(self.cert_path, self.key_path),
         )
-        response.raise_for_status()
-        token = response.json().get("access_token")
+        if not response.ok:
+            raise InterAPIError(
+                f"Falha ao obter token ({response.status_code}): {response.text}",
+                status_code=response.status_code,
+                resposta=response.text,
+            )
+        dados = response.json()
+        token = dados.get("access_token")
         if not token:
             raise RuntimeError("Não foi possível obter token de acesso do Banco Inter.")
+        validade = max(0, int(dados.get("expires_in") or 0) - MARGEM_TOKEN)
+        if validade:
+            _tokens[chave] = (token, time.monotonic() + validade)
         return token
 
-    def _formatar_pagador(self, dados: Dict[str, Any]) -> Dict[str, Any]:
-        cpf_cnpj = str(dados.get("cpfCnpj", ""))
-        return {
-            "cpfCnpj": cpf_cnpj,
-            "tipoPessoa": _tipo_pessoa(cpf_cnpj),
-            "nome": str(dados.get("nome", "")),
-            "endereco": str(dados.get("endereco", "")),
-            "bairro": str(dados.get("bairro", "")),
-            "cidade": str(dados.get("cidade", "")),
-            "uf": str(dados.get("uf", "")),
-            "cep": str(dados.get("cep", "")),
-            "email": str(dados.get("email", "")),
-            "ddd": str(dados.get("ddd", "")),
-            "telefone": str(dados.get("telefone", "")),
-            "numero": str(dados.get("numero", "")),
-            "complemento": str(dados.get("complemento", "")),
-        }
-
     def emitir_boleto(self, cliente_dict: Dict[str, Any], data_venc: dt.date) -> Dict[str, Any]:
-        if "valorNominal" not in cliente_dict:
-            raise ValueError("O cliente precisa possuir o campo 'valorNominal'.")
-
+        body = montar_corpo(cliente_dict, data_venc)
+        nome = body["pagador"]["nome"]
+        prazo = self._prazo()
         try:
-            valor_nominal = float(cliente_dict["valorNominal"])
-        except Exception as exc:  # noqa: BLE001
-            raise ValueError(f"Valor nominal inválido: {cliente_dict['valorNominal']}") from exc
-
-        cpf_cnpj = str(cliente_dict.get("cpfCnpj", "")).strip()
-        if not cpf_cnpj:
-            raise ValueError("CPF/CNPJ é obrigatório para emissão do boleto.")
-
-        nome = str(cliente_dict.get("nome", "")).strip()
-        if not nome:
-            raise ValueError("Nome é obrigatório para emissão do boleto.")
-
-        seu_numero = _montar_seu_numero(cliente_dict, data_venc)
-
-        token = self._obter_token("boleto-cobranca.write")
-
-        body = {
-            "seuNumero": seu_numero,
-            "valorNominal": valor_nominal,
-            "dataVencimento": data_venc.strftime("%Y-%m-%d"),
-            "numDiasAgenda": 30,
-            "pagador": self._formatar_pagador(cliente_dict),
-            "multa": {
-                "codigo": cliente_dict.get("codigoMulta", "VALORFIXO"),
-                "valor": float(cliente_dict.get("valorMulta", 1.08)),
-            },
-            "mora": {
-                "codigo": cliente_dict.get("codigoMora", "TAXAMENSAL"),
-                "taxa": float(cliente_dict.get("taxaMora", 5)),
-            },
-            "mensagem": {
-                "linha1": str(cliente_dict.get("mensagem1", "Serviços contábeis.")),
-                "linha2": str(cliente_dict.get("mensagem2", "")),
-                "linha3": str(cliente_dict.get("mensagem3", "")),
-                "linha4": str(cliente_dict.get("mensagem4", "")),
-                "linha5": str(cliente_dict.get("mensagem5", "")),
-            },
-            "formasRecebimento": cliente_dict.get("formasRecebimento", ["BOLETO", "PIX"]),
-        }
+            token = self._obter_token("boleto-cobranca.write", prazo)
+        except InterAPIError as exc:
+            if isinstance(exc, ChamadaNaoEnviada) or exc.status_code in (401, 403):
+                raise
+            raise ChamadaNaoEnviada(
+                f"Token indisponível, cobrança de {nome} não enviada: {exc}", status_code=exc.status_code
+            ) from exc
+        except Exception as exc:  # noqa: BLE001 - falhou antes do POST da cobrança
+            raise ChamadaNaoEnviada(f"Token indisponível, cobrança de {nome} não enviada: {exc}") from exc
 
-        response = requests.post(
+        response = self._requisitar(
+            "emissao",
+            "POST",
             COBRANCA_URL,
+            prazo=prazo,
             headers={
                 "Authorization": f"Bearer {token}",
                 "x-conta-corrente": self.conta_corrente,
                 "Content-Type": "application/json",
             },
-            cert=(self.cert_path, self.key_path),
             json=body,
         )
 
         if not response.ok:
             conteudo = response.text
-            raise RuntimeError(
-                f"Falha ao emitir boleto para {nome}. Status {response.status_code}. Resposta: {conteudo}"
+            raise InterAPIError(
+                f"Falha ao emitir boleto para {nome}. Status {response.status_code}. Resposta: {conteudo}",
+                status_code=response.status_code,
+                resposta=conteudo,
             )
 
         try:
@@ -177,20 +346,70 @@ class InterService:
             "pdfBytes": retorno.get("pdfBytes"),
         }
 
+    def consultar_por_seu_numero(self, seu_numero: str, data_venc: dt.date) -> Optional[Dict[str, Any]]:
+        """Procura no Inter a cobrança emitida com ``seu_numero`` (vencendo em ``data_venc``).
+
+        Retorna os mesmos campos de ``emitir_boleto`` ou ``None`` se não existir.
+        """
+        prazo = self._prazo()
+        token = self._obter_token("boleto-cobranca.read", prazo)
+        data = data_venc.strftime("%Y-%m-%d")
+        response = self._requisitar(
+            "consulta",
+            "GET",
+            COBRANCA_URL,
+            prazo=prazo,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "x-conta-corrente": self.conta_corrente,
+            },
+            params={
+                "dataInicial": data,
+                "dataFinal": data,
+                "filtrarDataPor": "VENCIMENTO",
+                "seuNumero": seu_numero,
+            },
+        )
+        if not response.ok:
+            raise InterAPIError(
+                f"Falha ao consultar cobrança {seu_numero} ({response.status_code}): {response.text}",
+                status_code=response.status_code,
+                resposta=response.text,
+            )
+
+        for item in response.json().get("cobrancas", []):
+            cobranca = item.get("cobranca", {})
+            if cobranca.get("seuNumero") != seu_numero:
+                continue
+            boleto = item.get("boleto", {})
+            pix = item.get("pix", {})
+            return {
+                "nossoNumero": boleto.get("nossoNumero", ""),
+                "linhaDigitavel": boleto.get("linhaDigitavel", ""),
+                "codigoBarras": boleto.get("codigoBarras", ""),
+                "txId": pix.get("txid") or cobranca.get("codigoSolicitacao", ""),
+                "codigoSolicitacao": cobranca.get("codigoSolicitacao", ""),
+                "situacao": cobranca.get("situacao", ""),
+            }
+        return None
+
     def baixar_pdf(self, identificador: str, *, campo: str = "nosso_numero") -> Optional[bytes]:
         if not identificador:
             return None
 
-        token = self._obter_token("boleto-cobranca.read")
+        prazo = self._prazo()
+        token = self._obter_token("boleto-cobranca.read", prazo)
         url = PDF_URL_TEMPLATE.format(identificador=identificador)
 
-        response = requests.get(
+        response = self._requisitar(
+            "pdf",
+            "GET",
             url,
+            prazo=prazo,
             headers={
                 "Authorization": f"Bearer {token}",
                 "x-conta-corrente": self.conta_corrente,
             },
-            cert=(self.cert_path, self.key_path),
         )
 
         if response.status_code == 200:
@@ -207,8 +426,10 @@ class InterService:
         if response.status_code == 404:
             return None
 
-        raise RuntimeError(
-            f"Falha ao baixar PDF ({response.status_code}): {response.text}"
+        raise InterAPIError(
+            f"Falha ao baixar PDF ({response.status_code}): {response.text}",
+            status_code=response.status_code,
+            resposta=response.text,
         )
 
     def cancelar_boleto(
@@ -224,7 +445,8 @@ class InterService:
         motivo = (motivo or "Solicitação do cliente").strip() or "Solicitação do cliente"
         motivo_v3 = motivo[:50]
 
-        token = self._obter_token("boleto-cobranca.write")
+        prazo = self._prazo()
+        token = self._obter_token("boleto-cobranca.write", prazo)
         headers = {
             "Authorization": f"Bearer {token}",
             "x-conta-corrente": self.conta_corrente,
@@ -235,10 +457,12 @@ class InterService:
 
         if codigo_solicitacao:
             url = COBRANCA_CANCELAR_URL.format(codigo_solicitacao=codigo_solicitacao)
-            response = requests.post(
+            response = self._requisitar(
+                "cancelamento",
+                "POST",
                 url,
+                prazo=prazo,
                 headers=headers,
-                cert=(self.cert_path, self.key_path),
                 json={"motivoCancelamento": motivo_v3},
             )
             if response.ok:
@@ -259,10 +483,12 @@ class InterService:
         if nosso_numero:
             url = CANCELAR_BOLETO_V2_URL.format(nosso_numero=nosso_numero)
             motivo_enum = self._normalizar_motivo_v2(motivo)
-            response = requests.post(
+            response = self._requisitar(
+                "cancelamento",
+                "POST",
                 url,
+                prazo=prazo,
                 headers=headers,
-                cert=(self.cert_path, self.key_path),
                 json={"motivoCancelamento": motivo_enum},
             )
             if response.ok:
@@ -298,3 +524,28 @@ class InterService:
         if texto_sem_espaco in opcoes:
             return texto_sem_espaco
         return "APEDIDODOCLIENTE"
+
+
+class ServicosInter:
+    """Uma instância de ``InterService`` por ``ContaInter`` (criadas sob demanda).
+
+    Clientes sem conta usam ``padrao``, ou as credenciais do ``.env`` se omitido.
+    """
+
+    def __init__(self, padrao: Optional[InterService] = None) -> None:
+        self._padrao = padrao
+        self._por_conta: Dict[int, InterService] = {}
+
+    def para(self, conta: Optional["ContaInter"], *, exigir_ativa: bool = True) -> InterService:
+        """Serviço da ``conta``. ``exigir_ativa=False`` para boletos já emitidos por ela
+        (cancelamento, PDF, consulta), que continuam valendo com a conta desativada."""
+        if conta is None:
+            if self._padrao is None:
+                self._padrao = InterService()
+            return self._padrao
+        if exigir_ativa and not conta.ativa:
+            raise ValueError(f"Conta Inter {conta} está inativa.")
+        servico = self._por_conta.get(conta.pk)
+        if servico is None:
+            servico = self._por_conta[conta.pk] = InterService(conta)
+        return servico
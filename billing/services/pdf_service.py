@@ -0,0 +1,356 @@
+import io
+import logging
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.files import File
+
+from ..models import Boleto
+from .emissao_service import buscar_pdf
+from .inter_service import ServicosInter
+from .progresso_service import Progresso
+
+logger = logging.getLogger(__name__)
+
+# Folha (largura, altura em pontos, A4) e grade (colunas, linhas) de cada modo n-up.
+LAYOUTS: Dict[int, Tuple[Tuple[float, float], Tuple[int, int]]] = {
+    2: ((841.89, 595.28), (2, 1)),
+    4: ((595.28, 841.89), (2, 2)),
+}
+POR_FOLHA = (1, *LAYOUTS)
+A4 = (595.28, 841.89)
+LINHAS_POR_PAGINA = 60
+# Objetos fixos do documento gerado; os das páginas copiadas vêm depois deles.
+CATALOGO, PAGINAS = 1, 2
+
+Fonte = Tuple[str, Optional[IO[bytes]]]
+
+
+def _pypdf():
+    try:
+        import pypdf
+    except ImportError as exc:  # noqa: BLE001 - sem pypdf só o ZIP funciona
+        raise RuntimeError("pypdf não está instalado; baixe os PDFs em ZIP.") from exc
+    return pypdf
+
+
+def _texto_pdf(texto: str) -> bytes:
+    codificado = texto.encode("cp1252", "replace")
+    return b"(" + codificado.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _pdf_de_texto(linhas: List[str]) -> bytes:
+    """PDF de uma página A4 com ``linhas`` em Helvetica, para a lista de não incluídos."""
+    largura, altura = A4
+    conteudo = [b"BT /F1 10 Tf 12 TL 40 %.2f Td" % (altura - 50)]
+    conteudo += [_texto_pdf(linha) + b" Tj T*" for linha in linhas]
+    conteudo.append(b"ET")
+    fluxo = zlib.compress(b"\n".join(conteudo))
+    objetos = [
+        b"<</Type/Catalog/Pages 2 0 R>>",
+        b"<</Type/Pages/Kids[3 0 R]/Count 1>>",
+        b"<</Type/Page/Parent 2 0 R/MediaBox[0 0 %.2f %.2f]/Contents 4 0 R"
+        b"/Resources<</Font<</F1<</Type/Font/Subtype/Type1/BaseFont/Helvetica/Encoding/WinAnsiEncoding>>>>>>>>"
+        % (largura, altura),
+        b"<</Filter/FlateDecode/Length %d>>\nstream\n%s\nendstream" % (len(fluxo), fluxo),
+    ]
+    saida = bytearray(b"%PDF-1.7\n")
+    offsets = []
+    for numero, corpo in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    saida += b"trailer\n<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(saida)
+
+
+class _EscritorIncremental:
+    """Grava em ``destino`` as páginas de cada PDF de origem assim que ele é lido.
+
+    Os objetos de uma origem são renumerados e serializados com ``write_to_stream``
+    num buffer, que só vai para ``destino`` se a cópia inteira der certo: um arquivo
+    ruim não deixa objetos soltos no documento. Da origem em diante só ficam na
+    memória o offset de cada objeto e o número de cada página; catálogo, árvore de
+    páginas e xref são escritos no fim, por ``finalizar``.
+    """
+
+    def __init__(self, pypdf: Any, destino: IO[bytes]) -> None:
+        self.generic = pypdf.generic
+        self.destino = destino
+        self.posicao = 0
+        # offsets[n - 1] é a posição do objeto n; catálogo e árvore de páginas ficam para o fim.
+        self.offsets: List[int] = [0, 0]
+        self.paginas: List[int] = []
+        self._escrever(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _escrever(self, dados: bytes) -> None:
+        self.destino.write(dados)
+        self.posicao += len(dados)
+
+    def copiar(self, leitor: Any) -> None:
+        """Copia todas as páginas de ``leitor`` (um ``PdfReader``), com o que elas referenciam."""
+        generic = self.generic
+        if leitor.is_encrypted:
+            raise ValueError("PDF protegido por senha")
+        novos: Dict[Tuple[int, int], int] = {}
+        fila: List[Tuple[int, Any]] = []
+        raiz = leitor.root_object.raw_get("/Pages")
+        if isinstance(raiz, generic.IndirectObject):
+            # Quem aponta para a árvore da origem passa a apontar para a do documento.
+            novos[(raiz.idnum, raiz.generation)] = PAGINAS
+
+        def numerar(ref: Any, objeto: Any) -> int:
+            numero = len(self.offsets) + len(fila) + 1
+            if ref is not None:
+                novos[(ref.idnum, ref.generation)] = numero
+            fila.append((numero, objeto))
+            return numero
+
+        def referencia(ref: Any) -> Any:
+            chave = (ref.idnum, ref.generation)
+            numero = novos[chave] if chave in novos else numerar(ref, ref)
+            return generic.IndirectObject(numero, 0, None)
+
+        # As páginas já vêm com os atributos herdados da árvore (Resources, MediaBox...).
+        paginas = {numerar(pagina.indirect_reference, pagina) for pagina in leitor.pages}
+        if not paginas:
+            raise ValueError("PDF sem páginas")
+        vistos: Set[int] = set()
+        buffer = io.BytesIO()
+        posicoes: List[int] = []
+        for numero, item in fila:  # a fila cresce enquanto as referências são seguidas
+            objeto = item.get_object()
+            if objeto is None:
+                objeto = generic.NullObject()
+            if numero in paginas:
+                objeto.pop("/Parent", None)
+            objeto = self._renumerar(objeto, referencia, vistos)
+            if numero in paginas:
+                objeto[generic.NameObject("/Parent")] = generic.IndirectObject(PAGINAS, 0, None)
+            posicoes.append(buffer.tell())
+            buffer.write(b"%d 0 obj\n" % numero)
+            objeto.write_to_stream(buffer)
+            buffer.write(b"\nendobj\n")
+
+        inicio = self.posicao
+        self._escrever(buffer.getvalue())
+        self.offsets.extend(inicio + posicao for posicao in posicoes)
+        self.paginas.extend(sorted(paginas))
+
+    def _renumerar(self, valor: Any, referencia: Callable[[Any], Any], vistos: Set[int]) -> Any:
+        """Troca, no próprio objeto lido, cada referência pela do documento gerado."""
+        generic = self.generic
+        if isinstance(valor, generic.IndirectObject):
+            return referencia(valor)
+        if isinstance(valor, (generic.DictionaryObject, generic.ArrayObject)):
+            # Um mesmo dicionário pode ser compartilhado entre páginas (atributos herdados).
+            if id(valor) in vistos:
+                return valor
+            vistos.add(id(valor))
+        if isinstance(valor, generic.DictionaryObject):
+            for chave in list(valor.keys()):
+                valor[chave] = self._renumerar(valor.raw_get(chave), referencia, vistos)
+        elif isinstance(valor, generic.ArrayObject):
+            for indice, item in enumerate(valor):
+                valor[indice] = self._renumerar(item, referencia, vistos)
+        return valor
+
+    def finalizar(self) -> None:
+        kids = b" ".join(b"%d 0 R" % numero for numero in self.paginas)
+        self.offsets[PAGINAS - 1] = self.posicao
+        self._escrever(b"%d 0 obj\n<</Type/Pages/Kids[%s]/Count %d>>\nendobj\n" % (PAGINAS, kids, len(self.paginas)))
+        self.offsets[CATALOGO - 1] = self.posicao
+        self._escrever(b"%d 0 obj\n<</Type/Catalog/Pages %d 0 R>>\nendobj\n" % (CATALOGO, PAGINAS))
+        inicio_xref = self.posicao
+        self._escrever(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            self._escrever(b"%010d 00000 n \n" % offset)
+        self._escrever(
+            b"trailer\n<</Size %d/Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self.offsets) + 1, CATALOGO, inicio_xref)
+        )
+
+
+def _ler_paginas(pypdf: Any, arquivo: IO[bytes]) -> Any:
+    """Abre o arquivo e confere as páginas: tamanho e conteúdo precisam ser legíveis.
+
+    O arquivo é lido inteiro (um boleto tem poucas dezenas de KB): no modo n-up a
+    página é desenhada depois que a origem já foi fechada.
+    """
+    leitor = pypdf.PdfReader(io.BytesIO(arquivo.read()))
+    if not leitor.pages:
+        raise ValueError("PDF sem páginas")
+    for pagina in leitor.pages:
+        x0, y0, x1, y1 = (float(v) for v in pagina.mediabox)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("página sem tamanho")
+        pagina.get_contents()
+    return leitor
+
+
+def _impor(pypdf: Any, celulas: List[Tuple[str, Any]], por_folha: int, faltando: List[str]) -> Any:
+    """Desenha as páginas de ``celulas`` reduzidas numa folha A4 e devolve a folha lida de volta."""
+    (largura, altura), (colunas, linhas) = LAYOUTS[por_folha]
+    celula_l, celula_a = largura / colunas, altura / linhas
+    escritor = pypdf.PdfWriter()
+    folha = escritor.add_blank_page(largura, altura)
+    for posicao, (rotulo, pagina) in enumerate(celulas):
+        x0, y0, x1, y1 = (float(v) for v in pagina.mediabox)
+        pl, pa = x1 - x0, y1 - y0
+        coluna, linha = posicao % colunas, posicao // colunas
+        escala = min(celula_l / pl, celula_a / pa)
+        tx = coluna * celula_l + (celula_l - pl * escala) / 2 - x0 * escala
+        ty = altura - (linha + 1) * celula_a + (celula_a - pa * escala) / 2 - y0 * escala
+        try:
+            folha.merge_transformed_page(pagina, pypdf.Transformation().scale(escala, escala).translate(tx, ty))
+        except Exception as exc:  # noqa: BLE001 - um PDF ruim não derruba o lote
+            logger.warning("PDF ilegível (%s): %s", rotulo, exc)
+            if rotulo not in faltando:
+                faltando.append(rotulo)
+    saida = io.BytesIO()
+    escritor.write(saida)
+    saida.seek(0)
+    return pypdf.PdfReader(saida)
+
+
+def juntar_pdfs(
+    fontes: Iterable[Fonte],
+    destino: IO[bytes],
+    *,
+    por_folha: int = 1,
+    ao_ler: Optional[Callable[[str, bool], None]] = None,
+) -> List[str]:
+    """Concatena os PDFs de ``fontes`` num só documento, escrito em ``destino`` aos poucos.
+
+    ``fontes`` produz ``(rótulo, arquivo)``; arquivo ``None`` ou ilegível (qualquer
+    erro ao lê-lo) entra numa página final de "não incluídos". ``por_folha`` 2 ou 4
+    reduz as páginas para várias por folha A4. Cada origem é lida uma vez e copiada
+    para ``destino`` antes da próxima: a memória depende do maior arquivo, não do
+    total de páginas. ``ao_ler(rótulo, incluído)`` é chamado para cada origem.
+    Retorna os rótulos não incluídos. Levanta ``ValueError`` para ``por_folha``
+    inválido e ``RuntimeError`` sem ``pypdf``.
+    """
+    if por_folha not in POR_FOLHA:
+        raise ValueError(f"Páginas por folha inválido: {por_folha}.")
+    pypdf = _pypdf()
+    escritor = _EscritorIncremental(pypdf, destino)
+    faltando: List[str] = []
+    celulas: List[Tuple[str, Any]] = []
+
+    def copiar(leitor: Any, rotulos: List[str]) -> bool:
+        try:
+            escritor.copiar(leitor)
+        except Exception as exc:  # noqa: BLE001 - um PDF ruim não derruba o lote
+            logger.warning("PDF ilegível (%s): %s", ", ".join(rotulos), exc)
+            faltando.extend(rotulo for rotulo in rotulos if rotulo not in faltando)
+            return False
+        return True
+
+    def impor(quantidade: int) -> None:
+        lote, celulas[:] = celulas[:quantidade], celulas[quantidade:]
+        rotulos = list(dict.fromkeys(rotulo for rotulo, _ in lote))
+        try:
+            folha = _impor(pypdf, lote, por_folha, faltando)
+        except Exception as exc:  # noqa: BLE001 - um PDF ruim não derruba o lote
+            logger.warning("PDF ilegível (%s): %s", ", ".join(rotulos), exc)
+            faltando.extend(rotulo for rotulo in rotulos if rotulo not in faltando)
+            return
+        copiar(folha, rotulos)
+
+    for rotulo, arquivo in fontes:
+        leitor = None
+        if arquivo is not None:
+            try:
+                leitor = _ler_paginas(pypdf, arquivo)
+            except Exception as exc:  # noqa: BLE001 - um PDF ruim não derruba o lote
+                logger.warning("PDF ilegível (%s): %s", rotulo, exc)
+        if leitor is None:
+            faltando.append(rotulo)
+            incluido = False
+        elif por_folha == 1:
+            incluido = copiar(leitor, [rotulo])
+        else:
+            incluido = True
+            celulas.extend((rotulo, pagina) for pagina in leitor.pages)
+            while len(celulas) >= por_folha:
+                impor(por_folha)
+        if ao_ler:
+            ao_ler(rotulo, incluido)
+
+    if celulas:
+        impor(len(celulas))
+    for inicio in range(0, len(faltando), LINHAS_POR_PAGINA - 2):
+        linhas = ["Boletos sem PDF (não incluídos):", ""] + faltando[inicio:inicio + LINHAS_POR_PAGINA - 2]
+        escritor.copiar(pypdf.PdfReader(io.BytesIO(_pdf_de_texto(linhas))))
+    escritor.finalizar()
+    return faltando
+
+
+def _baixar_faltantes(boletos: List[Boleto]) -> None:
+    """Baixa do Inter, em paralelo, os PDFs que ainda não estão guardados."""
+    faltantes = [b for b in boletos if not b.pdf and (b.nosso_numero or b.codigo_solicitacao)]
+    if not faltantes:
+        return
+    servicos = ServicosInter()
+
+    def baixar(boleto: Boleto) -> bool:
+        try:
+            pdf = buscar_pdf(servicos.para(boleto.conta, exigir_ativa=False), boleto)
+        except Exception as exc:  # noqa: BLE001 - o boleto vai para a lista de não incluídos
+            logger.warning("PDF do boleto %s: %s", boleto.pk, exc)
+            return False
+        if pdf:
+            boleto.guardar_pdf(f"boleto_{boleto.id}.pdf", pdf, gravar=False)
+        return bool(pdf)
+
+    # As threads não tocam no banco: só no Inter e no storage.
+    with ThreadPoolExecutor(max_workers=settings.INTER_EMISSAO_WORKERS, thread_name_prefix="pdf") as executor:
+        baixados = [boleto for boleto, ok in zip(faltantes, executor.map(baixar, faltantes)) if ok]
+    if baixados:
+        Boleto.objects.bulk_update(baixados, ["pdf", "pdf_hash"], batch_size=500)
+
+
+def _fontes(boletos: List[Boleto]) -> Iterator[Fonte]:
+    """Abre um PDF guardado por vez, na ordem dos ``boletos``."""
+    for boleto in boletos:
+        rotulo = f"Boleto {boleto.id} - {boleto.cliente.nome}"
+        if not boleto.pdf:
+            yield rotulo, None
+            continue
+        try:
+            arquivo = boleto.pdf.open("rb")
+        except OSError:
+            yield rotulo, None
+            continue
+        with arquivo:
+            yield rotulo, arquivo
+
+
+def montar_pdf_unico(progresso: Progresso, boleto_ids: List[int], por_folha: int = 1) -> None:
+    """Tarefa ``pdf_unico``: junta os PDFs de ``boleto_ids``, nessa ordem, no arquivo da tarefa.
+
+    Os PDFs que faltam são baixados do Inter antes, em paralelo. O documento vai
+    para um arquivo temporário em disco e depois para ``Tarefa.arquivo``, que a
+    página da tarefa oferece para download.
+    """
+    por_id = Boleto.objects.select_related("cliente", "conta").in_bulk(boleto_ids)
+    boletos = [por_id[boleto_id] for boleto_id in boleto_ids if boleto_id in por_id]
+    _baixar_faltantes(boletos)
+
+    def ao_ler(rotulo: str, incluido: bool) -> None:
+        if incluido:
+            progresso.avancar()
+        else:
+            progresso.avancar(falhou=True, mensagem=f"{rotulo}: sem PDF ou PDF ilegível.", nivel="warning")
+
+    tarefa = progresso.tarefa
+    with tempfile.TemporaryFile() as destino:
+        juntar_pdfs(_fontes(boletos), destino, por_folha=por_folha, ao_ler=ao_ler)
+        destino.seek(0)
+        tarefa.arquivo.save(f"tarefa_{tarefa.pk}.pdf", File(destino), save=False)
+    progresso.gravar(forcar=True, arquivo=tarefa.arquivo.name)
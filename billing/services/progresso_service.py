@@ -0,0 +1,206 @@
+import datetime as dt
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from ..models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre gravações do progresso: o lote não espera o banco a cada item.
+INTERVALO_GRAVACAO = 1.0
+# A vazão é medida nessa janela (segundos), para refletir uma lentidão do banco logo.
+JANELA_VAZAO = 30.0
+# Sem avanço por esse tempo (segundos), a tarefa aparece como parada.
+SEM_PROGRESSO = 30.0
+# Rodando sem avanço por esse tempo: o worker morreu (deploy, OOM) e a tarefa é encerrada.
+TAREFA_ABANDONADA = dt.timedelta(minutes=15)
+LIMITE_MENSAGENS = 200
+# Arquivos gerados pelas tarefas (PDF único) ficam disponíveis para download por esse tempo.
+RETENCAO_ARQUIVOS = dt.timedelta(days=2)
+
+
+class Progresso:
+    """Acumula o avanço de uma ``Tarefa`` em memória e grava no máximo a cada ``INTERVALO_GRAVACAO``."""
+
+    def __init__(self, tarefa: Tarefa) -> None:
+        self.tarefa = tarefa
+        self.total = tarefa.total
+        self.processados = 0
+        self.falhas = 0
+        self.mensagens: List[List[str]] = []
+        self._amostras: Deque[Tuple[float, int]] = deque([(time.monotonic(), 0)])
+        self._gravado_em = 0.0
+        self._lock = threading.Lock()
+
+    def somar_total(self, quantidade: int) -> None:
+        with self._lock:
+            self.total += quantidade
+        self.gravar(forcar=True)
+
+    def avisar(self, mensagem: str, nivel: str = "info") -> None:
+        with self._lock:
+            if len(self.mensagens) < LIMITE_MENSAGENS:
+                self.mensagens.append([nivel, mensagem])
+
+    def avancar(self, quantidade: int = 1, *, falhou: bool = False, mensagem: str = "", nivel: str = "info") -> None:
+        if mensagem:
+            self.avisar(mensagem, nivel)
+        with self._lock:
+            self.processados += quantidade
+            if falhou:
+                self.falhas += quantidade
+            agora = time.monotonic()
+            self._amostras.append((agora, self.processados))
+            while len(self._amostras) > 2 and agora - self._amostras[1][0] > JANELA_VAZAO:
+                self._amostras.popleft()
+        self.gravar()
+
+    def vazao(self) -> float:
+        """Itens por segundo na janela recente."""
+        (inicio, feitos_inicio), (fim, feitos_fim) = self._amostras[0], self._amostras[-1]
+        if fim <= inicio:
+            return 0.0
+        return (feitos_fim - feitos_inicio) / (fim - inicio)
+
+    def gravar(self, *, forcar: bool = False, **campos: Any) -> None:
+        agora = time.monotonic()
+        if not forcar and agora - self._gravado_em < INTERVALO_GRAVACAO:
+            return
+        with self._lock:
+            self._gravado_em = agora
+            valores = {
+                "total": max(self.total, self.processados),
+                "processados": self.processados,
+                "falhas": self.falhas,
+                "vazao": round(self.vazao(), 3),
+                "mensagens": list(self.mensagens),
+                "atualizada_em": timezone.now(),
+            }
+        valores.update(campos)
+        Tarefa.objects.filter(pk=self.tarefa.pk).update(**valores)
+
+    def concluir(self, erro: str = "") -> None:
+        self.gravar(
+            forcar=True,
+            status="falhou" if erro else "concluida",
+            erro=erro,
+            finalizada_em=timezone.now(),
+        )
+
+
+def enfileirar_tarefa(
+    tipo: str,
+    descricao: str,
+    parametros: Dict[str, Any],
+    *,
+    total: int = 0,
+    criado_por: str = "",
+) -> Tarefa:
+    """Grava a ``Tarefa`` pendente; o worker ``processar_fila tarefas`` a executa.
+
+    Nada roda no processo web: um worker do gunicorn reciclado ou reiniciado não
+    interrompe o lote. ``parametros`` precisa ser serializável em JSON.
+    """
+    return Tarefa.objects.create(
+        tipo=tipo, descricao=descricao[:150], parametros=parametros, total=total, criado_por=criado_por
+    )
+
+
+def pegar_tarefa(worker: str) -> Optional[Tarefa]:
+    """Passa a tarefa pendente mais antiga para ``rodando`` em nome de ``worker``.
+
+    A troca de status é condicional: com vários workers, só um deles fica com a tarefa.
+    """
+    while True:
+        tarefa = Tarefa.objects.filter(status="pendente").order_by("id").first()
+        if tarefa is None:
+            return None
+        agora = timezone.now()
+        campos = {"status": "rodando", "worker": worker, "iniciada_em": agora, "atualizada_em": agora}
+        if Tarefa.objects.filter(pk=tarefa.pk, status="pendente").update(**campos):
+            for campo, valor in campos.items():
+                setattr(tarefa, campo, valor)
+            return tarefa
+
+
+def executar_tarefa(tarefa: Tarefa, funcao: Callable[..., None]) -> bool:
+    """Roda ``funcao(progresso, **tarefa.parametros)`` e encerra a tarefa.
+
+    Um erro não tratado encerra a tarefa como ``falhou`` com a mensagem. Retorna
+    se a tarefa foi concluída.
+    """
+    progresso = Progresso(tarefa)
+    try:
+        funcao(progresso, **tarefa.parametros)
+    except Exception as exc:  # noqa: BLE001 - registrado na própria tarefa
+        logger.exception("Tarefa %s (%s) falhou.", tarefa.pk, tarefa.descricao)
+        progresso.concluir(erro=str(exc) or exc.__class__.__name__)
+        return False
+    progresso.concluir()
+    return True
+
+
+def encerrar_abandonadas(limite: dt.timedelta = TAREFA_ABANDONADA) -> int:
+    """Marca como ``falhou`` as tarefas ``rodando`` sem avanço há mais de ``limite``.
+
+    O que elas deixaram pela metade não se perde: boletos ``novo`` sem intenção de
+    emissão voltam para a fila de emissão e para a próxima geração da competência.
+    """
+    agora = timezone.now()
+    return Tarefa.objects.filter(status="rodando", atualizada_em__lt=agora - limite).update(
+        status="falhou",
+        erro="Interrompida: o worker parou sem concluir a tarefa. Gere ou retente novamente o que faltou.",
+        finalizada_em=agora,
+    )
+
+
+def expurgar_arquivos(limite: dt.timedelta = RETENCAO_ARQUIVOS) -> int:
+    """Apaga os arquivos das tarefas finalizadas há mais de ``limite``. Retorna quantos."""
+    antigas = Tarefa.objects.filter(finalizada_em__lt=timezone.now() - limite).exclude(arquivo="")
+    apagados = 0
+    for tarefa in antigas.only("id", "arquivo"):
+        tarefa.arquivo.delete(save=False)
+        Tarefa.objects.filter(pk=tarefa.pk).update(arquivo="")
+        apagados += 1
+    return apagados
+
+
+def estado_tarefa(tarefa: Tarefa) -> Dict[str, Any]:
+    """Progresso para a página e para os endpoints JSON/SSE: feitos, falhas, restantes, vazão e ETA."""
+    agora = timezone.now()
+    restantes = max(tarefa.total - tarefa.processados, 0)
+    na_fila = tarefa.status == "pendente"
+    rodando = na_fila or tarefa.status == "rodando"
+    sem_progresso = (agora - tarefa.atualizada_em).total_seconds() if rodando else 0.0
+    parada = rodando and sem_progresso > SEM_PROGRESSO
+    eta: Optional[int] = None
+    if rodando and not parada and tarefa.vazao > 0:
+        eta = round(restantes / tarefa.vazao)
+    fim = tarefa.finalizada_em or agora
+    return {
+        "id": tarefa.pk,
+        "tipo": tarefa.tipo,
+        "descricao": tarefa.descricao,
+        "status": tarefa.status,
+        "na_fila": na_fila,
+        "finalizada": not rodando,
+        "total": tarefa.total,
+        "processados": tarefa.processados,
+        "concluidos": tarefa.processados - tarefa.falhas,
+        "falhas": tarefa.falhas,
+        "restantes": restantes,
+        "percentual": round(100 * tarefa.processados / tarefa.total, 1) if tarefa.total else (0.0 if rodando else 100.0),
+        "vazao": tarefa.vazao,
+        "eta_segundos": eta,
+        "decorrido_segundos": round((fim - tarefa.iniciada_em).total_seconds()),
+        "sem_progresso_segundos": round(sem_progresso),
+        "parada": parada,
+        "mensagens": tarefa.mensagens,
+        "erro": tarefa.erro,
+        "arquivo": bool(tarefa.arquivo),
+    }
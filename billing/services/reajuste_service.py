@@ -0,0 +1,159 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, QuerySet, Subquery, Value, When
+
+from ..models import Boleto, Cliente, IntencaoEmissao, Reajuste, ReajusteItem
+from .resumo_service import estado_boleto, registrar_transicoes
+
+CENTAVO = Decimal("0.01")
+TAMANHO_LOTE = 2000
+# Boletos que ainda não foram ao banco e podem receber o valor novo.
+STATUS_NAO_EMITIDOS = ("novo", "erro")
+
+
+@dataclass
+class PrevisaoReajuste:
+    fator: Decimal
+    quantidade: int = 0
+    total_anterior: Decimal = Decimal("0.00")
+    total_novo: Decimal = Decimal("0.00")
+    # (valor anterior, valor novo, clientes), do maior grupo para o menor.
+    valores: List[Tuple[Decimal, Decimal, int]] = field(default_factory=list)
+    boletos: int = 0
+    reajuste: Optional[Reajuste] = None
+
+
+def fator_reajuste(percentual: Optional[Decimal] = None, indices: Iterable[Decimal] = ()) -> Decimal:
+    """Fator multiplicativo de um percentual único ou de índices mensais compostos (ex.: IGP-M)."""
+    fator = Decimal(1)
+    if percentual is not None:
+        fator *= 1 + Decimal(percentual) / 100
+    for indice in indices:
+        fator *= 1 + Decimal(indice) / 100
+    if fator <= 0:
+        raise ValueError(f"Reajuste inválido: fator {fator}.")
+    return fator.quantize(Decimal("0.00000001"), ROUND_HALF_UP)
+
+
+def valor_reajustado(valor: Decimal, fator: Decimal) -> Decimal:
+    return (valor * fator).quantize(CENTAVO, ROUND_HALF_UP)
+
+
+def _sem_emissao(queryset: QuerySet) -> QuerySet:
+    """Boletos não emitidos e sem intenção pendente/confirmada: o valor ainda pode mudar."""
+    em_andamento = IntencaoEmissao.objects.filter(boleto=OuterRef("pk"), status__in=["pendente", "confirmada"])
+    return queryset.filter(status__in=STATUS_NAO_EMITIDOS).exclude(Exists(em_andamento))
+
+
+def _boletos_a_regerar(clientes: QuerySet, a_partir: Tuple[int, int]) -> QuerySet:
+    ano, mes = a_partir
+    return _sem_emissao(
+        Boleto.objects.filter(cliente__in=clientes).filter(
+            Q(competencia_ano__gt=ano) | Q(competencia_ano=ano, competencia_mes__gte=mes)
+        )
+    )
+
+
+def reajustar_clientes(
+    clientes: QuerySet,
+    fator: Decimal,
+    *,
+    descricao: str,
+    filtro: str = "",
+    simular: bool = False,
+    regerar_a_partir: Optional[Tuple[int, int]] = None,
+    criado_por: str = "",
+) -> PrevisaoReajuste:
+    """Aplica ``fator`` ao ``valorNominal`` dos ``clientes`` numa única transação.
+
+    Os valores novos são calculados em ``Decimal`` (arredondamento comercial, meio
+    centavo para cima) por valor distinto e gravados num só UPDATE com ``CASE``,
+    sem depender do arredondamento do banco. Cada cliente fica registrado em
+    ``ReajusteItem``. Com ``regerar_a_partir=(ano, mes)``, boletos ainda não emitidos
+    dessas competências em diante passam a ter o valor novo.
+    """
+    previsao = PrevisaoReajuste(fator=fator)
+    with transaction.atomic():
+        # Lê (e trava) os valores atuais uma vez: serve à prévia e à trilha de auditoria.
+        atuais = list(clientes.select_for_update(of=("self",)).values_list("id", "valorNominal"))
+        contagem = Counter(valor for _, valor in atuais)
+        novos: Dict[Decimal, Decimal] = {}
+        for anterior, quantidade in contagem.most_common():
+            novo = novos[anterior] = valor_reajustado(anterior, fator)
+            previsao.valores.append((anterior, novo, quantidade))
+            previsao.total_anterior += anterior * quantidade
+            previsao.total_novo += novo * quantidade
+        previsao.quantidade = len(atuais)
+
+        boletos: List[Boleto] = []
+        if regerar_a_partir:
+            # Trava os boletos: a emissão trava o mesmo boleto para gravar a intenção
+            # (emissao_service._reservar_intencao), então nenhum vai ao Inter no meio.
+            boletos = list(
+                _boletos_a_regerar(clientes, regerar_a_partir)
+                .select_for_update(of=("self",))
+                .only("id", "cliente", "competencia_ano", "competencia_mes", "data_vencimento", "status", "valor")
+            )
+            previsao.boletos = len(boletos)
+        if simular or not novos:
+            return previsao
+
+        clientes.update(
+            valorNominal=Case(
+                *[When(valorNominal=anterior, then=Value(novo)) for anterior, novo in novos.items()],
+                default=F("valorNominal"),
+            )
+        )
+        if boletos:
+            previsao.boletos = _regerar_boletos(boletos)
+        reajuste = Reajuste.objects.create(
+            descricao=descricao,
+            fator=fator,
+            filtro=filtro,
+            quantidade=previsao.quantidade,
+            total_anterior=previsao.total_anterior,
+            total_novo=previsao.total_novo,
+            boletos_atualizados=previsao.boletos,
+            criado_por=criado_por,
+        )
+        ReajusteItem.objects.bulk_create(
+            (
+                ReajusteItem(reajuste=reajuste, cliente_id=cliente_id, valor_anterior=valor, valor_novo=novos[valor])
+                for cliente_id, valor in atuais
+            ),
+            batch_size=TAMANHO_LOTE,
+        )
+        previsao.reajuste = reajuste
+    return previsao
+
+
+def _regerar_boletos(boletos: List[Boleto]) -> int:
+    """Grava o valor novo nos ``boletos`` ainda sem emissão. Retorna quantos o UPDATE alterou.
+
+    O UPDATE repete o filtro de ``_boletos_a_regerar``: um boleto que ganhou intenção de
+    emissão depois da leitura fica com o valor enviado ao Inter. O rollup só recebe as
+    transições dos boletos cujo valor de fato mudou.
+    """
+    # O cliente já foi atualizado: o valor novo vem dele, num UPDATE por lote de ids.
+    valor_cliente = Subquery(Cliente.objects.filter(pk=OuterRef("cliente_id")).values("valorNominal")[:1])
+    atuais: Dict[int, Decimal] = {}
+    alterados = 0
+    for inicio in range(0, len(boletos), TAMANHO_LOTE):
+        ids = [boleto.pk for boleto in boletos[inicio:inicio + TAMANHO_LOTE]]
+        alterados += _sem_emissao(Boleto.objects.filter(pk__in=ids)).update(valor=valor_cliente)
+        atuais.update(Boleto.objects.filter(pk__in=ids).values_list("pk", "valor"))
+    transicoes = []
+    for boleto in boletos:
+        if atuais[boleto.pk] == boleto.valor:
+            continue
+        anterior = estado_boleto(boleto)
+        boleto.valor = atuais[boleto.pk]
+        transicoes.append((anterior, estado_boleto(boleto)))
+        boleto._estado_resumo = transicoes[-1][1]
+    # update() não dispara os sinais: atualiza o rollup aqui.
+    registrar_transicoes(transicoes)
+    return alterados
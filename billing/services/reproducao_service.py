@@ -0,0 +1,182 @@
+import base64
+import datetime as dt
+import json
+import re
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Segmentos de caminho que são identificadores (códigos de solicitação, nosso número):
+# no mock, /cobrancas/<qualquer>/pdf responde com as gravações do mesmo endpoint.
+_IDENTIFICADOR = re.compile(r"^(?=.*\d)[\w-]{8,}$")
+
+
+def rota(metodo: str, url: str) -> Tuple[str, str]:
+    partes = ["*" if _IDENTIFICADOR.match(parte) else parte for parte in urlsplit(url).path.split("/")]
+    return metodo.upper(), "/".join(partes)
+
+
+def _conteudo_gravado(corpo: Any) -> Any:
+    # PDFs não ficam no arquivo (só tamanho e hash): o mock devolve um do mesmo tamanho.
+    if isinstance(corpo, dict):
+        if corpo.get("omitido") == "arquivo":
+            return base64.b64encode(b"%PDF" + bytes(max(corpo.get("tamanho", 0) - 4, 0))).decode()
+        return {chave: _conteudo_gravado(valor) for chave, valor in corpo.items()}
+    if isinstance(corpo, list):
+        return [_conteudo_gravado(valor) for valor in corpo]
+    return corpo
+
+
+class ServidorMock(ThreadingHTTPServer):
+    """Servidor HTTP local que responde com as respostas gravadas de cada endpoint, em rodízio.
+
+    Com ``com_latencia`` cada resposta espera o tempo que o Inter levou na gravação.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, registros: Iterable[Dict[str, Any]], *, com_latencia: bool = False, porta: int = 0) -> None:
+        self.respostas: Dict[Tuple[str, str], Deque[Tuple[int, str, bytes, float]]] = defaultdict(deque)
+        self.com_latencia = com_latencia
+        self._lock = threading.Lock()
+        for registro in registros:
+            resposta = registro.get("resposta")
+            if not resposta:
+                continue
+            corpo = _conteudo_gravado(resposta.get("corpo"))
+            conteudo = corpo.encode() if isinstance(corpo, str) else json.dumps(corpo).encode() if corpo is not None else b""
+            self.respostas[rota(registro["metodo"], registro["url"])].append(
+                (resposta["status"], resposta.get("content_type") or "application/json", conteudo, registro.get("ms", 0) / 1000)
+            )
+        super().__init__(("127.0.0.1", porta), _ManipuladorMock)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def proxima(self, metodo: str, caminho: str) -> Optional[Tuple[int, str, bytes, float]]:
+        with self._lock:
+            fila = self.respostas.get(rota(metodo, caminho))
+            if not fila:
+                return None
+            fila.rotate(-1)
+            return fila[-1]
+
+
+class _ManipuladorMock(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em writes separados: sem isso o keep-alive espera o ACK atrasado (~40 ms).
+    disable_nagle_algorithm = True
+
+    def _responder(self) -> None:
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho:
+            self.rfile.read(tamanho)
+        gravada = self.server.proxima(self.command, self.path)
+        status, tipo, conteudo, espera = gravada or (404, "application/json", json.dumps({"title": "sem gravação"}).encode(), 0.0)
+        if self.server.com_latencia and espera:
+            time.sleep(espera)
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _responder
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@dataclass
+class RelatorioReproducao:
+    total: int = 0
+    erros: int = 0
+    # Respostas com status diferente do gravado.
+    divergentes: int = 0
+    status: Counter = field(default_factory=Counter)
+    latencias: List[float] = field(default_factory=list)
+    duracao: float = 0.0
+
+    def percentil(self, p: float) -> float:
+        if not self.latencias:
+            return 0.0
+        if len(self.latencias) == 1:
+            return self.latencias[0]
+        return statistics.quantiles(self.latencias, n=100, method="inclusive")[int(p) - 1]
+
+    @property
+    def vazao(self) -> float:
+        return self.total / self.duracao if self.duracao else 0.0
+
+
+def reproduzir(
+    registros: List[Dict[str, Any]],
+    alvo: str,
+    *,
+    workers: int = 4,
+    ritmo: float = 0.0,
+) -> RelatorioReproducao:
+    """Reenvia as requisições gravadas para ``alvo`` (URL base de um mock) e mede o resultado.
+
+    ``ritmo`` 0 envia o mais rápido possível; 1.0 respeita os intervalos originais
+    (2.0 = duas vezes mais rápido). Segredos não estão no arquivo, então o
+    ``Authorization`` enviado é fictício.
+    """
+    import requests
+
+    relatorio = RelatorioReproducao()
+    if not registros:
+        return relatorio
+    base = alvo.rstrip("/")
+    sessao = requests.Session()
+    sessao.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=workers))
+    lock = threading.Lock()
+
+    def enviar(registro: Dict[str, Any]) -> None:
+        requisicao = registro.get("requisicao") or {}
+        partes = urlsplit(registro["url"])
+        headers = dict(requisicao.get("headers") or {})
+        headers["Authorization"] = "Bearer reproducao"
+        inicio = time.perf_counter()
+        try:
+            response = sessao.request(
+                registro["metodo"],
+                base + partes.path + (f"?{partes.query}" if partes.query else ""),
+                headers=headers,
+                json=requisicao.get("json"),
+                data=requisicao.get("data"),
+                params=requisicao.get("params"),
+                timeout=30,
+            )
+        except requests.RequestException:
+            with lock:
+                relatorio.erros += 1
+            return
+        latencia = (time.perf_counter() - inicio) * 1000
+        gravado = (registro.get("resposta") or {}).get("status")
+        with lock:
+            relatorio.latencias.append(latencia)
+            relatorio.status[response.status_code] += 1
+            if gravado is not None and gravado != response.status_code:
+                relatorio.divergentes += 1
+
+    instantes = [dt.datetime.fromisoformat(registro["em"]) for registro in registros]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reproducao") as executor:
+        for registro, instante in zip(registros, instantes):
+            if ritmo > 0:
+                atraso = (instante - instantes[0]).total_seconds() / ritmo - (time.perf_counter() - inicio)
+                if atraso > 0:
+                    time.sleep(atraso)
+            executor.submit(enviar, registro)
+    relatorio.duracao = time.perf_counter() - inicio
+    relatorio.total = len(relatorio.latencias) + relatorio.erros
+    relatorio.latencias.sort()
+    return relatorio
@@ -0,0 +1,241 @@
+import datetime as dt
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from ..models import Boleto
+from .emissao_service import aguardando_emissao, buscar_pdf, emitir_lote, gerar_em_lotes, retentar_em_lote
+from .inter_service import ServicosInter
+from .pdf_service import montar_pdf_unico
+from .progresso_service import Progresso, encerrar_abandonadas, executar_tarefa, expurgar_arquivos, pegar_tarefa
+
+logger = logging.getLogger(__name__)
+
+EMISSAO = "emissao"
+PDF = "pdf"
+# Tarefas gravadas pela interface (geração, retentativa, PDF único); ver progresso_service.
+TAREFAS = "tarefas"
+# Resultados da fila de PDFs (a de emissão usa os de emissao_service).
+BAIXADO = "baixado"
+SEM_PDF = "sem_pdf"
+# Falha ao baixar o PDF: o boleto fica fora da fila por esse tempo, para não voltar
+# ao próximo lote (de qualquer worker) enquanto o Inter não tiver o arquivo.
+ESPERA_PDF = dt.timedelta(minutes=10)
+
+
+def identificador_worker() -> str:
+    """Nome único do worker: máquina, processo e um sufixo aleatório."""
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _livres(agora: dt.datetime) -> Q:
+    return Q(reservado_ate__isnull=True) | Q(reservado_ate__lt=agora)
+
+
+def elegiveis(tipo: str) -> QuerySet:
+    """Boletos que um worker de ``tipo`` pode pegar, ignorando reservas."""
+    if tipo == EMISSAO:
+        return aguardando_emissao()
+    if tipo == PDF:
+        return (
+            Boleto.objects.filter(status="emitido")
+            .filter(Q(pdf="") | Q(pdf__isnull=True))
+            .exclude(nosso_numero="", codigo_solicitacao="")
+        )
+    raise ValueError(f"Tipo de fila desconhecido: {tipo}")
+
+
+def reservar_boletos(tipo: str, worker: str, quantidade: int, duracao: dt.timedelta) -> List[Boleto]:
+    """Reserva até ``quantidade`` boletos livres (ou com reserva vencida) para ``worker``.
+
+    No PostgreSQL (e outros bancos com ``SKIP LOCKED``) os candidatos são travados
+    com ``SELECT ... FOR UPDATE SKIP LOCKED``: workers concorrentes pegam lotes
+    disjuntos sem esperar uns pelos outros. No SQLite, o UPDATE repete a condição
+    de livre (compare-and-set), e só ficam os que este worker conseguiu marcar.
+    """
+    agora = timezone.now()
+    expira = agora + duracao
+    candidatos = elegiveis(tipo).filter(_livres(agora)).order_by("id")
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                candidatos.select_for_update(skip_locked=True, of=("self",)).values_list("id", flat=True)[:quantidade]
+            )
+            Boleto.objects.filter(id__in=ids).update(reservado_por=worker, reservado_ate=expira)
+    else:
+        ids = list(candidatos.values_list("id", flat=True)[:quantidade])
+        Boleto.objects.filter(_livres(agora), id__in=ids).update(reservado_por=worker, reservado_ate=expira)
+    if not ids:
+        return []
+    return list(
+        Boleto.objects.filter(id__in=ids, reservado_por=worker, reservado_ate=expira)
+        .select_related("cliente__conta", "conta")
+        .order_by("id")
+    )
+
+
+def renovar_reservas(worker: str, duracao: dt.timedelta) -> int:
+    """Heartbeat: estende as reservas ainda válidas do worker.
+
+    Boletos adiados por ``liberar_reservas(..., ate=...)`` não têm mais ``reservado_por``
+    e, portanto, não são renovados: voltam à fila quando o adiamento vence.
+    """
+    agora = timezone.now()
+    return Boleto.objects.filter(reservado_por=worker, reservado_ate__gte=agora).update(reservado_ate=agora + duracao)
+
+
+def liberar_reservas(worker: str, ids: List[int], *, ate: Optional[dt.datetime] = None) -> int:
+    """Devolve os boletos; com ``ate`` eles só voltam à fila depois disso (adiamento).
+
+    O adiamento não pertence a nenhum worker: fica só o horário em ``reservado_ate``,
+    que ``reservar_boletos`` respeita e o heartbeat de ``worker`` não estende.
+    """
+    return Boleto.objects.filter(id__in=ids, reservado_por=worker).update(reservado_por="", reservado_ate=ate)
+
+
+class Batimento:
+    """Thread que renova as reservas do worker a cada terço da duração."""
+
+    def __init__(self, worker: str, duracao: dt.timedelta) -> None:
+        self.worker = worker
+        self.duracao = duracao
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, name=f"batimento-{worker}", daemon=True)
+
+    def __enter__(self) -> "Batimento":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._parar.set()
+        self._thread.join()
+
+    def _rodar(self) -> None:
+        intervalo = self.duracao.total_seconds() / 3
+        try:
+            while not self._parar.wait(intervalo):
+                try:
+                    renovar_reservas(self.worker, self.duracao)
+                except Exception:  # noqa: BLE001 - tenta de novo no próximo batimento
+                    logger.exception("Falha ao renovar as reservas de %s.", self.worker)
+        finally:
+            connection.close()
+
+
+def _emitir(worker: str, boletos: List[Boleto], contagem: Counter, workers: Optional[int]) -> None:
+    for _, resultado in emitir_lote(None, boletos, workers=workers):
+        contagem[resultado.situacao] += 1
+    liberar_reservas(worker, [boleto.pk for boleto in boletos])
+
+
+def _baixar_pdfs(worker: str, boletos: List[Boleto], contagem: Counter, workers: Optional[int]) -> None:
+    servicos = ServicosInter()
+
+    def baixar(boleto: Boleto) -> bool:
+        try:
+            pdf = buscar_pdf(servicos.para(boleto.conta, exigir_ativa=False), boleto)
+        except Exception as exc:  # noqa: BLE001 - tenta de novo depois de ESPERA_PDF
+            logger.warning("PDF do boleto %s: %s", boleto.pk, exc)
+            return False
+        if pdf:
+            boleto.guardar_pdf(f"boleto_{boleto.id}.pdf", pdf, gravar=False)
+        return bool(pdf)
+
+    # As threads não tocam no banco: só no Inter e no storage.
+    with ThreadPoolExecutor(max_workers=workers or settings.INTER_EMISSAO_WORKERS, thread_name_prefix="pdf") as executor:
+        baixados = list(executor.map(baixar, boletos))
+    ok = [boleto for boleto, baixado in zip(boletos, baixados) if baixado]
+    falhas = [boleto.pk for boleto, baixado in zip(boletos, baixados) if not baixado]
+    if ok:
+        Boleto.objects.bulk_update(ok, ["pdf", "pdf_hash"])
+        liberar_reservas(worker, [boleto.pk for boleto in ok])
+    if falhas:
+        liberar_reservas(worker, falhas, ate=timezone.now() + ESPERA_PDF)
+    contagem[BAIXADO] += len(ok)
+    contagem[SEM_PDF] += len(falhas)
+
+
+PROCESSADORES: Dict[str, Callable[[str, List[Boleto], Counter, Optional[int]], None]] = {
+    EMISSAO: _emitir,
+    PDF: _baixar_pdfs,
+}
+# Tarefa.tipo -> função chamada com (progresso, **Tarefa.parametros).
+EXECUTORES: Dict[str, Callable[..., None]] = {
+    "emissao": gerar_em_lotes,
+    "retentativa": retentar_em_lote,
+    "pdf_unico": montar_pdf_unico,
+}
+
+
+def _tipo_desconhecido(progresso: Progresso, **parametros: Any) -> None:
+    raise ValueError(f"Tipo de tarefa desconhecido: {progresso.tarefa.tipo}")
+
+
+def _processar_tarefas(worker: str, continuo: bool, intervalo: float, parar: threading.Event) -> Counter:
+    contagem: Counter = Counter()
+    while not parar.is_set():
+        encerrar_abandonadas()
+        expurgar_arquivos()
+        tarefa = pegar_tarefa(worker)
+        if tarefa is None:
+            if not continuo:
+                break
+            parar.wait(intervalo)
+            continue
+        executor = EXECUTORES.get(tarefa.tipo, _tipo_desconhecido)
+        contagem["concluida" if executar_tarefa(tarefa, executor) else "falhou"] += 1
+    return contagem
+
+
+def processar_fila(
+    tipo: str,
+    *,
+    worker: Optional[str] = None,
+    lote: Optional[int] = None,
+    duracao: Optional[dt.timedelta] = None,
+    workers: Optional[int] = None,
+    continuo: bool = False,
+    intervalo: float = 10.0,
+    parar: Optional[threading.Event] = None,
+) -> Counter:
+    """Processa a fila ``tipo`` (``emissao`` ou ``pdf``) em lotes reservados.
+
+    ``tarefas`` executa, uma a uma, as tarefas que a interface deixou pendentes e
+    encerra como ``falhou`` as que ficaram ``rodando`` num worker que morreu.
+
+    Vários processos, em máquinas diferentes, podem rodar contra o mesmo banco: cada
+    lote é reservado por ``duracao`` e renovado por um heartbeat enquanto o worker
+    vive. Se ele morrer, a reserva vence e outro worker retoma os boletos. A emissão
+    em si continua protegida pela ``IntencaoEmissao``, então uma reserva vencida no
+    meio do lote nunca emite duas vezes. Sem ``continuo``, para quando a fila esvazia.
+    """
+    if tipo not in PROCESSADORES and tipo != TAREFAS:
+        raise ValueError(f"Tipo de fila desconhecido: {tipo}")
+    worker = worker or identificador_worker()
+    lote = lote or settings.FILA_LOTE
+    duracao = duracao or dt.timedelta(seconds=settings.FILA_DURACAO_RESERVA)
+    parar = parar or threading.Event()
+    if tipo == TAREFAS:
+        return _processar_tarefas(worker, continuo, intervalo, parar)
+    contagem: Counter = Counter()
+    with Batimento(worker, duracao):
+        while not parar.is_set():
+            boletos = reservar_boletos(tipo, worker, lote, duracao)
+            if not boletos:
+                if not continuo:
+                    break
+                parar.wait(intervalo)
+                continue
+            PROCESSADORES[tipo](worker, boletos, contagem, workers)
+    return contagem
+
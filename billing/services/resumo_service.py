@@ -0,0 +1,403 @@
+import datetime as dt
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum
+
+from ..models import Boleto, Cliente, ResumoCliente, ResumoRecebiveis
+
+ZERO = Decimal("0.00")
+
+
+class EstadoBoleto(NamedTuple):
+    """Campos de um boleto que determinam em qual linha do rollup ele é contado."""
+
+    cliente_id: int
+    competencia_ano: int
+    competencia_mes: int
+    data_vencimento: dt.date
+    status: str
+    valor: Decimal
+
+
+def estado_boleto(boleto: Boleto) -> Optional[EstadoBoleto]:
+    # Lê direto de ``__dict__`` para não disparar consultas em campos adiados.
+    campos = boleto.__dict__
+    if boleto.pk is None or any(campos.get(nome) is None for nome in EstadoBoleto._fields):
+        return None
+    return EstadoBoleto(
+        campos["cliente_id"],
+        int(campos["competencia_ano"]),
+        int(campos["competencia_mes"]),
+        campos["data_vencimento"],
+        campos["status"],
+        Decimal(campos["valor"]),
+    )
+
+
+def _ufs_clientes(cliente_ids: Iterable[int]) -> Dict[int, str]:
+    ids = {cid for cid in cliente_ids if cid is not None}
+    if not ids:
+        return {}
+    return dict(Cliente.objects.filter(id__in=ids).values_list("id", "uf"))
+
+
+def _somar(modelo, chave: Dict[str, Any], quantidade: int, valor: Decimal) -> None:
+    atualizados = modelo.objects.filter(**chave).update(
+        quantidade=F("quantidade") + quantidade,
+        valor_total=F("valor_total") + valor,
+    )
+    if atualizados or quantidade <= 0:
+        # Decrementos nunca criam linhas: a linha já existe ou está sendo removida em cascata.
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, quantidade=quantidade, valor_total=valor)
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT.
+        modelo.objects.filter(**chave).update(
+            quantidade=F("quantidade") + quantidade,
+            valor_total=F("valor_total") + valor,
+        )
+
+
+CHAVE_RECEBIVEIS = ("competencia_ano", "competencia_mes", "data_vencimento", "uf", "status")
+CHAVE_CLIENTE = ("cliente_id", "status")
+
+
+def _atualizar_lote(modelo, campos: tuple, atualizar: List[tuple]) -> None:
+    # Muitas linhas costumam receber o mesmo delta (ex.: N boletos de mesmo valor pagos):
+    # agrupa pela coluna mais variada e faz um UPDATE ... IN por grupo em vez de um CASE
+    # por linha. Se os deltas forem quase todos distintos, volta ao ``bulk_update``.
+    variavel = max(range(len(campos)), key=lambda i: len({chave[i] for chave, *_ in atualizar}))
+    grupos: Dict[tuple, List] = defaultdict(list)
+    for chave, quantidade, valor, _ in atualizar:
+        fixos = tuple(v for i, v in enumerate(chave) if i != variavel)
+        grupos[(quantidade, valor, fixos)].append(chave[variavel])
+    if len(grupos) * 10 > len(atualizar):
+        modelo.objects.bulk_update(
+            [linha for *_, linha in atualizar], ["quantidade", "valor_total"], batch_size=500
+        )
+        return
+    outros = [campo for i, campo in enumerate(campos) if i != variavel]
+    for (quantidade, valor, fixos), valores in grupos.items():
+        modelo.objects.filter(**dict(zip(outros, fixos)), **{f"{campos[variavel]}__in": valores}).update(
+            quantidade=F("quantidade") + quantidade,
+            valor_total=F("valor_total") + valor,
+        )
+
+
+def _somar_lote(modelo, campos: tuple, deltas: Dict[tuple, List]) -> None:
+    """Aplica vários ``(quantidade, valor)`` de uma vez: uma leitura, um UPDATE e um INSERT."""
+    deltas = {chave: d for chave, d in deltas.items() if d[0] or d[1]}
+    if len(deltas) == 1:
+        (chave, (quantidade, valor)), = deltas.items()
+        _somar(modelo, dict(zip(campos, chave)), quantidade, valor)
+        return
+    if not deltas:
+        return
+
+    # O filtro por conjunto em cada coluna traz um superconjunto; o casamento exato é feito aqui.
+    filtro = {f"{campo}__in": {chave[i] for chave in deltas} for i, campo in enumerate(campos)}
+    existentes = {
+        tuple(getattr(linha, campo) for campo in campos): linha for linha in modelo.objects.filter(**filtro)
+    }
+    atualizar, criar = [], []
+    for chave, (quantidade, valor) in deltas.items():
+        linha = existentes.get(chave)
+        if linha is not None:
+            linha.quantidade = F("quantidade") + quantidade
+            linha.valor_total = F("valor_total") + valor
+            atualizar.append((chave, quantidade, valor, linha))
+        elif quantidade > 0:
+            criar.append(modelo(**dict(zip(campos, chave)), quantidade=quantidade, valor_total=valor))
+    if atualizar:
+        _atualizar_lote(modelo, campos, atualizar)
+    if criar:
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create(criar, batch_size=500)
+        except IntegrityError:
+            # Outra transação criou alguma das linhas: volta ao caminho linha a linha.
+            for linha in criar:
+                chave = {campo: getattr(linha, campo) for campo in campos}
+                _somar(modelo, chave, linha.quantidade, linha.valor_total)
+
+
+_acumulado = threading.local()
+
+
+@contextmanager
+def acumular_transicoes(ufs: Optional[Dict[int, str]] = None) -> Iterator[None]:
+    """Agrupa as transições registradas dentro do bloco e aplica tudo de uma vez no fim.
+
+    Útil quando o ORM dispara um sinal por boleto (exclusão em cascata, laços de
+    ``save()``). ``ufs`` informa a UF de clientes que não existirão mais na saída.
+    """
+    if getattr(_acumulado, "pares", None) is not None:
+        yield
+        return
+    _acumulado.pares, _acumulado.ufs = [], dict(ufs or {})
+    try:
+        yield
+        pares, ufs = _acumulado.pares, _acumulado.ufs
+    finally:
+        _acumulado.pares = None
+    registrar_transicoes(pares, ufs=ufs)
+
+
+def registrar_transicoes(
+    transicoes: Iterable[tuple],
+    *,
+    ufs: Optional[Dict[int, str]] = None,
+) -> None:
+    """Aplica pares ``(anterior, atual)`` de ``EstadoBoleto`` ao rollup.
+
+    ``anterior`` é ``None`` para boletos novos e ``atual`` é ``None`` para boletos
+    removidos. Deve ser chamado por qualquer escrita em massa que não passe por
+    ``Boleto.save()`` (``update()``, ``bulk_update()``).
+    """
+    pares = [(antes, depois) for antes, depois in transicoes if antes != depois]
+    if not pares:
+        return
+    if getattr(_acumulado, "pares", None) is not None:
+        _acumulado.pares.extend(pares)
+        _acumulado.ufs.update(ufs or {})
+        return
+    ids = {estado.cliente_id for par in pares for estado in par if estado is not None}
+    ufs = dict(ufs or {})
+    if not ids <= ufs.keys():
+        ufs.update(_ufs_clientes(ids - ufs.keys()))
+    # Agrupa os deltas por linha do rollup: N boletos viram poucas escritas.
+    por_competencia: Dict[tuple, List] = defaultdict(lambda: [0, ZERO])
+    por_cliente: Dict[tuple, List] = defaultdict(lambda: [0, ZERO])
+    for antes, depois in pares:
+        for estado, sinal in ((antes, -1), (depois, 1)):
+            if estado is None:
+                continue
+            chave = (
+                estado.competencia_ano,
+                estado.competencia_mes,
+                estado.data_vencimento,
+                ufs.get(estado.cliente_id, "") or "",
+                estado.status,
+            )
+            for acumulado in (por_competencia[chave], por_cliente[(estado.cliente_id, estado.status)]):
+                acumulado[0] += sinal
+                acumulado[1] += estado.valor * sinal
+    pagamentos = {
+        estado.cliente_id
+        for par in pares
+        for estado in par
+        if estado is not None and estado.status == "pago"
+    }
+    with transaction.atomic():
+        _somar_lote(ResumoRecebiveis, CHAVE_RECEBIVEIS, por_competencia)
+        _somar_lote(ResumoCliente, CHAVE_CLIENTE, por_cliente)
+        if pagamentos:
+            atualizar_ultimo_pagamento(pagamentos)
+
+
+def _ultimo_pagamento_subquery() -> Subquery:
+    return Subquery(
+        Boleto.objects.filter(cliente=OuterRef("pk"), status="pago")
+        .values("cliente")
+        .annotate(ultimo=Max("data_pagamento"))
+        .values("ultimo")[:1]
+    )
+
+
+def atualizar_ultimo_pagamento(cliente_ids: Iterable[int]) -> None:
+    """Recalcula ``Cliente.ultimo_pagamento`` num único UPDATE (cobre estornos e exclusões)."""
+    Cliente.objects.filter(id__in=set(cliente_ids)).update(ultimo_pagamento=_ultimo_pagamento_subquery())
+
+
+def mover_uf_cliente(cliente_id: int, uf_antiga: str, uf_nova: str) -> None:
+    """Transfere as contagens de um cliente entre UFs quando o cadastro muda."""
+    if (uf_antiga or "") == (uf_nova or ""):
+        return
+    grupos = (
+        Boleto.objects.filter(cliente_id=cliente_id)
+        .values("competencia_ano", "competencia_mes", "data_vencimento", "status")
+        .annotate(quantidade=Count("id"), valor_total=Sum("valor"))
+    )
+    deltas: Dict[tuple, List] = {}
+    for grupo in grupos:
+        valor = grupo["valor_total"] or ZERO
+        for uf, sinal in ((uf_antiga or "", -1), (uf_nova or "", 1)):
+            chave = (
+                grupo["competencia_ano"],
+                grupo["competencia_mes"],
+                grupo["data_vencimento"],
+                uf,
+                grupo["status"],
+            )
+            deltas[chave] = [grupo["quantidade"] * sinal, valor * sinal]
+    with transaction.atomic():
+        _somar_lote(ResumoRecebiveis, CHAVE_RECEBIVEIS, deltas)
+
+
+@transaction.atomic
+def reconstruir_resumo() -> int:
+    """Recalcula os rollups a partir de ``Boleto``. Retorna o número de linhas geradas."""
+    ResumoRecebiveis.objects.all().delete()
+    ResumoCliente.objects.all().delete()
+
+    por_competencia = (
+        Boleto.objects.values(
+            "competencia_ano", "competencia_mes", "data_vencimento", "status", uf=F("cliente__uf")
+        )
+        .annotate(quantidade=Count("id"), valor_total=Sum("valor"))
+        .order_by()
+    )
+    linhas = [
+        ResumoRecebiveis(
+            competencia_ano=g["competencia_ano"],
+            competencia_mes=g["competencia_mes"],
+            data_vencimento=g["data_vencimento"],
+            uf=g["uf"] or "",
+            status=g["status"],
+            quantidade=g["quantidade"],
+            valor_total=g["valor_total"] or ZERO,
+        )
+        for g in por_competencia.iterator()
+    ]
+    ResumoRecebiveis.objects.bulk_create(linhas, batch_size=1000)
+
+    por_cliente = (
+        Boleto.objects.values("cliente_id", "status")
+        .annotate(quantidade=Count("id"), valor_total=Sum("valor"))
+        .order_by()
+    )
+    linhas_cliente = [
+        ResumoCliente(
+            cliente_id=g["cliente_id"],
+            status=g["status"],
+            quantidade=g["quantidade"],
+            valor_total=g["valor_total"] or ZERO,
+        )
+        for g in por_cliente.iterator()
+    ]
+    ResumoCliente.objects.bulk_create(linhas_cliente, batch_size=1000)
+    Cliente.objects.update(ultimo_pagamento=_ultimo_pagamento_subquery())
+    return len(linhas) + len(linhas_cliente)
+
+
+def historico_cliente(cliente: Cliente, *, hoje: Optional[dt.date] = None) -> Dict[str, Any]:
+    """Totais pagos/em aberto/vencidos de um cliente, lidos de ``ResumoCliente``.
+
+    Só ``vencidos`` depende da data de hoje e por isso é somado em ``Boleto``,
+    restrito ao cliente pelo índice ``(cliente, competencia_ano, competencia_mes)``.
+    """
+    hoje = hoje or dt.date.today()
+    rotulos = dict(Boleto.STATUS_CHOICES)
+    por_status = {
+        linha.status: linha for linha in ResumoCliente.objects.filter(cliente=cliente, quantidade__gt=0)
+    }
+
+    def totais(status: str) -> Dict[str, Any]:
+        linha = por_status.get(status)
+        return {
+            "quantidade": linha.quantidade if linha else 0,
+            "valor_total": linha.valor_total if linha else ZERO,
+        }
+
+    vencidos = Boleto.objects.filter(cliente=cliente, status="emitido", data_vencimento__lt=hoje).aggregate(
+        quantidade=Count("id"), valor_total=Sum("valor")
+    )
+    return {
+        "hoje": hoje,
+        "pagos": totais("pago"),
+        "em_aberto": totais("emitido"),
+        "vencidos": {
+            "quantidade": vencidos["quantidade"],
+            "valor_total": vencidos["valor_total"] or ZERO,
+        },
+        "por_status": [
+            {"status": codigo, "rotulo": rotulos[codigo], **totais(codigo)}
+            for codigo, _ in Boleto.STATUS_CHOICES
+            if codigo in por_status
+        ],
+        "ultimo_pagamento": cliente.ultimo_pagamento,
+    }
+
+
+def _totais(qs) -> Dict[str, Any]:
+    agregado = qs.aggregate(quantidade=Sum("quantidade"), valor_total=Sum("valor_total"))
+    return {
+        "quantidade": agregado["quantidade"] or 0,
+        "valor_total": agregado["valor_total"] or ZERO,
+    }
+
+
+def montar_painel(ano: Optional[int] = None, *, hoje: Optional[dt.date] = None) -> Dict[str, Any]:
+    """Agrega os rollups para o painel de recebíveis (nunca lê a tabela de boletos)."""
+    hoje = hoje or dt.date.today()
+    resumo = ResumoRecebiveis.objects.filter(quantidade__gt=0)
+    if ano:
+        resumo = resumo.filter(competencia_ano=ano)
+
+    rotulos = dict(Boleto.STATUS_CHOICES)
+    por_status: List[Dict[str, Any]] = []
+    for linha in resumo.values("status").annotate(
+        quantidade=Sum("quantidade"), valor_total=Sum("valor_total")
+    ).order_by("status"):
+        por_status.append({**linha, "rotulo": rotulos.get(linha["status"], linha["status"])})
+
+    em_aberto = resumo.filter(status="emitido")
+    vencidos = _totais(em_aberto.filter(data_vencimento__lt=hoje))
+    a_vencer = _totais(em_aberto.filter(data_vencimento__gte=hoje))
+
+    meses: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+    for linha in resumo.values("competencia_ano", "competencia_mes", "status").annotate(
+        quantidade=Sum("quantidade"), valor_total=Sum("valor_total")
+    ).order_by("-competencia_ano", "-competencia_mes"):
+        chave = (linha["competencia_ano"], linha["competencia_mes"])
+        mes = meses.setdefault(
+            chave,
+            {"ano": chave[0], "mes": chave[1], "status": {}, "quantidade": 0, "valor_total": ZERO},
+        )
+        mes["status"][linha["status"]] = linha
+        mes["quantidade"] += linha["quantidade"]
+        mes["valor_total"] += linha["valor_total"]
+
+    ufs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for linha in resumo.values("uf", "status").annotate(
+        quantidade=Sum("quantidade"), valor_total=Sum("valor_total")
+    ).order_by("uf"):
+        uf = ufs.setdefault(linha["uf"] or "--", {"uf": linha["uf"] or "--", "status": {}})
+        uf["status"][linha["status"]] = linha
+
+    colunas = [codigo for codigo, _ in Boleto.STATUS_CHOICES]
+    for grupo in list(meses.values()) + list(ufs.values()):
+        grupo["colunas"] = [grupo["status"].get(codigo) for codigo in colunas]
+
+    maiores_devedores = (
+        ResumoCliente.objects.filter(status="emitido", quantidade__gt=0)
+        .select_related("cliente")
+        .order_by("-valor_total")[:20]
+    )
+
+    anos = (
+        ResumoRecebiveis.objects.filter(quantidade__gt=0)
+        .values_list("competencia_ano", flat=True)
+        .distinct()
+        .order_by("-competencia_ano")
+    )
+
+    return {
+        "ano": ano,
+        "anos": list(anos),
+        "hoje": hoje,
+        "por_status": por_status,
+        "vencidos": vencidos,
+        "a_vencer": a_vencer,
+        "por_mes": list(meses.values()),
+        "por_uf": list(ufs.values()),
+        "maiores_devedores": list(maiores_devedores),
+        "status_colunas": [rotulos[codigo] for codigo in colunas],
+    }
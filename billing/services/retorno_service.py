@@ -0,0 +1,446 @@
+import datetime as dt
+import io
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from typing import IO, Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.db import transaction
+from django.db.models.functions import Length
+
+from ..models import Boleto
+from ..utils import somente_digitos
+from .resumo_service import estado_boleto, registrar_transicoes
+
+TAMANHO_LOTE = 2000
+LIMITE_AMOSTRA = 500
+# Boletos que um pagamento pode liquidar (``erro`` cobre emissões em dúvida que chegaram ao banco).
+STATUS_LIQUIDAVEIS = ("novo", "emitido", "erro")
+# Diferença aceita entre o valor do boleto e o do arquivo (arredondamentos); acima
+# disso o pagamento fica para conferência manual.
+TOLERANCIA_VALOR = Decimal("0.01")
+
+# Códigos de ocorrência/movimento de liquidação.
+OCORRENCIAS_CNAB400 = {"06", "15", "17"}
+MOVIMENTOS_CNAB240 = {"06", "17"}
+
+# Posições (início, fim, base 1 como nos manuais) do registro de detalhe "1" do CNAB 400.
+# As posições 4–17 são a inscrição do beneficiário (a própria empresa), não do pagador:
+# o detalhe do retorno 400 não traz o CPF/CNPJ do pagador, então não há "documento".
+CAMPOS_CNAB400 = {
+    "nosso_numero": (71, 82),
+    "ocorrencia": (109, 110),
+    "data_ocorrencia": (111, 116),
+    "seu_numero": (117, 126),
+    "vencimento": (147, 152),
+    "valor_titulo": (153, 165),
+    "valor_pago": (254, 266),
+}
+# CNAB 240: segmento T (título) seguido do segmento U (valores do pagamento).
+CAMPOS_CNAB240_T = {
+    "movimento": (16, 17),
+    "nosso_numero": (38, 57),
+    "seu_numero": (59, 73),
+    "vencimento": (74, 81),
+    "valor_titulo": (82, 96),
+    "documento": (134, 148),
+}
+CAMPOS_CNAB240_U = {
+    "valor_pago": (78, 92),
+    "data_ocorrencia": (138, 145),
+}
+
+_TAG_OFX = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+_DIGITOS = re.compile(r"\d+")
+
+
+class RegistroRetorno(NamedTuple):
+    """Um pagamento lido do arquivo, já normalizado."""
+
+    linha: int
+    valor_pago: Decimal
+    data_pagamento: dt.date
+    nosso_numero: str = ""
+    linha_digitavel: str = ""
+    seu_numero: str = ""
+    documento: str = ""
+    vencimento: Optional[dt.date] = None
+    valor_titulo: Optional[Decimal] = None
+    # Identificadores tirados de texto livre (histórico do OFX), não de campos do banco:
+    # o pagamento só liquida o boleto se o valor também bater.
+    conferir_valor: bool = False
+
+
+@dataclass
+class RelatorioRetorno:
+    formato: str = ""
+    total: int = 0
+    liquidados: int = 0
+    ja_pagos: int = 0
+    # Boleto encontrado, mas com valor diferente do pagamento: fica para conferência manual.
+    divergentes: int = 0
+    # Lançamentos que não são liquidação (entradas, baixas, tarifas, débitos).
+    ignorados: int = 0
+    nao_encontrados: int = 0
+    # Guarda só as primeiras pendências para manter a memória constante.
+    amostra_pendencias: List[Tuple[int, str]] = field(default_factory=list)
+
+    def pendencia(self, linha: int, motivo: str) -> None:
+        if len(self.amostra_pendencias) < LIMITE_AMOSTRA:
+            self.amostra_pendencias.append((linha, motivo))
+
+
+def _campo(linha: str, posicoes: Tuple[int, int]) -> str:
+    inicio, fim = posicoes
+    return linha[inicio - 1:fim].strip()
+
+
+def _valor(texto: str) -> Decimal:
+    # Valores sem separador, com 2 casas implícitas.
+    return Decimal(int(texto or 0)) / 100
+
+
+def _data(texto: str) -> Optional[dt.date]:
+    if not texto.strip("0 "):
+        return None
+    formato = "%d%m%y" if len(texto) == 6 else "%d%m%Y"
+    return dt.datetime.strptime(texto, formato).date()
+
+
+def _sem_zeros(texto: str) -> str:
+    return texto.lstrip("0") or texto
+
+
+def _registro_cnab(numero: int, campos: Dict[str, str], relatorio: RelatorioRetorno) -> Optional[RegistroRetorno]:
+    try:
+        registro = RegistroRetorno(
+            linha=numero,
+            valor_pago=_valor(campos["valor_pago"]),
+            data_pagamento=_data(campos["data_ocorrencia"]),
+            nosso_numero=campos["nosso_numero"],
+            seu_numero=campos["seu_numero"],
+            documento=campos.get("documento", ""),
+            vencimento=_data(campos["vencimento"]),
+            valor_titulo=_valor(campos["valor_titulo"]),
+        )
+    except ValueError as exc:
+        registro, motivo = None, f"Registro ilegível: {exc}"
+    else:
+        motivo = "" if registro.data_pagamento else "Liquidação sem data de pagamento"
+    if motivo:
+        relatorio.ignorados += 1
+        relatorio.pendencia(numero, motivo)
+        return None
+    return registro
+
+
+def _ler_cnab400(linhas: Iterable[Tuple[int, str]], relatorio: RelatorioRetorno) -> Iterator[RegistroRetorno]:
+    for numero, linha in linhas:
+        if linha[:1] != "1":
+            continue  # header, trailer
+        relatorio.total += 1
+        if _campo(linha, CAMPOS_CNAB400["ocorrencia"]) not in OCORRENCIAS_CNAB400:
+            relatorio.ignorados += 1
+            continue
+        campos = {nome: _campo(linha, posicoes) for nome, posicoes in CAMPOS_CNAB400.items()}
+        registro = _registro_cnab(numero, campos, relatorio)
+        if registro is not None:
+            yield registro
+
+
+def _ler_cnab240(linhas: Iterable[Tuple[int, str]], relatorio: RelatorioRetorno) -> Iterator[RegistroRetorno]:
+    titulo: Optional[Tuple[int, Dict[str, str]]] = None
+    for numero, linha in linhas:
+        if linha[7:8] != "3":
+            continue  # headers e trailers de arquivo/lote
+        segmento = linha[13:14]
+        if segmento == "T":
+            relatorio.total += 1
+            titulo = (numero, {nome: _campo(linha, p) for nome, p in CAMPOS_CNAB240_T.items()})
+            continue
+        if segmento != "U" or titulo is None:
+            continue
+        numero_t, campos = titulo
+        titulo = None
+        if campos["movimento"] not in MOVIMENTOS_CNAB240:
+            relatorio.ignorados += 1
+            continue
+        campos.update({nome: _campo(linha, p) for nome, p in CAMPOS_CNAB240_U.items()})
+        registro = _registro_cnab(numero_t, campos, relatorio)
+        if registro is not None:
+            yield registro
+
+
+def _registro_ofx(numero: int, transacao: Dict[str, str], larguras: Collection[int]) -> Optional[RegistroRetorno]:
+    try:
+        valor = Decimal(transacao.get("TRNAMT", "").replace(",", "."))
+        data = dt.datetime.strptime(transacao.get("DTPOSTED", "")[:8], "%Y%m%d").date()
+    except (InvalidOperation, ValueError):
+        return None
+    if valor <= 0:
+        return None  # débitos e tarifas
+    # O extrato não tem campos de cobrança: os identificadores vêm do histórico.
+    texto = " ".join(transacao.get(tag, "") for tag in ("MEMO", "NAME", "REFNUM", "CHECKNUM"))
+    registro = {"linha_digitavel": "", "documento": "", "nosso_numero": ""}
+    for digitos in _DIGITOS.findall(texto):
+        if len(digitos) in (47, 48):
+            registro["linha_digitavel"] = registro["linha_digitavel"] or digitos
+            continue
+        # Só sequências no tamanho de um nosso número gravado (não datas, agências...);
+        # com 11 dígitos, tanto pode ser o nosso número quanto um CPF.
+        if len(digitos) in larguras:
+            registro["nosso_numero"] = registro["nosso_numero"] or digitos
+        if len(digitos) in (11, 14):
+            registro["documento"] = registro["documento"] or digitos
+    return RegistroRetorno(
+        linha=numero,
+        valor_pago=valor,
+        data_pagamento=data,
+        conferir_valor=True,
+        **registro,
+    )
+
+
+def _ler_ofx(
+    linhas: Iterable[Tuple[int, str]], relatorio: RelatorioRetorno, larguras: Collection[int] = ()
+) -> Iterator[RegistroRetorno]:
+    # Lê OFX 1.x (SGML, tags sem fechamento) e 2.x (XML) com o mesmo varredor de tags.
+    transacao: Optional[Dict[str, str]] = None
+    inicio = 0
+    for numero, linha in linhas:
+        for fechamento, tag, valor in _TAG_OFX.findall(linha):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not fechamento:
+                    transacao, inicio = {}, numero
+                    continue
+                if transacao is not None:
+                    relatorio.total += 1
+                    registro = _registro_ofx(inicio, transacao, larguras)
+                    if registro is None:
+                        relatorio.ignorados += 1
+                    else:
+                        yield registro
+                transacao = None
+            elif transacao is not None and not fechamento and valor.strip():
+                transacao[tag] = valor.strip()
+
+
+def detectar_formato(primeira_linha: str) -> str:
+    inicio = primeira_linha.lstrip("\ufeffï»¿ \t")
+    if inicio.upper().startswith(("OFXHEADER", "<?XML", "<OFX")):
+        return "ofx"
+    tamanho = len(primeira_linha.rstrip("\r\n"))
+    if tamanho == 240:
+        return "cnab240"
+    if tamanho == 400:
+        return "cnab400"
+    raise ValueError(
+        f"Formato de arquivo não reconhecido (linha com {tamanho} caracteres); esperado CNAB 240, CNAB 400 ou OFX."
+    )
+
+
+_LEITORES = {"cnab240": _ler_cnab240, "cnab400": _ler_cnab400, "ofx": _ler_ofx}
+
+
+def ler_retorno(
+    stream: IO[bytes], relatorio: RelatorioRetorno, larguras: Collection[int] = ()
+) -> Iterator[RegistroRetorno]:
+    """Itera os pagamentos do arquivo linha a linha, sem carregá-lo em memória.
+
+    ``larguras`` são os tamanhos de nosso número aceitos no histórico de um OFX.
+    """
+    texto = io.TextIOWrapper(stream, encoding="latin-1", newline="")
+    primeira = texto.readline()
+    relatorio.formato = detectar_formato(primeira)
+    linhas = enumerate(_reemitir(primeira, texto), start=1)
+    leitor = _LEITORES[relatorio.formato]
+    if relatorio.formato == "ofx":
+        leitor = partial(_ler_ofx, larguras=frozenset(larguras))
+    return leitor(((n, l.rstrip("\r\n")) for n, l in linhas), relatorio)
+
+
+def _reemitir(primeira: str, texto: IO[str]) -> Iterator[str]:
+    yield primeira
+    yield from texto
+
+
+def _indexar(boletos: Iterable[Boleto], chave) -> Dict:
+    indice: Dict = {}
+    for boleto in boletos:
+        indice.setdefault(chave(boleto), boleto)
+    return indice
+
+
+def larguras_nosso_numero() -> List[int]:
+    """Tamanhos de ``nosso_numero`` gravados (o arquivo completa com zeros à esquerda)."""
+    return list(
+        Boleto.objects.exclude(nosso_numero="")
+        .annotate(largura=Length("nosso_numero"))
+        .values_list("largura", flat=True)
+        .distinct()
+        .order_by()
+    )
+
+
+def valor_confere(registro: RegistroRetorno, boleto: Boleto) -> bool:
+    """O pagamento corresponde ao valor do boleto (com ``TOLERANCIA_VALOR``)?
+
+    O valor do título, quando o arquivo traz, tem de ser o do boleto. O valor pago
+    pode ser maior (multa e juros de atraso) num retorno de cobrança, mas não menor;
+    identificado só pelo histórico (OFX), tem de ser o próprio valor do boleto.
+    """
+    if registro.valor_titulo and abs(registro.valor_titulo - boleto.valor) > TOLERANCIA_VALOR:
+        return False
+    if registro.conferir_valor:
+        return abs(registro.valor_pago - boleto.valor) <= TOLERANCIA_VALOR
+    return registro.valor_pago >= boleto.valor - TOLERANCIA_VALOR
+
+
+def _localizar(registros: List[RegistroRetorno], larguras: List[int]) -> Dict[int, Optional[Boleto]]:
+    """Casa cada registro com um boleto: identificadores do banco primeiro, depois
+    ``seuNumero`` e, por último, ``(vencimento, CPF/CNPJ)`` com valor conferido, quando único."""
+    base = Boleto.objects.select_for_update(of=("self",)).select_related("cliente")
+    # Consulta o nosso número já no tamanho gravado para usar o índice da coluna.
+    nossos = {
+        _sem_zeros(r.nosso_numero).zfill(largura)
+        for r in registros
+        if r.nosso_numero.strip("0")
+        for largura in larguras
+    }
+    linhas = {r.linha_digitavel for r in registros if r.linha_digitavel}
+    seus = {r.seu_numero for r in registros if r.seu_numero}
+
+    por_nosso = (
+        _indexar(base.filter(nosso_numero__in=nossos), lambda b: _sem_zeros(b.nosso_numero)) if nossos else {}
+    )
+    por_linha = (
+        _indexar(base.filter(linha_digitavel__in=linhas), lambda b: somente_digitos(b.linha_digitavel))
+        if linhas
+        else {}
+    )
+    por_seu = (
+        _indexar(
+            base.filter(intencao__seu_numero__in=seus).select_related("intencao"),
+            lambda b: b.intencao.seu_numero,
+        )
+        if seus
+        else {}
+    )
+
+    encontrados: Dict[int, Optional[Boleto]] = {}
+    sobra: List[RegistroRetorno] = []
+    for registro in registros:
+        boleto = (
+            por_nosso.get(_sem_zeros(registro.nosso_numero) if registro.nosso_numero.strip("0") else None)
+            or por_linha.get(registro.linha_digitavel)
+            or por_seu.get(registro.seu_numero)
+        )
+        encontrados[registro.linha] = boleto
+        if boleto is None and registro.documento:
+            sobra.append(registro)
+
+    if sobra:
+        candidatos: Dict[str, List[Boleto]] = defaultdict(list)
+        filtro = base.filter(
+            status__in=STATUS_LIQUIDAVEIS,
+            cliente__documento__in={_documento(r.documento) for r in sobra},
+        )
+        if all(r.vencimento for r in sobra):
+            filtro = filtro.filter(data_vencimento__in={r.vencimento for r in sobra})
+        for boleto in filtro:
+            candidatos[boleto.cliente.documento].append(boleto)
+        for registro in sobra:
+            opcoes = [
+                b
+                for b in candidatos.get(_documento(registro.documento), [])
+                if registro.vencimento in (None, b.data_vencimento) and valor_confere(registro, b)
+            ]
+            if len(opcoes) == 1:
+                encontrados[registro.linha] = opcoes[0]
+    return encontrados
+
+
+def _documento(digitos: str) -> str:
+    # CNAB alinha o documento com zeros à esquerda; CPF tem 11 dígitos, CNPJ 14.
+    digitos = digitos.lstrip("0")
+    return digitos.zfill(11) if len(digitos) <= 11 else digitos.zfill(14)
+
+
+@transaction.atomic
+def _liquidar_lote(
+    registros: List[RegistroRetorno], relatorio: RelatorioRetorno, simular: bool, larguras: List[int]
+) -> None:
+    encontrados = _localizar(registros, larguras)
+    liquidar: Dict[int, Tuple[Boleto, dt.date]] = {}
+    for registro in registros:
+        boleto = encontrados.get(registro.linha)
+        if boleto is None:
+            relatorio.nao_encontrados += 1
+            relatorio.pendencia(
+                registro.linha,
+                f"Pagamento de R$ {registro.valor_pago} em {registro.data_pagamento:%d/%m/%Y} sem boleto em aberto correspondente"
+                + (f" (nosso número {registro.nosso_numero})" if registro.nosso_numero else ""),
+            )
+        elif boleto.status == "pago" or boleto.pk in liquidar:
+            relatorio.ja_pagos += 1
+        elif boleto.status not in STATUS_LIQUIDAVEIS:
+            relatorio.nao_encontrados += 1
+            relatorio.pendencia(registro.linha, f"Boleto {boleto.pk} está {boleto.get_status_display().lower()}")
+        elif not valor_confere(registro, boleto):
+            relatorio.divergentes += 1
+            relatorio.pendencia(
+                registro.linha,
+                f"Pagamento de R$ {registro.valor_pago} não confere com o boleto {boleto.pk} "
+                f"(R$ {boleto.valor}): conferir manualmente",
+            )
+        else:
+            liquidar[boleto.pk] = (boleto, registro.data_pagamento)
+
+    relatorio.liquidados += len(liquidar)
+    if simular or not liquidar:
+        return
+    transicoes = []
+    por_data: Dict[dt.date, List[int]] = defaultdict(list)
+    for boleto, data_pagamento in liquidar.values():
+        anterior = estado_boleto(boleto)
+        boleto.status = "pago"
+        boleto.data_pagamento = data_pagamento
+        transicoes.append((anterior, estado_boleto(boleto)))
+        por_data[data_pagamento].append(boleto.pk)
+    boletos = [boleto for boleto, _ in liquidar.values()]
+    # Um arquivo de retorno traz poucas datas de pagamento: um UPDATE por data.
+    for data_pagamento, ids in por_data.items():
+        Boleto.objects.filter(pk__in=ids).update(status="pago", data_pagamento=data_pagamento)
+    # update() não dispara os sinais: atualiza o rollup aqui.
+    registrar_transicoes(transicoes, ufs={b.cliente_id: b.cliente.uf for b in boletos})
+    for boleto, (_, atual) in zip(boletos, transicoes):
+        boleto._estado_resumo = atual
+
+
+def processar_retorno(
+    stream: IO[bytes],
+    *,
+    tamanho_lote: int = TAMANHO_LOTE,
+    simular: bool = False,
+) -> RelatorioRetorno:
+    """Liquida os boletos pagos segundo um arquivo de retorno CNAB 240/400 ou extrato OFX.
+
+    O arquivo é lido em fluxo e processado em lotes: cada lote faz poucas consultas
+    (uma por tipo de identificador) e um ``bulk_update``. Pagamentos com valor que
+    não confere com o boleto não liquidam nada e são contados em ``divergentes``.
+    Levanta ``ValueError`` se o formato não for reconhecido.
+    """
+    relatorio = RelatorioRetorno()
+    larguras = larguras_nosso_numero()
+    lote: List[RegistroRetorno] = []
+    for registro in ler_retorno(stream, relatorio, larguras):
+        lote.append(registro)
+        if len(lote) >= tamanho_lote:
+            _liquidar_lote(lote, relatorio, simular, larguras)
+            lote = []
+    if lote:
+        _liquidar_lote(lote, relatorio, simular, larguras)
+    return relatorio
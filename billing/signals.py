@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Boleto, Cliente
+from .services.resumo_service import estado_boleto, mover_uf_cliente, registrar_transicoes
+
+
+@receiver(post_init, sender=Boleto)
+def _boleto_carregado(sender, instance: Boleto, **kwargs):
+    # Guarda o estado carregado do banco para calcular o delta no próximo save
+    # sem precisar de um SELECT extra.
+    instance._estado_resumo = estado_boleto(instance)
+
+
+@receiver(post_save, sender=Boleto)
+def _boleto_salvo(sender, instance: Boleto, created: bool, raw: bool = False, **kwargs):
+    if raw:
+        return
+    anterior = None if created else getattr(instance, "_estado_resumo", None)
+    atual = estado_boleto(instance)
+    ufs = None
+    if atual is not None and Boleto.cliente.is_cached(instance) and (
+        anterior is None or anterior.cliente_id == atual.cliente_id
+    ):
+        ufs = {atual.cliente_id: instance.cliente.uf}
+    registrar_transicoes([(anterior, atual)], ufs=ufs)
+    instance._estado_resumo = atual
+
+
+@receiver(post_delete, sender=Boleto)
+def _boleto_removido(sender, instance: Boleto, **kwargs):
+    registrar_transicoes([(estado_boleto(instance), None)])
+
+
+@receiver(post_init, sender=Cliente)
+def _cliente_carregado(sender, instance: Cliente, **kwargs):
+    instance._uf_resumo = instance.__dict__.get("uf")
+
+
+@receiver(post_save, sender=Cliente)
+def _cliente_salvo(sender, instance: Cliente, created: bool, raw: bool = False, **kwargs):
+    uf_anterior = getattr(instance, "_uf_resumo", None)
+    if not created and not raw and uf_anterior is not None:
+        mover_uf_cliente(instance.pk, uf_anterior, instance.uf)
+    instance._uf_resumo = instance.uf
@@ -0,0 +1,122 @@
+"""Telas do admin: busca de clientes, ações em lote e credenciais das contas."""
+import datetime as dt
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from billing.models import Boleto, Cliente, ContaInter, Tarefa
+
+from .test_consultas import _criar_clientes
+
+
+# Sem collectstatic nos testes: o admin usa o storage simples, sem manifesto.
+ESTATICOS = override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+
+
+@ESTATICOS
+class BuscaClientesAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@exemplo.com", "x"))
+        self.joao, self.maria = _criar_clientes(2)
+        Cliente.objects.filter(pk=self.joao.pk).update(nome="João Silva", busca="joao silva")
+        Cliente.objects.filter(pk=self.maria.pk).update(nome="Maria Souza", busca="maria souza", cidade="Campinas")
+
+    def _buscar(self, termo):
+        response = self.client.get(reverse("admin:billing_cliente_changelist"), {"q": termo})
+        return {cliente.pk for cliente in response.context["cl"].result_list}
+
+    def test_prefixo_normalizado(self):
+        self.assertEqual(self._buscar("joão"), {self.joao.pk})
+
+    def test_sem_prefixo_usa_busca_padrao(self):
+        self.assertEqual(self._buscar("silva"), {self.joao.pk})
+        self.assertEqual(self._buscar("campinas"), {self.maria.pk})
+        self.assertEqual(self._buscar(f"cliente{0}@exemplo"), {self.joao.pk})
+
+
+@ESTATICOS
+class RetentarFalhasAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@exemplo.com", "x"))
+        clientes = _criar_clientes(2)
+        self.boletos = [
+            Boleto.objects.create(
+                cliente=cliente,
+                competencia_ano=2026,
+                competencia_mes=5,
+                data_vencimento=dt.date(2026, 5, 10),
+                valor=Decimal("150.00"),
+                status="erro",
+                erro_tipo=erro_tipo,
+            )
+            for cliente, erro_tipo in zip(clientes, [Boleto.ERROS_RETENTAVEIS[0], "validacao"])
+        ]
+
+    @mock.patch("billing.services.emissao_service.emitir_lote")
+    def test_acao_enfileira_tarefa(self, emitir_lote):
+        response = self.client.post(
+            reverse("admin:billing_boleto_changelist"),
+            {"action": "retentar_falhas", "_selected_action": [b.pk for b in self.boletos]},
+        )
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(response, reverse("tarefa_detalhe", args=[tarefa.pk]), fetch_redirect_response=False)
+        self.assertEqual((tarefa.tipo, tarefa.status, tarefa.total), ("retentativa", "pendente", 1))
+        self.assertEqual(tarefa.parametros, {"boleto_ids": [self.boletos[0].pk]})
+        emitir_lote.assert_not_called()
+
+
+@ESTATICOS
+class ContaInterAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@exemplo.com", "x"))
+        self.conta = ContaInter.objects.create(
+            nome="Filial",
+            conta_corrente="12345",
+            client_id="id",
+            client_secret="segredo-atual",
+            cert_path="cert.crt",
+            key_path="cert.key",
+        )
+        self.url = reverse("admin:billing_containter_change", args=[self.conta.pk])
+
+    def _dados(self, **extra):
+        dados = {
+            "nome": "Filial",
+            "conta_corrente": "12345",
+            "client_id": "id",
+            "client_secret": "",
+            "cert_path": "cert.crt",
+            "key_path": "cert.key",
+            "limite_por_minuto": 100,
+            "ativa": "on",
+        }
+        dados.update(extra)
+        return dados
+
+    def test_segredo_nao_aparece_no_formulario(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "segredo-atual")
+
+    def test_em_branco_mantem_o_segredo(self):
+        self.client.post(self.url, self._dados(nome="Filial SP"))
+        self.conta.refresh_from_db()
+        self.assertEqual((self.conta.nome, self.conta.client_secret), ("Filial SP", "segredo-atual"))
+
+    def test_preenchido_troca_o_segredo(self):
+        self.client.post(self.url, self._dados(client_secret="novo"))
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.client_secret, "novo")
+
+    def test_conta_nova_exige_segredo(self):
+        response = self.client.post(reverse("admin:billing_containter_add"), self._dados(conta_corrente="999"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ContaInter.objects.filter(conta_corrente="999").exists())
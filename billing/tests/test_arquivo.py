@@ -0,0 +1,51 @@
+"""Arquivo de chamadas ao Inter: sem dados pessoais do pagador e com prazo de retenção."""
+import datetime as dt
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from billing.services.arquivo_service import _montar_registro, expurgar_arquivo, pseudonimo
+
+
+class DadosPessoaisTests(SimpleTestCase):
+    def test_pagador_vira_pseudonimo(self):
+        corpo = {
+            "seuNumero": "123",
+            "valorNominal": 150.0,
+            "pagador": {"nome": "Maria", "cpfCnpj": "12345678909", "email": "m@x.com", "uf": "SP", "complemento": ""},
+        }
+        erro = b'{"title": "Erro", "violacoes": [{"propriedade": "pagador.cpfCnpj", "valor": "12345678909"}]}'
+        registro = _montar_registro(
+            {
+                "em": "2026-05-10T12:00:00.000+00:00",
+                "requisicao": {"json": corpo, "params": {"cpfCnpj": "12345678909"}},
+                "resposta": (400, "application/problem+json", erro),
+            }
+        )
+        pagador = registro["requisicao"]["json"]["pagador"]
+        self.assertEqual(pagador["cpfCnpj"], pseudonimo("12345678909"))
+        self.assertEqual(pagador["uf"], "SP")
+        self.assertEqual(pagador["complemento"], "")
+        self.assertEqual(registro["requisicao"]["json"]["valorNominal"], 150.0)
+        self.assertEqual(registro["requisicao"]["params"]["cpfCnpj"], pseudonimo("12345678909"))
+        self.assertEqual(registro["resposta"]["corpo"]["violacoes"][0]["valor"], pseudonimo("12345678909"))
+        texto = str(registro)
+        for dado in ("Maria", "12345678909", "m@x.com"):
+            self.assertNotIn(dado, texto)
+
+
+class RetencaoTests(SimpleTestCase):
+    def test_expurga_so_os_dias_antigos(self):
+        diretorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        for dia in ("2026-04-09", "2026-04-10", "2026-05-10"):
+            (diretorio / f"inter-{dia}.jsonl.gz").write_bytes(b"")
+            (diretorio / f"inter-{dia}.idx").write_bytes(b"")
+        (diretorio / "leia-me.txt").write_text("outro arquivo")
+        self.assertEqual(expurgar_arquivo(30, diretorio=diretorio, hoje=dt.date(2026, 5, 10)), 2)
+        self.assertEqual(
+            sorted(caminho.name for caminho in diretorio.iterdir()),
+            ["inter-2026-04-10.idx", "inter-2026-04-10.jsonl.gz", "inter-2026-05-10.idx", "inter-2026-05-10.jsonl.gz", "leia-me.txt"],
+        )
@@ -0,0 +1,39 @@
+"""Varredura de vencidos: a marca acompanha o status do boleto."""
+import datetime as dt
+from decimal import Decimal
+
+from django.test import TestCase
+
+from billing.models import Boleto
+from billing.services.atraso_service import marcar_vencidos
+
+from .test_consultas import _criar_clientes
+
+HOJE = dt.date(2026, 6, 1)
+
+
+class MarcarVencidosTests(TestCase):
+    def _boleto(self, cliente, status, vencimento=dt.date(2026, 5, 10)):
+        return Boleto.objects.create(
+            cliente=cliente,
+            competencia_ano=vencimento.year,
+            competencia_mes=vencimento.month,
+            data_vencimento=vencimento,
+            valor=Decimal("150.00"),
+            status=status,
+        )
+
+    def test_pago_ou_cancelado_perde_a_marca(self):
+        emitido, pago, cancelado = (self._boleto(c, "emitido") for c in _criar_clientes(3))
+        self.assertEqual(marcar_vencidos(HOJE), (3, 0))
+        Boleto.objects.filter(pk=pago.pk).update(status="pago")
+        Boleto.objects.filter(pk=cancelado.pk).update(status="cancelado")
+        self.assertEqual(marcar_vencidos(HOJE), (0, 2))
+        self.assertEqual(list(Boleto.objects.filter(vencido=True).values_list("pk", flat=True)), [emitido.pk])
+
+    def test_vencimento_adiado_perde_a_marca(self):
+        (cliente,) = _criar_clientes(1)
+        boleto = self._boleto(cliente, "emitido")
+        marcar_vencidos(HOJE)
+        Boleto.objects.filter(pk=boleto.pk).update(data_vencimento=dt.date(2026, 6, 10))
+        self.assertEqual(marcar_vencidos(HOJE), (0, 1))
@@ -0,0 +1,183 @@
+"""Número de consultas SQL das telas principais: fixo, qualquer que seja o volume de dados."""
+import datetime as dt
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from billing.models import Boleto, Cliente, Tarefa
+from billing.services.progresso_service import Progresso
+from billing.services.emissao_service import LOTE_EMISSAO, gerar_em_lotes
+
+
+def _cpf(numero: int) -> str:
+    """CPF válido (dígitos verificadores corretos) derivado de ``numero``."""
+    base = [int(d) for d in f"{numero + 100000000:09d}"[-9:]]
+    for tamanho in (9, 10):
+        soma = sum(d * p for d, p in zip(base, range(tamanho + 1, 1, -1)))
+        base.append(soma * 10 % 11 % 10)
+    return "".join(map(str, base))
+
+
+def _criar_clientes(quantidade: int, inicio: int = 0):
+    return Cliente.objects.bulk_create(
+        [
+            Cliente(
+                nome=f"Cliente {i:04d}",
+                cpfCnpj=_cpf(i),
+                valorNominal=Decimal("150.00"),
+                dataVencimento=10,
+                email=f"cliente{i}@exemplo.com",
+                endereco="Praça da Sé",
+                numero="1",
+                bairro="Sé",
+                cidade="São Paulo",
+                uf="SP",
+                cep="01001-000",
+                busca=f"cliente {i:04d}",
+                documento=_cpf(i),
+            )
+            for i in range(inicio, inicio + quantidade)
+        ]
+    )
+
+
+def _criar_boletos(clientes, meses: int, primeiro: int = 0):
+    """Um boleto por cliente e mês desde jan/2024 (+ ``primeiro`` meses), o último em aberto."""
+    boletos = []
+    for cliente in clientes:
+        for indice in range(primeiro, primeiro + meses):
+            ano, mes = divmod(2024 * 12 + indice, 12)
+            pago = indice < primeiro + meses - 1
+            boletos.append(
+                Boleto(
+                    cliente=cliente,
+                    competencia_ano=ano,
+                    competencia_mes=mes + 1,
+                    data_vencimento=dt.date(ano, mes + 1, 10),
+                    valor=cliente.valorNominal,
+                    status="pago" if pago else "emitido",
+                    data_pagamento=dt.date(ano, mes + 1, 8) if pago else None,
+                    nosso_numero=f"{cliente.pk:06d}{indice:04d}",
+                )
+            )
+    Boleto.objects.bulk_create(boletos)
+
+
+class ConsultasTelasTests(TestCase):
+    """Cada tela é medida com o volume inicial e de novo depois de crescer os dados."""
+
+    CLIENTES = 120  # mais de duas páginas da geração (CLIENTES_POR_PAGINA = 50)
+    MESES = 24
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user("operador", password="x")
+        cls.clientes = _criar_clientes(cls.CLIENTES)
+        _criar_boletos(cls.clientes, cls.MESES)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _crescer(self):
+        novos = _criar_clientes(self.CLIENTES, inicio=self.CLIENTES)
+        _criar_boletos(novos, self.MESES)
+        _criar_boletos(self.clientes[:1], self.MESES, primeiro=self.MESES)
+
+    def assertConsultasFixas(self, consultas, requisicao):
+        with self.assertNumQueries(consultas):
+            requisicao()
+        self._crescer()
+        with self.assertNumQueries(consultas):
+            requisicao()
+
+    def test_lista_de_clientes(self):
+        def requisicao():
+            response = self.client.get(reverse("clientes_list"))
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConsultasFixas(2 + 1, requisicao)
+
+    def test_lista_de_boletos(self):
+        def requisicao():
+            response = self.client.get(reverse("boletos_list"))
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConsultasFixas(2 + 1, requisicao)
+
+    def test_detalhe_do_cliente(self):
+        url = reverse("cliente_detalhe", args=[self.clientes[0].pk])
+
+        def requisicao():
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(url, {"formato": "json"}).status_code, 200)
+
+        self.assertConsultasFixas(2 * (2 + 4), requisicao)
+
+    def test_exportacao_de_clientes(self):
+        exportadas = []
+
+        def requisicao():
+            response = self.client.get(reverse("clientes_exportar"))
+            # A resposta é um stream: as consultas acontecem ao consumi-lo.
+            exportadas.append(len(b"".join(response.streaming_content).splitlines()) - 1)
+
+        self.assertConsultasFixas(2 + 1, requisicao)
+        self.assertEqual(exportadas, [self.CLIENTES, 2 * self.CLIENTES])
+
+    def test_previa_da_geracao(self):
+        def requisicao():
+            response = self.client.get(reverse("gerar_boletos"), {"ano": 2026, "mes": 5, "pagina": 2})
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConsultasFixas(2 + 2, requisicao)
+
+    def test_geracao_por_regra_pede_confirmacao(self):
+        def requisicao():
+            response = self.client.post(
+                reverse("gerar_boletos"), {"ano": 2026, "mes": 5, "modo": "regra", "acao": "gerar"}
+            )
+            self.assertTemplateUsed(response, "billing/gerar_boletos_confirmar.html")
+
+        self.assertConsultasFixas(2 + 1, requisicao)
+
+    @mock.patch("billing.views.enfileirar_tarefa")
+    def test_geracao_dos_selecionados(self, enfileirar_tarefa):
+        enfileirar_tarefa.return_value = Tarefa(pk=1)
+        dados = {"ano": 2026, "mes": 5, "acao": "gerar", "clientes": [c.pk for c in self.clientes]}
+
+        def requisicao():
+            response = self.client.post(reverse("gerar_boletos"), dados)
+            self.assertRedirects(response, reverse("tarefa_detalhe", args=[1]), fetch_redirect_response=False)
+
+        self.assertConsultasFixas(2 + 2, requisicao)
+        self.assertEqual(len(enfileirar_tarefa.call_args.args[2]["cliente_ids"]), self.CLIENTES)
+
+
+class ConsultasCriacaoBoletosTests(TestCase):
+    """A criação dos boletos de um lote faz as mesmas consultas para 10 ou 200 clientes."""
+
+    def _gerar(self, clientes, mes):
+        progresso = Progresso(Tarefa.objects.create(tipo="emissao", descricao="Teste", total=len(clientes)))
+        with mock.patch("billing.services.emissao_service.emitir_lote") as emitir_lote:
+            gerar_em_lotes(progresso, [c.pk for c in clientes], 2026, mes)
+        return emitir_lote.call_args.args[1]
+
+    @staticmethod
+    def _blocos_insert(quantidade: int) -> int:
+        # O SQLite divide o INSERT em massa pelo limite de parâmetros; o Postgres usa um só.
+        campos = [campo for campo in Boleto._meta.concrete_fields if not campo.primary_key]
+        por_bloco = connection.ops.bulk_batch_size(campos, [None] * quantidade)
+        return -(-quantidade // por_bloco)
+
+    def test_lote_pequeno_e_lote_cheio(self):
+        pequeno = _criar_clientes(10)
+        cheio = _criar_clientes(LOTE_EMISSAO, inicio=10)
+        with self.assertNumQueries(15 + self._blocos_insert(10)):
+            self.assertEqual(len(self._gerar(pequeno, 5)), 10)
+        with self.assertNumQueries(15 + self._blocos_insert(LOTE_EMISSAO)):
+            self.assertEqual(len(self._gerar(cheio, 6)), LOTE_EMISSAO)
+        self.assertEqual(Boleto.objects.filter(competencia_ano=2026, status="novo").count(), 10 + LOTE_EMISSAO)
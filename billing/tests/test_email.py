@@ -0,0 +1,107 @@
+"""Outbox de e-mails com um SMTP de mentira (backend em memória do Django)."""
+import datetime as dt
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from billing.models import Boleto, Cliente, EnvioEmail
+from billing.services import email_service
+from billing.services.email_service import enfileirar_envios, processar_envios
+
+
+class _Queda(BaseException):
+    """Worker morto no meio do lote (SIGTERM, OOM): não é tratado como erro de envio."""
+
+
+class SMTPQueCai(EmailBackend):
+    """Entrega as duas primeiras mensagens e derruba o processo na terceira."""
+
+    def send_messages(self, messages):
+        if len(mail.outbox) >= 2:
+            raise _Queda()
+        return super().send_messages(messages)
+
+
+class SMTPLento(EmailBackend):
+    def send_messages(self, messages):
+        time.sleep(0.05)
+        return super().send_messages(messages)
+
+
+class EnvioEmailTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.boletos = []
+        for numero in range(3):
+            cliente = Cliente.objects.create(
+                nome=f"Cliente {numero}",
+                cpfCnpj=f"0000000000{numero}",
+                valorNominal=Decimal("100.00"),
+                dataVencimento=10,
+                email=f"cliente{numero}@exemplo.com",
+            )
+            boleto = Boleto.objects.create(
+                cliente=cliente,
+                competencia_ano=2026,
+                competencia_mes=5,
+                data_vencimento=dt.date(2026, 5, 10),
+                valor=Decimal("100.00"),
+                status="emitido",
+            )
+            boleto.guardar_pdf(f"boleto-{numero}.pdf", b"%PDF-1.4 boleto")
+            self.boletos.append(boleto)
+
+    def _status(self):
+        return list(EnvioEmail.objects.order_by("boleto_id").values_list("status", flat=True))
+
+    def test_enfileirar_conta_so_os_criados(self):
+        criar = EnvioEmail.objects.bulk_create
+
+        def outra_requisicao_chega_antes(objs, **kwargs):
+            # Outra requisição enfileira o primeiro boleto entre a leitura e o INSERT.
+            EnvioEmail.objects.create(boleto=self.boletos[0], destinatario="cliente0@exemplo.com")
+            return criar(objs, **kwargs)
+
+        with mock.patch.object(EnvioEmail.objects, "bulk_create", side_effect=outra_requisicao_chega_antes):
+            self.assertEqual(enfileirar_envios(Boleto.objects.all()), 2)
+        self.assertEqual(enfileirar_envios(Boleto.objects.all()), 0)
+        self.assertFalse(EnvioEmail.objects.exclude(lote="").exists())
+
+    def test_envia_e_grava(self):
+        enfileirar_envios(Boleto.objects.all())
+        contagem = processar_envios(workers=2)
+        self.assertEqual(contagem[email_service.ENVIADO], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self._status(), ["enviado"] * 3)
+
+    @override_settings(EMAIL_BACKEND="billing.tests.test_email.SMTPQueCai")
+    def test_mensagens_ja_enviadas_ficam_gravadas_se_o_worker_cai(self):
+        enfileirar_envios(Boleto.objects.all())
+        with self.assertRaises(_Queda):
+            processar_envios(workers=1)
+        # As duas que saíram não voltam para a fila quando a reserva expirar.
+        self.assertEqual(self._status(), ["enviado", "enviado", "enviando"])
+        EnvioEmail.objects.filter(status="enviando").update(
+            atualizado_em=dt.datetime(2000, 1, 1, tzinfo=dt.timezone.utc)
+        )
+        self.assertEqual(email_service.liberar_reservas_expiradas(), 1)
+
+    @override_settings(EMAIL_BACKEND="billing.tests.test_email.SMTPLento")
+    def test_reserva_renovada_durante_o_lote(self):
+        enfileirar_envios(Boleto.objects.all())
+        with mock.patch.object(email_service, "RENOVAR_RESERVA", 0.02), mock.patch.object(
+            email_service, "renovar_reserva", wraps=email_service.renovar_reserva
+        ) as renovar:
+            processar_envios(workers=1)
+        self.assertTrue(renovar.called)
+        self.assertEqual(self._status(), ["enviado"] * 3)
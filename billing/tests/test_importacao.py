@@ -0,0 +1,42 @@
+"""Reimportação de clientes: só as colunas presentes no arquivo mudam o cadastro."""
+import io
+from decimal import Decimal
+
+from django.test import TestCase
+
+from billing.models import Cliente
+from billing.services.importacao_service import importar_clientes, ler_linhas
+
+from .test_consultas import _cpf, _criar_clientes
+
+
+class ReimportacaoParcialTests(TestCase):
+    def _importar(self, texto):
+        return importar_clientes(ler_linhas(io.BytesIO(texto.encode()), "clientes.csv"))
+
+    def test_arquivo_so_com_nome_e_valor_nao_apaga_o_resto(self):
+        (cliente,) = _criar_clientes(1)
+        Cliente.objects.filter(pk=cliente.pk).update(ativo=False, telefone="999999999", etiqueta="vip")
+        relatorio = self._importar(f"nome;cpf;valor;vencimento\nNovo Nome;{_cpf(0)};200,00;15\n")
+        self.assertEqual(relatorio.importados, 1)
+        cliente.refresh_from_db()
+        self.assertEqual((cliente.nome, cliente.valorNominal, cliente.dataVencimento), ("Novo Nome", Decimal("200.00"), 15))
+        self.assertEqual(cliente.busca, "novo nome")
+        self.assertFalse(cliente.ativo)
+        self.assertEqual(
+            (cliente.email, cliente.telefone, cliente.etiqueta, cliente.endereco, cliente.cidade, cliente.uf, cliente.cep),
+            ("cliente0@exemplo.com", "999999999", "vip", "Praça da Sé", "São Paulo", "SP", "01001-000"),
+        )
+
+    def test_coluna_presente_e_gravada(self):
+        (cliente,) = _criar_clientes(1)
+        Cliente.objects.filter(pk=cliente.pk).update(ativo=False)
+        self._importar(f"nome;cpf;valor;vencimento;email;ativo\nCliente;{_cpf(0)};150;10;;1\n")
+        cliente.refresh_from_db()
+        self.assertTrue(cliente.ativo)
+        self.assertEqual(cliente.email, "")
+        self.assertEqual(cliente.telefone, "")
+
+    def test_cliente_novo_nasce_ativo(self):
+        self._importar(f"nome;cpf;valor;vencimento\nOutro;{_cpf(7)};150;10\n")
+        self.assertTrue(Cliente.objects.get(documento=_cpf(7)).ativo)
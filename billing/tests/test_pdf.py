@@ -0,0 +1,117 @@
+"""PDF único para impressão: arquivos ruins vão para a lista final, nunca cortam o documento."""
+import io
+import shutil
+import tempfile
+
+import pypdf
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from billing.models import Boleto, Tarefa
+from billing.services.pdf_service import _pdf_de_texto, juntar_pdfs
+from billing.services.reserva_service import TAREFAS, processar_fila
+
+from .test_consultas import _criar_boletos, _criar_clientes
+
+
+class _LeituraQuebrada(io.BytesIO):
+    def read(self, *args):
+        raise OSError("falha de leitura")
+
+
+def _boleto(numero: int) -> io.BytesIO:
+    return io.BytesIO(_pdf_de_texto([f"Boleto {numero}"]))
+
+
+class JuntarPdfsTests(SimpleTestCase):
+    def _fontes(self):
+        return [
+            ("Boleto 1", _boleto(1)),
+            ("Boleto 2 - corrompido", io.BytesIO(b"%PDF-1.4 sem objetos")),
+            ("Boleto 3 - sem PDF", None),
+            ("Boleto 4 - erro de leitura", _LeituraQuebrada()),
+            ("Boleto 5", _boleto(5)),
+            ("Boleto 6", _boleto(6)),
+        ]
+
+    def _textos(self, fontes, **opcoes):
+        destino = io.BytesIO()
+        faltando = juntar_pdfs(fontes, destino, **opcoes)
+        destino.seek(0)
+        return [pagina.extract_text() for pagina in pypdf.PdfReader(destino, strict=True).pages], faltando
+
+    def test_uma_por_folha_lista_os_nao_incluidos_no_fim(self):
+        with self.assertLogs("billing.services.pdf_service", "WARNING"):
+            textos, faltando = self._textos(self._fontes())
+        self.assertEqual(len(textos), 4)
+        self.assertIn("Boleto 1", textos[0])
+        self.assertIn("Boleto 6", textos[2])
+        self.assertEqual(len(faltando), 3)
+        for rotulo in ("corrompido", "sem PDF", "erro de leitura"):
+            self.assertIn(rotulo, textos[3])
+
+    def test_varias_por_folha(self):
+        with self.assertLogs("billing.services.pdf_service", "WARNING"):
+            textos, _ = self._textos(self._fontes(), por_folha=2)
+        self.assertEqual(len(textos), 3)  # (1, 5), (6) e a lista
+        self.assertIn("Boleto 1", textos[0])
+        self.assertIn("Boleto 5", textos[0])
+        self.assertIn("Boleto 6", textos[1])
+
+    def test_cada_origem_vai_para_o_destino_antes_da_proxima(self):
+        destino = io.BytesIO()
+        tamanhos = []
+
+        def fontes():
+            for numero in range(1, 4):
+                tamanhos.append(len(destino.getvalue()))
+                yield f"Boleto {numero}", _boleto(numero)
+
+        juntar_pdfs(fontes(), destino)
+        self.assertTrue(tamanhos[0] < tamanhos[1] < tamanhos[2])
+
+    def test_por_folha_invalido(self):
+        with self.assertRaises(ValueError):
+            juntar_pdfs([], io.BytesIO(), por_folha=3)
+
+
+class PdfUnicoTarefaTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.client.force_login(User.objects.create_user("operador"))
+        _criar_boletos(_criar_clientes(3), meses=1)
+        self.boletos = list(Boleto.objects.select_related("cliente").order_by("cliente__nome"))
+        for boleto in self.boletos[:2]:
+            boleto.guardar_pdf(f"boleto_{boleto.pk}.pdf", _pdf_de_texto([boleto.cliente.nome]))
+        # Sem nosso número nem código de solicitação: não há o que baixar do Inter.
+        Boleto.objects.filter(pk=self.boletos[2].pk).update(nosso_numero="")
+
+    def test_view_enfileira_e_o_worker_grava_o_arquivo(self):
+        dados = {"boletos": [b.pk for b in self.boletos], "formato": "pdf", "por_folha": "1"}
+        response = self.client.post(reverse("baixar_pdf_lote"), dados)
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(response, reverse("tarefa_detalhe", args=[tarefa.pk]), fetch_redirect_response=False)
+        self.assertEqual((tarefa.tipo, tarefa.status, tarefa.arquivo.name), ("pdf_unico", "pendente", ""))
+
+        self.assertEqual(processar_fila(TAREFAS, worker="w1")["concluida"], 1)
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.processados, tarefa.falhas), (3, 1))
+        self.assertTrue(self.client.get(reverse("tarefa_progresso", args=[tarefa.pk])).json()["arquivo"])
+
+        response = self.client.get(reverse("tarefa_arquivo", args=[tarefa.pk]))
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        paginas = pypdf.PdfReader(io.BytesIO(b"".join(response.streaming_content))).pages
+        self.assertEqual(len(paginas), 3)
+        self.assertIn(self.boletos[0].cliente.nome, paginas[0].extract_text())
+        self.assertIn(f"Boleto {self.boletos[2].pk}", paginas[2].extract_text())
+
+    def test_por_folha_invalido_nao_enfileira(self):
+        dados = {"boletos": [self.boletos[0].pk], "formato": "pdf", "por_folha": "3"}
+        response = self.client.post(reverse("baixar_pdf_lote"), dados)
+        self.assertRedirects(response, reverse("boletos_list"), fetch_redirect_response=False)
+        self.assertFalse(Tarefa.objects.exists())
@@ -0,0 +1,72 @@
+"""Reajuste com regeração: boleto que entrou em emissão no meio mantém o valor enviado."""
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from billing.models import Boleto, Cliente, IntencaoEmissao, Reajuste, ResumoRecebiveis
+from billing.services import reajuste_service
+from billing.services.emissao_service import criar_boletos, emitir_boleto
+from billing.services.reajuste_service import reajustar_clientes
+from billing.services.resumo_service import reconstruir_resumo
+
+from .test_consultas import _criar_clientes
+
+
+def _rollup():
+    return sorted(
+        ResumoRecebiveis.objects.filter(quantidade__gt=0).values_list("competencia_mes", "status", "quantidade", "valor_total")
+    )
+
+
+class RegerarBoletosTests(TestCase):
+    def setUp(self):
+        self.clientes = _criar_clientes(2)
+        self.boletos, _ = criar_boletos(self.clientes, 2026, 5)
+        reconstruir_resumo()
+
+    def test_intencao_gravada_no_meio_mantem_o_valor(self):
+        regerar = reajuste_service._regerar_boletos
+
+        def emissao_chega_antes(boletos):
+            # Um worker reserva a intenção depois da leitura e antes do UPDATE.
+            IntencaoEmissao.objects.create(boleto=self.boletos[0], seu_numero="X1")
+            return regerar(boletos)
+
+        with mock.patch.object(reajuste_service, "_regerar_boletos", side_effect=emissao_chega_antes):
+            previsao = reajustar_clientes(
+                Cliente.objects.all(), Decimal("1.1"), descricao="Reajuste", regerar_a_partir=(2026, 5)
+            )
+        self.assertEqual(previsao.boletos, 1)
+        self.assertEqual(Reajuste.objects.get().boletos_atualizados, 1)
+        valores = dict(Boleto.objects.values_list("pk", "valor"))
+        self.assertEqual(valores[self.boletos[0].pk], Decimal("150.00"))
+        self.assertEqual(valores[self.boletos[1].pk], Decimal("165.00"))
+        # O rollup incremental bate com o recalculado do zero.
+        incremental = _rollup()
+        reconstruir_resumo()
+        self.assertEqual(incremental, _rollup())
+
+    def test_sem_corrida_regera_todos(self):
+        previsao = reajustar_clientes(
+            Cliente.objects.all(), Decimal("1.1"), descricao="Reajuste", regerar_a_partir=(2026, 5)
+        )
+        self.assertEqual(previsao.boletos, 2)
+        self.assertEqual(set(Boleto.objects.values_list("valor", flat=True)), {Decimal("165.00")})
+        incremental = _rollup()
+        reconstruir_resumo()
+        self.assertEqual(incremental, _rollup())
+
+
+class EmissaoDepoisDoReajusteTests(TestCase):
+    def test_emissao_envia_o_valor_lido_com_a_intencao(self):
+        (cliente,) = _criar_clientes(1)
+        (boleto,), _ = criar_boletos([cliente], 2026, 5)
+        # O worker leu o boleto antes de um reajuste gravar o valor novo.
+        Boleto.objects.filter(pk=boleto.pk).update(valor=Decimal("165.00"))
+        inter = mock.Mock(conta=None)
+        inter.emitir_boleto.return_value = {"nossoNumero": "1", "codigoSolicitacao": "abc"}
+        emitir_boleto(inter, boleto, baixar_pdf=False)
+        self.assertEqual(inter.emitir_boleto.call_args.args[0]["valorNominal"], 165.0)
+        boleto.refresh_from_db()
+        self.assertEqual((boleto.status, boleto.valor), ("emitido", Decimal("165.00")))
@@ -0,0 +1,56 @@
+"""Reservas da fila: adiamento de PDF não pode ficar preso ao heartbeat do worker."""
+import datetime as dt
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from billing.models import Boleto, Cliente
+from billing.services.reserva_service import (
+    PDF,
+    liberar_reservas,
+    renovar_reservas,
+    reservar_boletos,
+)
+
+DURACAO = dt.timedelta(minutes=2)
+
+
+class AdiamentoPdfTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            nome="Cliente",
+            cpfCnpj="00000000001",
+            valorNominal=Decimal("100.00"),
+            dataVencimento=10,
+        )
+        self.boleto = Boleto.objects.create(
+            cliente=cliente,
+            competencia_ano=2026,
+            competencia_mes=5,
+            data_vencimento=dt.date(2026, 5, 10),
+            valor=Decimal("100.00"),
+            status="emitido",
+            codigo_solicitacao="abc",
+        )
+
+    def _adiar(self, agora):
+        self.assertEqual([b.id for b in reservar_boletos(PDF, "w1", 10, DURACAO)], [self.boleto.id])
+        liberar_reservas("w1", [self.boleto.id], ate=agora + dt.timedelta(minutes=10))
+
+    def test_heartbeat_nao_renova_adiamento(self):
+        agora = timezone.now()
+        self._adiar(agora)
+        self.assertEqual(renovar_reservas("w1", DURACAO), 0)
+        self.boleto.refresh_from_db()
+        self.assertEqual(self.boleto.reservado_por, "")
+
+    def test_adiado_so_volta_depois_do_prazo(self):
+        agora = timezone.now()
+        self._adiar(agora)
+        self.assertEqual(reservar_boletos(PDF, "w1", 10, DURACAO), [])
+        self.assertEqual(reservar_boletos(PDF, "w2", 10, DURACAO), [])
+        depois = agora + dt.timedelta(minutes=11)
+        with mock.patch("billing.services.reserva_service.timezone.now", return_value=depois):
+            self.assertEqual([b.id for b in reservar_boletos(PDF, "w2", 10, DURACAO)], [self.boleto.id])
@@ -0,0 +1,146 @@
+"""Conciliação do retorno: só liquida quando o pagamento confere com o boleto."""
+import datetime as dt
+import io
+from decimal import Decimal
+
+from django.test import TestCase
+
+from billing.models import Boleto, Cliente
+from billing.services.retorno_service import (
+    CAMPOS_CNAB240_T,
+    CAMPOS_CNAB240_U,
+    CAMPOS_CNAB400,
+    processar_retorno,
+)
+
+CPF = "52998224725"
+CNPJ_BENEFICIARIO = "11222333000181"
+
+
+def _linha(tamanho: int, campos) -> str:
+    linha = [" "] * tamanho
+    for (inicio, fim), texto in campos:
+        largura = fim - inicio + 1
+        linha[inicio - 1:fim] = list(texto.rjust(largura, "0")[:largura])
+    return "".join(linha)
+
+
+def _centavos(valor: str) -> str:
+    return str(int(Decimal(valor) * 100))
+
+
+def _cnab400(nosso_numero: str, valor_pago: str, valor_titulo: str = "150.00") -> bytes:
+    detalhe = _linha(
+        400,
+        [
+            ((1, 1), "1"),
+            ((2, 3), "02"),
+            ((4, 17), CNPJ_BENEFICIARIO),
+            (CAMPOS_CNAB400["nosso_numero"], nosso_numero),
+            (CAMPOS_CNAB400["ocorrencia"], "06"),
+            (CAMPOS_CNAB400["data_ocorrencia"], "080526"),
+            (CAMPOS_CNAB400["vencimento"], "100526"),
+            (CAMPOS_CNAB400["valor_titulo"], _centavos(valor_titulo)),
+            (CAMPOS_CNAB400["valor_pago"], _centavos(valor_pago)),
+        ],
+    )
+    return "\r\n".join([_linha(400, [((1, 1), "0")]), detalhe, _linha(400, [((1, 1), "9")])]).encode("latin-1")
+
+
+def _cnab240(documento: str, valor_pago: str, valor_titulo: str = "150.00") -> bytes:
+    t = _linha(
+        240,
+        [
+            ((8, 8), "3"),
+            ((14, 14), "T"),
+            (CAMPOS_CNAB240_T["movimento"], "06"),
+            (CAMPOS_CNAB240_T["vencimento"], "10052026"),
+            (CAMPOS_CNAB240_T["valor_titulo"], _centavos(valor_titulo)),
+            (CAMPOS_CNAB240_T["documento"], documento),
+        ],
+    )
+    u = _linha(
+        240,
+        [
+            ((8, 8), "3"),
+            ((14, 14), "U"),
+            (CAMPOS_CNAB240_U["valor_pago"], _centavos(valor_pago)),
+            (CAMPOS_CNAB240_U["data_ocorrencia"], "08052026"),
+        ],
+    )
+    return "\r\n".join([_linha(240, [((8, 8), "0")]), t, u]).encode("latin-1")
+
+
+def _ofx(valor: str, memo: str) -> bytes:
+    return (
+        "OFXHEADER:100\r\n<OFX><BANKTRANLIST>\r\n<STMTTRN>\r\n<TRNTYPE>CREDIT\r\n"
+        f"<DTPOSTED>20260508\r\n<TRNAMT>{valor}\r\n<MEMO>{memo}\r\n</STMTTRN>\r\n</BANKTRANLIST></OFX>\r\n"
+    ).encode("latin-1")
+
+
+class ConciliacaoRetornoTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nome="Pagador", cpfCnpj=CPF, valorNominal=Decimal("150.00"), dataVencimento=10
+        )
+        self.boleto = Boleto.objects.create(
+            cliente=self.cliente,
+            competencia_ano=2026,
+            competencia_mes=5,
+            data_vencimento=dt.date(2026, 5, 10),
+            valor=Decimal("150.00"),
+            status="emitido",
+            nosso_numero="00012345678",
+        )
+
+    def _processar(self, conteudo: bytes):
+        relatorio = processar_retorno(io.BytesIO(conteudo))
+        self.boleto.refresh_from_db()
+        return relatorio
+
+    def test_ofx_com_valor_do_boleto_liquida(self):
+        relatorio = self._processar(_ofx("150.00", "PAGTO BOLETO 20260508 NN 00012345678"))
+        self.assertEqual((relatorio.liquidados, relatorio.divergentes), (1, 0))
+        self.assertEqual(self.boleto.status, "pago")
+
+    def test_ofx_com_valor_diferente_vai_para_conferencia(self):
+        relatorio = self._processar(_ofx("15.00", "PIX 00012345678"))
+        self.assertEqual((relatorio.liquidados, relatorio.divergentes), (0, 1))
+        self.assertEqual(self.boleto.status, "emitido")
+
+    def test_ofx_nao_usa_qualquer_sequencia_de_digitos_como_nosso_numero(self):
+        # 20260508 (data) e 123456 não têm o tamanho de um nosso número gravado.
+        relatorio = self._processar(_ofx("150.00", "TED 20260508 AG 123456"))
+        self.assertEqual((relatorio.liquidados, relatorio.nao_encontrados), (0, 1))
+
+    def test_cnab400_nao_le_o_cnpj_do_beneficiario_como_pagador(self):
+        # Um boleto em aberto com o mesmo valor e vencimento, de um cliente com o CNPJ
+        # que aparece nas posições 4–17, não pode ser liquidado por engano.
+        beneficiario = Cliente.objects.create(
+            nome="Beneficiário", cpfCnpj=CNPJ_BENEFICIARIO, valorNominal=Decimal("150.00"), dataVencimento=10
+        )
+        outro = Boleto.objects.create(
+            cliente=beneficiario,
+            competencia_ano=2026,
+            competencia_mes=5,
+            data_vencimento=dt.date(2026, 5, 10),
+            valor=Decimal("150.00"),
+            status="emitido",
+        )
+        relatorio = self._processar(_cnab400("99999999999", "150.00"))
+        self.assertEqual((relatorio.liquidados, relatorio.nao_encontrados), (0, 1))
+        outro.refresh_from_db()
+        self.assertEqual(outro.status, "emitido")
+
+    def test_cnab400_com_juros_liquida_e_pagamento_menor_nao(self):
+        relatorio = self._processar(_cnab400("12345678", "140.00"))
+        self.assertEqual((relatorio.liquidados, relatorio.divergentes), (0, 1))
+        relatorio = self._processar(_cnab400("12345678", "152.35"))
+        self.assertEqual(relatorio.liquidados, 1)
+        self.assertEqual(self.boleto.status, "pago")
+
+    def test_cnab240_por_documento_confere_o_valor(self):
+        relatorio = self._processar(_cnab240(CPF, "150.00", valor_titulo="99.00"))
+        self.assertEqual((relatorio.liquidados, relatorio.nao_encontrados), (0, 1))
+        relatorio = self._processar(_cnab240(CPF, "150.00"))
+        self.assertEqual(relatorio.liquidados, 1)
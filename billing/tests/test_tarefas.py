@@ -0,0 +1,86 @@
+"""Tarefas da interface: gravadas pela view, executadas pelo worker processar_fila tarefas."""
+import datetime as dt
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from billing.models import Boleto, IntencaoEmissao, Tarefa
+from billing.services.emissao_service import EMITIDO, ResultadoEmissao, criar_boletos
+from billing.services.reserva_service import TAREFAS, processar_fila
+
+from .test_consultas import _criar_clientes
+
+
+def _emitir_sem_inter(inter, boletos, *, workers=None, ao_concluir=None):
+    """Stand-in de emitir_lote: dá cada boleto como emitido, sem chamar o Inter."""
+    resultados = []
+    for boleto in boletos:
+        resultado = ResultadoEmissao(EMITIDO)
+        Boleto.objects.filter(pk=boleto.pk).update(status="emitido")
+        if ao_concluir:
+            ao_concluir(boleto, resultado)
+        resultados.append((boleto, resultado))
+    return resultados
+
+
+@mock.patch("billing.services.emissao_service.emitir_lote", side_effect=_emitir_sem_inter)
+class TarefasTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("operador"))
+        self.clientes = _criar_clientes(3)
+
+    def _gerar(self):
+        dados = {"ano": 2026, "mes": 5, "acao": "gerar", "clientes": [c.pk for c in self.clientes]}
+        return self.client.post(reverse("gerar_boletos"), dados)
+
+    def test_view_so_grava_a_tarefa(self, emitir_lote):
+        response = self._gerar()
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(response, reverse("tarefa_detalhe", args=[tarefa.pk]), fetch_redirect_response=False)
+        self.assertEqual(tarefa.status, "pendente")
+        self.assertEqual(sorted(tarefa.parametros["cliente_ids"]), sorted(c.pk for c in self.clientes))
+        self.assertFalse(Boleto.objects.exists())
+        emitir_lote.assert_not_called()
+
+    def test_worker_executa_a_tarefa(self, emitir_lote):
+        self._gerar()
+        contagem = processar_fila(TAREFAS, worker="w1")
+        self.assertEqual(contagem["concluida"], 1)
+        tarefa = Tarefa.objects.get()
+        self.assertEqual((tarefa.status, tarefa.worker, tarefa.processados), ("concluida", "w1", 3))
+        self.assertEqual(Boleto.objects.filter(status="emitido").count(), 3)
+
+    def test_tarefa_abandonada_vira_falha(self, emitir_lote):
+        antiga = timezone.now() - dt.timedelta(hours=1)
+        tarefa = Tarefa.objects.create(tipo="emissao", descricao="Emissão 05/2026", status="rodando", worker="morto")
+        Tarefa.objects.filter(pk=tarefa.pk).update(atualizada_em=antiga)
+        recente = Tarefa.objects.create(tipo="emissao", descricao="Emissão 06/2026", status="rodando", worker="vivo")
+        processar_fila(TAREFAS, worker="w1")
+        tarefa.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual(tarefa.status, "falhou")
+        self.assertTrue(tarefa.erro)
+        self.assertEqual(recente.status, "rodando")
+
+    def test_boleto_novo_sem_intencao_e_emitido_de_novo(self, emitir_lote):
+        # Uma tarefa anterior criou os boletos e morreu antes de emiti-los; um deles
+        # chegou a ter a intenção gravada e fica para recuperar_emissoes.
+        novos, _ = criar_boletos(list(self.clientes), 2026, 5)
+        IntencaoEmissao.objects.create(boleto=novos[0], seu_numero="X1")
+        self._gerar()
+        processar_fila(TAREFAS, worker="w1")
+        emitidos = {boleto.pk for boleto in emitir_lote.call_args.args[1]}
+        self.assertEqual(emitidos, {novos[1].pk, novos[2].pk})
+        mensagens = [texto for _, texto in Tarefa.objects.get().mensagens]
+        self.assertEqual(mensagens, [f"Boleto já existia: {self.clientes[0].nome} 05/2026"])
+
+    def test_eventos_nao_prendem_a_conexao(self, emitir_lote):
+        self._gerar()
+        tarefa = Tarefa.objects.get()
+        response = self.client.get(reverse("tarefa_eventos", args=[tarefa.pk]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn(b'"na_fila": true', response.content)
+        self.assertTrue(response.content.startswith(b"retry: "))
@@ -4,8 +4,14 @@ from . import views
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("painel/", views.painel, name="painel"),
+    path("painel/atraso/", views.atraso, name="atraso"),
     path("clientes/", views.clientes_list, name="clientes_list"),
+    path("clientes/buscar/", views.clientes_buscar, name="clientes_buscar"),
+    path("clientes/importar/", views.clientes_importar, name="clientes_importar"),
+    path("clientes/exportar/", views.clientes_exportar, name="clientes_exportar"),
     path("clientes/novo/", views.cliente_create, name="cliente_create"),
+    path("clientes/<int:cliente_id>/", views.cliente_detalhe, name="cliente_detalhe"),
     path("clientes/<int:cliente_id>/editar/", views.cliente_update, name="cliente_update"),
     path("clientes/<int:cliente_id>/excluir/", views.cliente_delete, name="cliente_delete"),
     path("boletos/", views.boletos_list, name="boletos_list"),
@@ -15,6 +21,13 @@ urlpatterns = [
     path("gerar/", views.gerar_boletos, name="gerar_boletos"),
     path("boletos/<int:boleto_id>/pdf/", views.baixar_pdf_view, name="baixar_pdf"),
     path("boletos/pdfs/", views.baixar_pdf_lote, name="baixar_pdf_lote"),
+    path("boletos/retorno/", views.boletos_retorno, name="boletos_retorno"),
+    path("boletos/retentar/", views.retentar_boletos, name="retentar_boletos"),
+    path("boletos/enviar-emails/", views.enviar_emails, name="enviar_emails"),
     path("boletos/<int:boleto_id>/pagar/", views.marcar_pago, name="marcar_pago"),
     path("boletos/<int:boleto_id>/cancelar/", views.cancelar_boleto, name="cancelar_boleto"),
+    path("tarefas/<int:tarefa_id>/", views.tarefa_detalhe, name="tarefa_detalhe"),
+    path("tarefas/<int:tarefa_id>/progresso/", views.tarefa_progresso, name="tarefa_progresso"),
+    path("tarefas/<int:tarefa_id>/eventos/", views.tarefa_eventos, name="tarefa_eventos"),
+    path("tarefas/<int:tarefa_id>/arquivo/", views.tarefa_arquivo, name="tarefa_arquivo"),
 ]
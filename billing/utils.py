@@ -0,0 +1,12 @@
+import unicodedata
+
+
+def somente_digitos(valor) -> str:
+    return "".join(ch for ch in str(valor or "") if ch.isdigit())
+
+
+def normalizar_texto(valor) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados (usado nas colunas de busca)."""
+    texto = unicodedata.normalize("NFKD", str(valor or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return " ".join(texto.lower().split())
@@ -0,0 +1,160 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Mapping, Optional
+
+from .models import UF_CHOICES
+from .utils import somente_digitos
+
+UFS = frozenset(uf for uf, _ in UF_CHOICES)
+
+
+def _digito_verificador(digitos: str, pesos) -> int:
+    resto = sum(int(d) * p for d, p in zip(digitos, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def cpf_valido(cpf: str) -> bool:
+    digitos = somente_digitos(cpf)
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+    primeiro = _digito_verificador(digitos[:9], range(10, 1, -1))
+    segundo = _digito_verificador(digitos[:10], range(11, 1, -1))
+    return digitos[9:] == f"{primeiro}{segundo}"
+
+
+_PESOS_CNPJ_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_CNPJ_2 = (6,) + _PESOS_CNPJ_1
+
+
+def cnpj_valido(cnpj: str) -> bool:
+    digitos = somente_digitos(cnpj)
+    if len(digitos) != 14 or digitos == digitos[0] * 14:
+        return False
+    primeiro = _digito_verificador(digitos[:12], _PESOS_CNPJ_1)
+    segundo = _digito_verificador(digitos[:13], _PESOS_CNPJ_2)
+    return digitos[12:] == f"{primeiro}{segundo}"
+
+
+def documento_valido(cpf_cnpj: str) -> bool:
+    digitos = somente_digitos(cpf_cnpj)
+    if len(digitos) == 11:
+        return cpf_valido(digitos)
+    if len(digitos) == 14:
+        return cnpj_valido(digitos)
+    return False
+
+
+def normalizar_cep(cep: str) -> Optional[str]:
+    """Retorna o CEP no formato 00000-000, ou ``None`` se não tiver 8 dígitos."""
+    digitos = somente_digitos(cep)
+    if len(digitos) != 8:
+        return None
+    return f"{digitos[:5]}-{digitos[5:]}"
+
+
+def normalizar_uf(uf: str) -> Optional[str]:
+    valor = str(uf or "").strip().upper()
+    return valor if valor in UFS else None
+
+
+# Faixas de CEP (5 primeiros dígitos) por UF, segundo os Correios.
+_FAIXAS_CEP = sorted([
+    (1000, 19999, 'SP'), (20000, 28999, 'RJ'), (29000, 29999, 'ES'), (30000, 39999, 'MG'),
+    (40000, 48999, 'BA'), (49000, 49999, 'SE'), (50000, 56999, 'PE'), (57000, 57999, 'AL'),
+    (58000, 58999, 'PB'), (59000, 59999, 'RN'), (60000, 63999, 'CE'), (64000, 64999, 'PI'),
+    (65000, 65999, 'MA'), (66000, 68899, 'PA'), (68900, 68999, 'AP'), (69000, 69299, 'AM'),
+    (69300, 69399, 'RR'), (69400, 69899, 'AM'), (69900, 69999, 'AC'), (70000, 72799, 'DF'),
+    (72800, 72999, 'GO'), (73000, 73699, 'DF'), (73700, 76799, 'GO'), (76800, 76999, 'RO'),
+    (77000, 77999, 'TO'), (78000, 78899, 'MT'), (79000, 79999, 'MS'), (80000, 87999, 'PR'),
+    (88000, 89999, 'SC'), (90000, 99999, 'RS'),
+])
+_INICIOS_CEP = [inicio for inicio, _, _ in _FAIXAS_CEP]
+
+
+def uf_do_cep(cep: str) -> Optional[str]:
+    digitos = somente_digitos(cep)
+    if len(digitos) != 8:
+        return None
+    prefixo = int(digitos[:5])
+    posicao = bisect_right(_INICIOS_CEP, prefixo) - 1
+    if posicao < 0:
+        return None
+    _, fim, uf = _FAIXAS_CEP[posicao]
+    return uf if prefixo <= fim else None
+
+
+def converter_decimal(valor) -> Decimal:
+    """Aceita ``1234.56``, ``1234,56`` e ``1.234,56``."""
+    if isinstance(valor, Decimal):
+        return valor
+    if isinstance(valor, (int, float)):
+        return Decimal(str(valor))
+    texto = str(valor or "").strip().replace("R$", "").replace(" ", "")
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(texto)
+    except InvalidOperation as exc:
+        raise ValueError(f"Valor inválido: {valor}") from exc
+
+
+# Campos do pagador que o Inter exige além de nome e CPF/CNPJ.
+CAMPOS_ENDERECO_OBRIGATORIOS = ("endereco", "cidade", "uf", "cep")
+CAMPOS_EMISSAO = ("nome", "cpfCnpj", "valorNominal") + CAMPOS_ENDERECO_OBRIGATORIOS
+
+
+def problemas_emissao(dados: Mapping[str, Any]) -> List[str]:
+    """Motivos pelos quais o Inter recusaria a cobrança; lista vazia = pode emitir."""
+    problemas: List[str] = []
+    if not str(dados.get("nome") or "").strip():
+        problemas.append("nome obrigatório")
+    cpf_cnpj = str(dados.get("cpfCnpj") or "")
+    if not documento_valido(cpf_cnpj):
+        problemas.append(f"CPF/CNPJ inválido: {cpf_cnpj or '(vazio)'}")
+    try:
+        if converter_decimal(dados.get("valorNominal")) <= 0:
+            raise ValueError
+    except (ValueError, ArithmeticError):
+        problemas.append(f"valor inválido: {dados.get('valorNominal')}")
+
+    for campo in CAMPOS_ENDERECO_OBRIGATORIOS:
+        if not str(dados.get(campo) or "").strip():
+            problemas.append(f"{campo} obrigatório")
+
+    uf = str(dados.get("uf") or "").strip()
+    cep = str(dados.get("cep") or "").strip()
+    if uf and not normalizar_uf(uf):
+        problemas.append(f"UF inválida: {uf}")
+    if cep:
+        uf_cep = uf_do_cep(cep)
+        if normalizar_cep(cep) is None:
+            problemas.append(f"CEP inválido: {cep}")
+        elif uf_cep is None:
+            problemas.append(f"CEP inexistente: {cep}")
+        elif uf and uf_cep != uf.upper():
+            problemas.append(f"CEP {cep} pertence a {uf_cep}, não a {uf.upper()}")
+    return problemas
+
+
+@dataclass
+class RelatorioValidacao:
+    total: int = 0
+    invalidos: Dict[int, List[str]] = field(default_factory=dict)
+    nomes: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def validos(self) -> int:
+        return self.total - len(self.invalidos)
+
+
+def validar_clientes(queryset) -> RelatorioValidacao:
+    """Valida os dados de emissão de todos os clientes do queryset numa só leitura."""
+    relatorio = RelatorioValidacao()
+    for dados in queryset.values("id", *CAMPOS_EMISSAO).iterator(chunk_size=2000):
+        relatorio.total += 1
+        problemas = problemas_emissao(dados)
+        if problemas:
+            relatorio.invalidos[dados["id"]] = problemas
+            relatorio.nomes[dados["id"]] = dados["nome"]
+    return relatorio
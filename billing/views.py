@@ -1,22 +1,37 @@
 import base64
-import calendar
 import datetime as dt
 import io
+import json
 import zipfile
 from pathlib import Path
 from typing import Optional, List, Set
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import FileResponse, HttpResponseNotFound, HttpResponse
-from django.db import transaction
+from django.http import FileResponse, HttpResponseNotFound, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
 from django.utils.text import slugify
 
-from .models import Cliente, Boleto
-from .forms import SelecionarClientesForm, ClienteForm, BoletoForm
-from .services.inter_service import InterService
+from .models import Cliente, Boleto, Tarefa
+from .forms import SelecionarClientesForm, ClienteForm, BoletoForm, ImportarClientesForm, ProcessarRetornoForm
+from .services.inter_service import InterService, ServicosInter
+from .services.emissao_service import LOTE_EMISSAO, boletos_retentaveis
+from .services.arquivo_service import referente_a
+from .services.atraso_service import relatorio_atraso
+from .services.busca_service import buscar_clientes, filtrar_clientes
+from .services.email_service import enfileirar_envios
+from .services.importacao_service import exportar_clientes_csv, importar_clientes, ler_linhas
+from .services.pdf_service import POR_FOLHA
+from .services.progresso_service import enfileirar_tarefa, estado_tarefa
+from .services.resumo_service import acumular_transicoes, historico_cliente, montar_painel
+from .services.retorno_service import processar_retorno
+from .validacao import CAMPOS_EMISSAO, RelatorioValidacao, problemas_emissao, validar_clientes
 
 
 def _arquivo_pdf_nome(boleto: Boleto) -> str:
@@ -28,7 +43,7 @@ def _arquivo_pdf_nome(boleto: Boleto) -> str:
     return f"{slug}.pdf"
 
 
-def _buscar_pdf_bytes(inter: InterService, boleto: Boleto) -> Optional[bytes]:
+def _buscar_pdf_bytes(servicos: ServicosInter, boleto: Boleto) -> Optional[bytes]:
     if boleto.pdf:
         with boleto.pdf.open("rb") as stream:
             return stream.read()
@@ -40,7 +55,8 @@ def _buscar_pdf_bytes(inter: InterService, boleto: Boleto) -> Optional[bytes]:
     for ident, campo in identificadores:
         if not ident:
             continue
-        pdf_bytes = inter.baixar_pdf(ident, campo=campo)
+        with referente_a(boleto.pk):
+            pdf_bytes = servicos.para(boleto.conta, exigir_ativa=False).baixar_pdf(ident, campo=campo)
         if pdf_bytes:
             if isinstance(pdf_bytes, str):
                 pdf_bytes = base64.b64decode(pdf_bytes)
@@ -53,10 +69,95 @@ def home(request):
     return redirect("clientes_list")
 
 
+@login_required
+def painel(request):
+    try:
+        ano = int(request.GET.get("ano") or 0) or None
+    except ValueError:
+        ano = None
+    return render(request, "billing/painel.html", montar_painel(ano))
+
+
+@login_required
+def atraso(request):
+    return render(request, "billing/atraso.html", relatorio_atraso())
+
+
 @login_required
 def clientes_list(request):
-    clientes = Cliente.objects.all().order_by("nome")
-    return render(request, "billing/clientes_list.html", {"clientes": clientes})
+    termo = request.GET.get("q", "").strip()
+    clientes = filtrar_clientes(Cliente.objects.all(), termo).order_by("nome")
+    return render(request, "billing/clientes_list.html", {"clientes": clientes, "termo": termo})
+
+
+@login_required
+def clientes_buscar(request):
+    termo = request.GET.get("q", "").strip()
+    try:
+        limite = min(max(int(request.GET.get("limite", 10)), 1), 50)
+    except ValueError:
+        limite = 10
+    resultados = buscar_clientes(termo, limite) if termo else []
+    return JsonResponse({"q": termo, "resultados": resultados})
+
+
+@login_required
+def clientes_importar(request):
+    form = ImportarClientesForm(request.POST or None, request.FILES or None)
+    relatorio = None
+    if form.is_valid():
+        arquivo = form.cleaned_data["arquivo"]
+        try:
+            relatorio = importar_clientes(
+                ler_linhas(arquivo.file, arquivo.name),
+                simular=form.cleaned_data["simular"],
+            )
+        except (RuntimeError, UnicodeDecodeError) as exc:
+            messages.error(request, f"Falha ao ler o arquivo: {exc}")
+        else:
+            acao = "validados" if form.cleaned_data["simular"] else "importados"
+            messages.success(
+                request,
+                f"{relatorio.importados} cliente(s) {acao}, {relatorio.rejeitados} linha(s) rejeitada(s).",
+            )
+            if relatorio.incompletos:
+                messages.warning(
+                    request,
+                    f"{relatorio.incompletos} cliente(s) sem endereço/CEP completos: não poderão ser emitidos até a correção.",
+                )
+    return render(request, "billing/clientes_importar.html", {"form": form, "relatorio": relatorio})
+
+
+@login_required
+def clientes_exportar(request):
+    response = StreamingHttpResponse(exportar_clientes_csv(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = "attachment; filename=clientes.csv"
+    return response
+
+
+CAMPOS_HISTORICO = (
+    "id", "competencia_ano", "competencia_mes", "data_vencimento", "valor", "status", "data_pagamento"
+)
+
+
+@login_required
+def cliente_detalhe(request, cliente_id: int):
+    cliente = get_object_or_404(Cliente, id=cliente_id)
+    historico = historico_cliente(cliente)
+    # Percorre o índice (cliente, competencia_ano, competencia_mes) de trás para frente.
+    boletos = cliente.boletos.only("cliente", *CAMPOS_HISTORICO).order_by("-competencia_ano", "-competencia_mes")
+    if request.GET.get("formato") == "json":
+        historico.pop("hoje")
+        return JsonResponse(
+            {
+                "cliente": {"id": cliente.id, "nome": cliente.nome, "cpfCnpj": cliente.cpfCnpj},
+                **historico,
+                "boletos": list(boletos.values(*CAMPOS_HISTORICO)),
+            }
+        )
+    return render(
+        request, "billing/cliente_detalhe.html", {"cliente": cliente, "boletos": boletos, **historico}
+    )
 
 
 @login_required
@@ -84,7 +185,9 @@ def cliente_update(request, cliente_id: int):
 def cliente_delete(request, cliente_id: int):
     cliente = get_object_or_404(Cliente, id=cliente_id)
     if request.method == "POST":
-        cliente.delete()
+        # Um sinal por boleto removido em cascata: o rollup é atualizado uma vez só.
+        with transaction.atomic(), acumular_transicoes(ufs={cliente.id: cliente.uf}):
+            cliente.delete()
         messages.success(request, "Cliente removido.")
         return redirect("clientes_list")
     return render(request, "billing/cliente_confirm_delete.html", {"cliente": cliente})
@@ -127,109 +230,139 @@ def boleto_delete(request, boleto_id: int):
     return render(request, "billing/boleto_confirm_delete.html", {"boleto": boleto})
 
 
+CLIENTES_POR_PAGINA = 50
+# Quantos clientes com pendência são listados nominalmente nas mensagens.
+LIMITE_PENDENCIAS_LISTADAS = 10
+
+
+def _notificar_pendencias(request, relatorio: RelatorioValidacao) -> None:
+    if not relatorio.invalidos:
+        return
+    messages.warning(
+        request,
+        f"{len(relatorio.invalidos)} cliente(s) ignorado(s) por dados incompletos ou inválidos "
+        f"(corrija o cadastro e gere novamente).",
+    )
+    for cliente_id, problemas in list(relatorio.invalidos.items())[:LIMITE_PENDENCIAS_LISTADAS]:
+        messages.warning(request, f"{relatorio.nomes[cliente_id]}: {'; '.join(problemas)}")
+
+
 @login_required
 def gerar_boletos(request):
-    form = SelecionarClientesForm(request.POST or None)
-    if request.method == "POST" and form.is_valid():
+    # GET (ou POST de navegação: "Atualizar lista", troca de página) só mostra a
+    # lista; as páginas trocam por POST para levar os marcados das outras páginas.
+    dados = request.POST if request.method == "POST" else request.GET
+    form = SelecionarClientesForm(dados or None)
+    # Só os botões "Gerar" e "Confirmar" emitem; qualquer outro envio apenas navega.
+    acao = dados.get("acao", "") if request.method == "POST" else ""
+    if acao in ("gerar", "confirmar") and form.is_valid():
         ano = form.cleaned_data["ano"]
         mes = form.cleaned_data["mes"]
-        clientes = form.cleaned_data["clientes"]
-        inter = InterService()
-
-        with transaction.atomic():
-            for cli in clientes:
-                # Calcula data de vencimento (ajustando para ÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Âºltimo dia do mÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Âªs, se necessÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¡rio)
-                last_day = calendar.monthrange(ano, mes)[1]
-                dia = min(cli.dataVencimento, last_day)
-                data_venc = dt.date(ano, mes, dia)
-
-                # Evita duplicidade da mesma competÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Âªncia
-                boleto, created = Boleto.objects.get_or_create(
-                    cliente=cli, competencia_ano=ano, competencia_mes=mes,
-                    defaults={
-                        "data_vencimento": data_venc,
-                        "valor": cli.valorNominal,
-                    }
+        clientes = form.clientes_queryset().select_related("conta")
+        if form.cleaned_data["modo"] == SelecionarClientesForm.MODO_REGRA:
+            total = clientes.count()
+            if acao != "confirmar" or dados.get("total_confirmado") != str(total):
+                # Emissão por regra só depois de ver quantos clientes ela alcança
+                # (e de novo se o número mudou desde a confirmação).
+                return render(
+                    request,
+                    "billing/gerar_boletos_confirmar.html",
+                    {"form": form, "total": total, "ano": ano, "mes": mes},
                 )
-                if not created:
-                    messages.info(request, f"Boleto jÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¡ existia: {cli.nome} {mes:02d}/{ano}")
-                    continue
-
-                # Monta dict no formato esperado pelo serviÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â§o (Banco Inter)
-                cli_dict = {
-                    "valorNominal": float(cli.valorNominal),
-                    "nome": cli.nome,
-                    "cpfCnpj": cli.cpfCnpj,
-                    "email": cli.email,
-                    "ddd": cli.ddd,
-                    "telefone": cli.telefone,
-                    "endereco": cli.endereco,
-                    "numero": cli.numero,
-                    "complemento": cli.complemento,
-                    "bairro": cli.bairro,
-                    "cidade": cli.cidade,
-                    "uf": cli.uf,
-                    "cep": cli.cep,
-                }
-                try:
-                    result = inter.emitir_boleto(cli_dict, data_venc)
-                    boleto.nosso_numero = result.get("nossoNumero","")
-                    boleto.linha_digitavel = result.get("linhaDigitavel","")
-                    boleto.codigo_barras = result.get("codigoBarras","")
-                    boleto.tx_id = result.get("txId","")
-                    boleto.codigo_solicitacao = result.get("codigoSolicitacao","")
-                    boleto.status = "emitido"
-                    boleto.save()
-
-                    # tenta baixar PDF logo apÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â³s emitir
-                    identificadores = [
-                        (boleto.nosso_numero, "nosso_numero"),
-                        (boleto.codigo_solicitacao, "codigo_solicitacao"),
-                    ]
-                    pdf_bytes = None
-                    for ident, campo in identificadores:
-                        if not ident:
-                            continue
-                        pdf_bytes = inter.baixar_pdf(ident, campo=campo)
-                        if pdf_bytes:
-                            break
-                    if pdf_bytes:
-                        if isinstance(pdf_bytes, str):
-                            pdf_bytes = base64.b64decode(pdf_bytes)
-                        from django.core.files.base import ContentFile
-                        boleto.pdf.save(f"boleto_{boleto.id}.pdf", ContentFile(pdf_bytes))
-                        boleto.save()
-
-                except Exception as e:
-                    boleto.status = "erro"
-                    boleto.erro_msg = str(e)
-                    boleto.save()
-                    messages.error(request, f"Erro ao emitir boleto de {cli.nome}: {e}")
-
-            messages.success(request, "Processo de emissÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â£o finalizado.")
-        return redirect("boletos_list")
+        # Pré-validação do lote inteiro: o que o banco recusaria nem é enviado.
+        relatorio = validar_clientes(clientes)
+        _notificar_pendencias(request, relatorio)
+
+        cliente_ids = [
+            cliente_id
+            for cliente_id in clientes.values_list("id", flat=True).iterator(chunk_size=LOTE_EMISSAO)
+            if cliente_id not in relatorio.invalidos
+        ]
+        if not cliente_ids:
+            messages.info(request, "Nenhum cliente a emitir.")
+            return redirect("boletos_list")
+        # A emissão roda no worker de tarefas; a página da tarefa mostra o andamento.
+        tarefa = enfileirar_tarefa(
+            "emissao",
+            f"Emissão {mes:02d}/{ano}",
+            {"cliente_ids": cliente_ids, "ano": ano, "mes": mes},
+            total=len(cliente_ids),
+            criado_por=request.user.get_username(),
+        )
+        return redirect("tarefa_detalhe", tarefa_id=tarefa.pk)
+
+    termo = dados.get("q", "").strip()
+    candidatos = form.filtrar(Cliente.objects.all(), form.dados_filtro())
+    candidatos = filtrar_clientes(candidatos, termo).only(
+        "id", *CAMPOS_EMISSAO, "dataVencimento"
+    )
+    pagina = Paginator(candidatos.order_by("nome", "id"), CLIENTES_POR_PAGINA).get_page(dados.get("pagina"))
+    for cliente in pagina:
+        cliente.pendencias = problemas_emissao(cliente.__dict__)
+    selecionados = form.selecionados()
+    na_pagina = {str(cliente.id) for cliente in pagina}
+    return render(
+        request,
+        "billing/gerar_boletos.html",
+        {
+            "form": form,
+            "pagina": pagina,
+            "termo": termo,
+            # Erros de seleção só depois de pedir a emissão, não ao navegar.
+            "mostrar_erros": acao in ("gerar", "confirmar"),
+            "selecionados": set(selecionados),
+            "selecionados_fora_da_pagina": [i for i in dict.fromkeys(selecionados) if i not in na_pagina],
+        },
+    )
+
+# O PDF de um boleto pode ser trocado (reemissão, substituição pelo admin) na mesma
+# URL: o navegador guarda a cópia, mas revalida a cada uso pelo ETag/Last-Modified,
+# o que custa só um 304 quando nada mudou.
+CACHE_PDF = "private, no-cache"
+
+
+def _entregar_pdf(request, arquivo: FieldFile, nome: str, etag: Optional[str] = None) -> HttpResponse:
+    """Entrega um PDF do storage com ETag/Last-Modified, respondendo 304 quando possível."""
+    try:
+        ultima_modificacao = int(arquivo.storage.get_modified_time(arquivo.name).timestamp())
+    except (NotImplementedError, OSError):
+        ultima_modificacao = None
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+    if response is None:
+        modo = settings.PDF_SENDFILE
+        if modo == "x-accel-redirect":
+            # O nginx entrega o arquivo a partir do location interno PDF_ACCEL_PREFIX.
+            response = HttpResponse(content_type="application/pdf")
+            response["X-Accel-Redirect"] = settings.PDF_ACCEL_PREFIX + arquivo.name
+        elif modo == "x-sendfile":
+            response = HttpResponse(content_type="application/pdf")
+            response["X-Sendfile"] = arquivo.path
+        else:
+            response = FileResponse(arquivo.open("rb"), content_type="application/pdf")
+        response["Content-Disposition"] = content_disposition_header(True, nome)
+    if etag:
+        response["ETag"] = etag
+    if ultima_modificacao is not None:
+        response["Last-Modified"] = http_date(ultima_modificacao)
+    response["Cache-Control"] = CACHE_PDF
+    return response
+
+
+def _resposta_pdf(request, boleto: Boleto) -> HttpResponse:
+    etag = quote_etag(boleto.pdf_hash or boleto.calcular_pdf_hash())
+    return _entregar_pdf(request, boleto.pdf, Path(boleto.pdf.name).name, etag)
 
-    return render(request, "billing/gerar_boletos.html", {"form": form})
 
 @login_required
 def baixar_pdf_view(request, boleto_id: int):
-    boleto = get_object_or_404(Boleto, id=boleto_id)
-    inter = InterService()
-    pdf_bytes = _buscar_pdf_bytes(inter, boleto)
-    if not pdf_bytes:
-        return HttpResponseNotFound("PDF nao disponivel.")
-
+    boleto = get_object_or_404(Boleto.objects.select_related("cliente", "conta"), id=boleto_id)
     if not boleto.pdf:
-        filename = _arquivo_pdf_nome(boleto)
-        boleto.pdf.save(filename, ContentFile(pdf_bytes))
-        boleto.save(update_fields=["pdf"])
-
-    stored_name = Path(boleto.pdf.name).name if boleto.pdf else _arquivo_pdf_nome(boleto)
-    return FileResponse(
-        boleto.pdf.open("rb"),
-        as_attachment=True,
-        filename=stored_name,
-    )
+        pdf_bytes = _buscar_pdf_bytes(ServicosInter(), boleto)
+        if not pdf_bytes:
+            return HttpResponseNotFound("PDF nao disponivel.")
+        boleto.guardar_pdf(_arquivo_pdf_nome(boleto), pdf_bytes)
+    return _resposta_pdf(request, boleto)
 
 
 @login_required
@@ -243,29 +376,35 @@ def baixar_pdf_lote(request):
         messages.info(request, "Selecione ao menos um boleto para baixar.")
         return redirect("boletos_list")
 
-    boletos = list(Boleto.objects.filter(id__in=ids).select_related("cliente"))
+    boletos = list(
+        Boleto.objects.filter(id__in=ids)
+        .select_related("cliente", "conta")
+        .order_by("cliente__nome", "competencia_ano", "competencia_mes", "id")
+    )
     if not boletos:
         messages.error(request, "Nenhum boleto encontrado para os identificadores informados.")
         return redirect("boletos_list")
+    if request.POST.get("formato") == "pdf":
+        return _pdf_unico(request, boletos)
 
-    inter = InterService()
+    servicos = ServicosInter()
     buffer = io.BytesIO()
     erros: List[str] = []
     nomes_utilizados: Set[str] = set()
+    baixados: List[Boleto] = []
     sucesso = 0
 
     with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_stream:
         for boleto in boletos:
-            pdf_bytes = _buscar_pdf_bytes(inter, boleto)
+            pdf_bytes = _buscar_pdf_bytes(servicos, boleto)
             if not pdf_bytes:
                 erros.append(f"Boleto {boleto.id} - {boleto.cliente.nome}")
                 continue
 
             sucesso += 1
             if not boleto.pdf:
-                filename = _arquivo_pdf_nome(boleto)
-                boleto.pdf.save(filename, ContentFile(pdf_bytes))
-                boleto.save(update_fields=["pdf"])
+                boleto.guardar_pdf(_arquivo_pdf_nome(boleto), pdf_bytes, gravar=False)
+                baixados.append(boleto)
 
             stored_name = Path(boleto.pdf.name).name if boleto.pdf else _arquivo_pdf_nome(boleto)
             nome_zip = stored_name
@@ -282,6 +421,9 @@ def baixar_pdf_lote(request):
             conteudo_erros = "Nao foi possivel obter o PDF dos seguintes boletos:\n" + "\n".join(erros)
             zip_stream.writestr("boletos_com_erro.txt", conteudo_erros)
 
+    if baixados:
+        Boleto.objects.bulk_update(baixados, ["pdf", "pdf_hash"])
+
     if sucesso == 0:
         messages.error(request, "Nao foi possivel baixar o PDF de nenhum boleto selecionado.")
         return redirect("boletos_list")
@@ -291,9 +433,70 @@ def baixar_pdf_lote(request):
     response["Content-Disposition"] = "attachment; filename=boletos_selecionados.zip"
     return response
 
+
+def _pdf_unico(request, boletos: List[Boleto]) -> HttpResponse:
+    """Enfileira a montagem do PDF único; o download fica na página da tarefa."""
+    try:
+        por_folha = int(request.POST.get("por_folha") or 1)
+    except ValueError:
+        por_folha = 0
+    if por_folha not in POR_FOLHA:
+        messages.error(request, "Escolha 1, 2 ou 4 boletos por folha.")
+        return redirect("boletos_list")
+    tarefa = enfileirar_tarefa(
+        "pdf_unico",
+        f"PDF único de {len(boletos)} boleto(s)",
+        {"boleto_ids": [boleto.pk for boleto in boletos], "por_folha": por_folha},
+        total=len(boletos),
+        criado_por=request.user.get_username(),
+    )
+    return redirect("tarefa_detalhe", tarefa_id=tarefa.pk)
+
+
+@login_required
+def retentar_boletos(request):
+    if request.method != "POST":
+        return redirect("boletos_list")
+    queryset = Boleto.objects.all()
+    ids = request.POST.getlist("boletos")
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    total = boletos_retentaveis(queryset).count()
+    if not total:
+        messages.info(request, "Nenhum boleto com erro retentável (cobrança não enviada ou autenticação).")
+        return redirect("boletos_list")
+
+    tarefa = enfileirar_tarefa(
+        "retentativa",
+        "Retentativa de boletos com erro",
+        {"boleto_ids": [int(boleto_id) for boleto_id in ids]},
+        total=total,
+        criado_por=request.user.get_username(),
+    )
+    return redirect("tarefa_detalhe", tarefa_id=tarefa.pk)
+
+
+@login_required
+def enviar_emails(request):
+    if request.method != "POST":
+        return redirect("boletos_list")
+    ids = request.POST.getlist("boletos")
+    if not ids:
+        messages.info(request, "Selecione os boletos a enviar por e-mail.")
+        return redirect("boletos_list")
+    total = enfileirar_envios(Boleto.objects.filter(id__in=ids))
+    if total:
+        messages.success(
+            request, f"{total} e-mail(s) na fila; são enviados pelo manage.py enviar_boletos."
+        )
+    else:
+        messages.info(request, "Nenhum boleto emitido, com e-mail do cliente, que ainda não tenha sido enfileirado.")
+    return redirect("boletos_list")
+
+
 @login_required
 def marcar_pago(request, boleto_id: int):
-    boleto = get_object_or_404(Boleto, id=boleto_id)
+    boleto = get_object_or_404(Boleto.objects.select_related("cliente"), id=boleto_id)
     boleto.status = "pago"
     boleto.data_pagamento = dt.date.today()
     boleto.save()
@@ -301,15 +504,37 @@ def marcar_pago(request, boleto_id: int):
     return redirect("boletos_list")
 
 
+@login_required
+def boletos_retorno(request):
+    form = ProcessarRetornoForm(request.POST or None, request.FILES or None)
+    relatorio = None
+    if form.is_valid():
+        try:
+            relatorio = processar_retorno(form.cleaned_data["arquivo"].file, simular=form.cleaned_data["simular"])
+        except ValueError as exc:
+            messages.error(request, str(exc))
+        else:
+            acao = "a liquidar" if form.cleaned_data["simular"] else "liquidado(s)"
+            messages.success(
+                request,
+                f"{relatorio.liquidados} boleto(s) {acao}, {relatorio.ja_pagos} já pago(s), "
+                f"{relatorio.divergentes} com valor divergente (conferir manualmente), "
+                f"{relatorio.nao_encontrados} pagamento(s) sem correspondência.",
+            )
+    return render(request, "billing/boletos_retorno.html", {"form": form, "relatorio": relatorio})
+
+
 @login_required
 def cancelar_boleto(request, boleto_id: int):
-    boleto = get_object_or_404(Boleto, id=boleto_id)
-    inter = InterService()
+    boleto = get_object_or_404(Boleto.objects.select_related("cliente", "conta"), id=boleto_id)
     try:
-        resultado = inter.cancelar_boleto(
-            codigo_solicitacao=boleto.codigo_solicitacao or "",
-            nosso_numero=boleto.nosso_numero or "",
-        )
+        # Cancela na conta que emitiu, mesmo que o cliente já esteja em outra.
+        inter = InterService(boleto.conta)
+        with referente_a(boleto.pk):
+            resultado = inter.cancelar_boleto(
+                codigo_solicitacao=boleto.codigo_solicitacao or "",
+                nosso_numero=boleto.nosso_numero or "",
+            )
     except Exception as exc:  # noqa: BLE001 - queremos exibir o motivo ao usuÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â¡rio
         boleto.erro_msg = str(exc)
         boleto.save(update_fields=["erro_msg"])
@@ -327,3 +552,38 @@ def cancelar_boleto(request, boleto_id: int):
         else:
             messages.success(request, "CobranÃƒÆ’Ã†â€™Ãƒâ€šÃ‚Â§a cancelada com sucesso no Inter.")
     return redirect("boletos_list")
+
+
+# Cada conexão SSE entrega o estado atual e termina; o EventSource reconecta após
+# esse intervalo (ms). Assim nenhuma thread do gunicorn fica presa num stream aberto.
+RECONEXAO_EVENTOS = 2000
+
+
+@login_required
+def tarefa_detalhe(request, tarefa_id: int):
+    tarefa = get_object_or_404(Tarefa, id=tarefa_id)
+    return render(request, "billing/tarefa.html", {"tarefa": tarefa, "estado": estado_tarefa(tarefa)})
+
+
+@login_required
+def tarefa_progresso(request, tarefa_id: int):
+    tarefa = get_object_or_404(Tarefa, id=tarefa_id)
+    return JsonResponse(estado_tarefa(tarefa))
+
+
+@login_required
+def tarefa_eventos(request, tarefa_id: int):
+    tarefa = get_object_or_404(Tarefa, id=tarefa_id)
+    dados = json.dumps(estado_tarefa(tarefa), ensure_ascii=False)
+    response = HttpResponse(f"retry: {RECONEXAO_EVENTOS}\ndata: {dados}\n\n", content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@login_required
+def tarefa_arquivo(request, tarefa_id: int):
+    tarefa = get_object_or_404(Tarefa, id=tarefa_id)
+    if not tarefa.arquivo:
+        return HttpResponseNotFound("Arquivo nao disponivel.")
+    # O arquivo de uma tarefa nunca muda: o Last-Modified basta para o 304.
+    return _entregar_pdf(request, tarefa.arquivo, "boletos_selecionados.pdf")
@@ -0,0 +1,38 @@
+import multiprocessing
+import os
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    try:
+        return int(os.getenv(nome, ""))
+    except ValueError:
+        return padrao
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# (2 x CPUs) + 1 workers síncronos com threads: as views passam a maior parte
+# do tempo esperando a API do Inter, então threads ajudam sem custo de memória.
+workers = _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+threads = _env_int("GUNICORN_THREADS", 4)
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Carrega o Django uma única vez no master e compartilha via fork.
+preload_app = True
+
+# Recicla workers periodicamente para conter vazamentos de memória;
+# o jitter evita que todos reiniciem ao mesmo tempo.
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+# Emissões em lote podem demorar; o timeout precisa cobrir a chamada ao banco.
+timeout = _env_int("GUNICORN_TIMEOUT", 120)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Evita fsync em disco do heartbeat dos workers dentro do container.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -56,6 +57,17 @@ DATABASES = {
         "NAME": BASE_DIR / "data" / "db.sqlite3",
     }
 }
+if os.getenv("POSTGRES_DB"):
+    # Vários containers/workers no mesmo banco (psycopg, em requirements.txt).
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": 60,
+    }
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -68,10 +80,63 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# WhiteNoise serve os estáticos direto do gunicorn, com arquivos pré-comprimidos
+# (gzip) e nomes com hash, que recebem Cache-Control de um ano (immutable).
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Entrega dos PDFs pelo servidor web: "" (Django), "x-sendfile" (Apache/lighttpd)
+# ou "x-accel-redirect" (nginx, com location interno em PDF_ACCEL_PREFIX -> MEDIA_ROOT).
+PDF_SENDFILE = os.getenv("PDF_SENDFILE", "").lower()
+PDF_ACCEL_PREFIX = os.getenv("PDF_ACCEL_PREFIX", "/media-protegida/")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Emissões simultâneas contra a API do Inter (gerar_boletos, retentativas, agendador).
+INTER_EMISSAO_WORKERS = int(os.getenv("INTER_EMISSAO_WORKERS", "4"))
+# Limite de chamadas por minuto para as credenciais do .env (0 = sem limite).
+INTER_LIMITE_POR_MINUTO = int(os.getenv("INTER_LIMITE_POR_MINUTO", "0"))
+# Tempo máximo (s) para abrir a conexão e para uma operação inteira (token, fila e chamada).
+INTER_TIMEOUT_CONEXAO = float(os.getenv("INTER_TIMEOUT_CONEXAO", "5"))
+INTER_PRAZO_OPERACAO = float(os.getenv("INTER_PRAZO_OPERACAO", "30"))
+# Circuit breaker por conta e família de endpoints: abre com essa taxa de falhas nas
+# últimas chamadas e suspende a família por INTER_DISJUNTOR_ESPERA segundos.
+INTER_DISJUNTOR_TAXA_FALHAS = float(os.getenv("INTER_DISJUNTOR_TAXA_FALHAS", "0.5"))
+INTER_DISJUNTOR_ESPERA = float(os.getenv("INTER_DISJUNTOR_ESPERA", "30"))
+# Workers de fila (manage.py processar_fila): boletos reservados por vez e duração da
+# reserva em segundos, renovada enquanto o worker estiver vivo.
+FILA_LOTE = int(os.getenv("FILA_LOTE", "50"))
+FILA_DURACAO_RESERVA = int(os.getenv("FILA_DURACAO_RESERVA", "120"))
+# Arquivo das chamadas ao Inter (requisição e resposta, sem segredos e com os dados do
+# pagador pseudonimizados), um .jsonl.gz por dia. Desligado por padrão; os dias mais
+# antigos que INTER_ARQUIVO_DIAS são apagados (0 guarda tudo).
+INTER_ARQUIVO = os.getenv("INTER_ARQUIVO", "0") == "1"
+INTER_ARQUIVO_DIR = Path(os.getenv("INTER_ARQUIVO_DIR", str(BASE_DIR / "data" / "arquivo_inter")))
+INTER_ARQUIVO_DIAS = int(os.getenv("INTER_ARQUIVO_DIAS", "30"))
+# Antecedência (em dias) com que emitir_agendados emite os boletos.
+INTER_DIAS_ANTECEDENCIA = int(os.getenv("INTER_DIAS_ANTECEDENCIA", "10"))
+
+# Envio dos boletos por e-mail (manage.py enviar_boletos). Para testar sem servidor real:
+# EMAIL_HOST=localhost EMAIL_PORT=1025 com `python -m aiosmtpd -n -l localhost:1025`.
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "0") == "1"
+EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", "0") == "1"
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "30"))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "cobranca@localhost")
+# Conexões SMTP simultâneas, cada uma reutilizada para muitas mensagens.
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+# Mensagens por minuto para cada domínio de destino (0 = sem limite).
+EMAIL_LIMITE_POR_DOMINIO = int(os.getenv("EMAIL_LIMITE_POR_DOMINIO", "300"))
+EMAIL_MAX_TENTATIVAS = int(os.getenv("EMAIL_MAX_TENTATIVAS", "5"))
+# Enfileira o e-mail de cada boleto assim que ele é emitido.
+EMAIL_BOLETOS_AUTOMATICO = os.getenv("EMAIL_BOLETOS_AUTOMATICO", "0") == "1"
+
 LOGIN_REDIRECT_URL = "/clientes/"
 LOGIN_URL = "login"
@@ -1,6 +1,22 @@
 #!/bin/sh
 set -e
-python manage.py migrate
-python manage.py collectstatic --noinput
-python manage.py createsuperuser --noinput || true
+
+# APP_MODE=dev  -> servidor de desenvolvimento do Django (padrão)
+# APP_MODE=prod -> gunicorn com workers derivados das CPUs (config/gunicorn.conf.py)
+# APP_MODE=tarefas -> worker que executa as tarefas de geração/retentativa da interface
+APP_MODE="${APP_MODE:-dev}"
+
+# O worker não prepara nada: migrações e estáticos ficam a cargo do container web.
+if [ "$APP_MODE" = "tarefas" ]; then
+    exec python manage.py processar_fila tarefas --continuo --intervalo 2
+fi
+
+# Migrações, collectstatic e superusuário num único processo Django;
+# cada etapa é pulada quando não há trabalho pendente.
+python manage.py preparar_inicio
+
+if [ "$APP_MODE" = "prod" ]; then
+    exec gunicorn config.wsgi:application --config config/gunicorn.conf.py
+fi
+
 exec python manage.py runserver 0.0.0.0:8000
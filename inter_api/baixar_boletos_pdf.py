@@ -1,34 +1,15 @@
 import base64
-import os
 import time
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import TYPE_CHECKING, Optional, Tuple
 
-import pandas as pd
-import requests
-from dotenv import load_dotenv
+try:
+    from inter_api.credenciais import obter_credenciais, requisicao
+except ImportError:  # executado como script de dentro de inter_api/
+    from credenciais import obter_credenciais, requisicao
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-CREDENTIALS_DIR = BASE_DIR / "config" / "inter"
-
-
-def _resolve_cert_path(raw_value: Optional[str], filename: str) -> str:
-    if raw_value:
-        candidate = Path(raw_value)
-        if not candidate.is_absolute():
-            candidate = CREDENTIALS_DIR / candidate
-    else:
-        candidate = CREDENTIALS_DIR / filename
-    return str(candidate)
-
-
-load_dotenv(CREDENTIALS_DIR / ".env")
-
-CLIENT_ID = os.getenv("CLIENT_ID")
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")
-CONTA_CORRENTE = os.getenv("CONTA_CORRENTE")
-CERT_PATH = _resolve_cert_path(os.getenv("CERT_PATH"), "Inter_API_Certificado.crt")
-KEY_PATH = _resolve_cert_path(os.getenv("KEY_PATH"), "Inter_API_Chave.key")
+if TYPE_CHECKING:
+    import requests
 
 AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
 PDF_URL_TEMPLATE = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas/{identificador}/pdf"
@@ -36,6 +17,22 @@ MAX_TENTATIVAS = 12
 INTERVALO_ESPERA = 5
 
 
+# Compatibilidade: CLIENT_ID, CERT_PATH etc. eram constantes lidas do .env no import.
+_ATRIBUTOS_LEGADOS = {
+    "CLIENT_ID": "client_id",
+    "CLIENT_SECRET": "client_secret",
+    "CONTA_CORRENTE": "conta_corrente",
+    "CERT_PATH": "cert_path",
+    "KEY_PATH": "key_path",
+}
+
+
+def __getattr__(nome: str):
+    if nome in _ATRIBUTOS_LEGADOS:
+        return getattr(obter_credenciais(), _ATRIBUTOS_LEGADOS[nome])
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
 def obter_token_leitura(
     *,
     client_id: Optional[str] = None,
@@ -43,24 +40,27 @@ def obter_token_leitura(
     cert_path: Optional[str] = None,
     key_path: Optional[str] = None,
 ) -> str:
+    credenciais = obter_credenciais()
     payload = {
-        "client_id": client_id or CLIENT_ID,
-        "client_secret": client_secret or CLIENT_SECRET,
+        "client_id": client_id or credenciais.client_id,
+        "client_secret": client_secret or credenciais.client_secret,
         "grant_type": "client_credentials",
         "scope": "boleto-cobranca.read",
     }
 
-    response = requests.post(
+    response = requisicao(
+        "POST",
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=payload,
-        cert=(cert_path or CERT_PATH, key_path or KEY_PATH),
+        cert_path=cert_path,
+        key_path=key_path,
     )
     response.raise_for_status()
     return response.json().get("access_token", "")
 
 
-def _extrair_bytes_pdf(response: requests.Response) -> Optional[bytes]:
+def _extrair_bytes_pdf(response: "requests.Response") -> Optional[bytes]:
     try:
         data = response.json()
     except ValueError:
@@ -84,7 +84,7 @@ def baixar_pdf_api(
 ) -> Optional[bytes]:
     headers = {
         "Authorization": f"Bearer {token}",
-        "x-conta-corrente": conta_corrente or CONTA_CORRENTE,
+        "x-conta-corrente": conta_corrente or obter_credenciais().conta_corrente,
     }
 
     url = PDF_URL_TEMPLATE.format(identificador=identificador)
@@ -93,10 +93,12 @@ def baixar_pdf_api(
 
     for tentativa in range(1, tentativas + 1):
         print(f"📥 Tentativa {tentativa} - baixando {identificador}")
-        response = requests.get(
+        response = requisicao(
+            "GET",
             url,
             headers=headers,
-            cert=(cert_path or CERT_PATH, key_path or KEY_PATH),
+            cert_path=cert_path,
+            key_path=key_path,
         )
 
         if response.status_code == 200:
@@ -157,11 +159,31 @@ def salvar_pdf_em_disco(nome_arquivo: str, conteudo: bytes) -> None:
     print(f"✅ Salvo como {nome_arquivo}")
 
 
+def baixar_identificadores(identificadores: Tuple[str, ...], destino: str = ".") -> int:
+    """Baixa os PDFs dos códigos informados (sem planilha). Retorna quantos foram salvos."""
+    token = obter_token_leitura()
+    conta_corrente = obter_credenciais().conta_corrente
+    salvos = 0
+    for identificador in identificadores:
+        pdf_bytes = baixar_pdf_api(token, identificador, conta_corrente=conta_corrente)
+        if pdf_bytes:
+            salvar_pdf_em_disco(str(Path(destino) / f"{identificador}.pdf"), pdf_bytes)
+            salvos += 1
+    return salvos
+
+
 def baixar_todos_pdfs(
     planilha: str = "codigos_emitidos.xlsx",
     coluna_identificador: str = "codigoSolicitacao",
     coluna_nome: str = "nome",
+    destino: str = ".",
 ) -> None:
+    try:
+        # Só a leitura da planilha precisa do pandas.
+        import pandas as pd
+    except ImportError:  # noqa: BLE001 - manter mensagem direta no CLI
+        print("❌ pandas não está instalado; informe os códigos diretamente para baixar sem planilha.")
+        return
     try:
         df = pd.read_excel(planilha)
     except Exception as exc:  # noqa: BLE001 - manter mensagem direta no CLI
@@ -169,6 +191,7 @@ def baixar_todos_pdfs(
         return
 
     token = obter_token_leitura()
+    conta_corrente = obter_credenciais().conta_corrente
 
     for _, row in df.iterrows():
         identificador = str(row.get(coluna_identificador, "")).strip()
@@ -176,9 +199,9 @@ def baixar_todos_pdfs(
         if not identificador:
             continue
         try:
-            pdf_bytes = baixar_pdf_api(token, identificador, conta_corrente=CONTA_CORRENTE)
+            pdf_bytes = baixar_pdf_api(token, identificador, conta_corrente=conta_corrente)
             if pdf_bytes:
-                salvar_pdf_em_disco(nome.replace(" ", "_") + ".pdf", pdf_bytes)
+                salvar_pdf_em_disco(str(Path(destino) / (nome.replace(" ", "_") + ".pdf")), pdf_bytes)
         except Exception as exc:  # noqa: BLE001 - manter fluxo
             print(f"❌ Erro ao baixar boleto de {nome}: {exc}")
 
@@ -0,0 +1,73 @@
+# Linha de comando dos scripts do Inter: python -m inter_api {emitir,baixar,cancelar}.
+# Os módulos de cada subcomando (e o pandas, só quando há planilha) são importados
+# depois de interpretar os argumentos, então --help e comandos curtos partem rápido.
+import argparse
+import importlib
+import sys
+from typing import List, Optional
+
+
+def _modulo(nome: str):
+    try:
+        return importlib.import_module(f"inter_api.{nome}")
+    except ImportError:  # executado como script de dentro de inter_api/
+        return importlib.import_module(nome)
+
+
+def _emitir(args: argparse.Namespace) -> int:
+    emitidos, erros = _modulo("emitir_boletos").emitir_planilha(args.planilha, args.aba, args.saida)
+    print(f"{emitidos} boleto(s) emitido(s), {erros} com erro.")
+    return 1 if erros and not emitidos else 0
+
+
+def _baixar(args: argparse.Namespace) -> int:
+    modulo = _modulo("baixar_boletos_pdf")
+    if args.identificadores:
+        salvos = modulo.baixar_identificadores(tuple(args.identificadores), args.destino)
+        return 0 if salvos == len(args.identificadores) else 1
+    modulo.baixar_todos_pdfs(args.planilha, args.coluna, args.coluna_nome, args.destino)
+    return 0
+
+
+def _cancelar(args: argparse.Namespace) -> int:
+    _modulo("emitir_boletos").cancelar_boleto(args.codigo_solicitacao, args.motivo)
+    print(f"✅ Boleto {args.codigo_solicitacao} cancelado.")
+    return 0
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m inter_api", description="Boletos do Banco Inter pela linha de comando.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    emitir = subparsers.add_parser("emitir", help="Emite os boletos de uma planilha (requer pandas).")
+    emitir.add_argument("--planilha", default="clientes_boletos_092025_teste.xlsx")
+    emitir.add_argument("--aba", default="BOLETOS")
+    emitir.add_argument("--saida", default="codigos_emitidos.xlsx", help="Planilha com os códigos emitidos.")
+    emitir.set_defaults(executar=_emitir)
+
+    baixar = subparsers.add_parser("baixar", help="Baixa PDFs pelos códigos informados ou pelos de uma planilha.")
+    baixar.add_argument("identificadores", nargs="*", help="codigoSolicitacao ou nossoNumero; sem eles, lê --planilha.")
+    baixar.add_argument("--planilha", default="codigos_emitidos.xlsx")
+    baixar.add_argument("--coluna", default="codigoSolicitacao", help="Coluna da planilha com o identificador.")
+    baixar.add_argument("--coluna-nome", default="nome", help="Coluna usada no nome do arquivo.")
+    baixar.add_argument("--destino", default=".", help="Pasta onde salvar os PDFs.")
+    baixar.set_defaults(executar=_baixar)
+
+    cancelar = subparsers.add_parser("cancelar", help="Cancela um boleto pelo codigoSolicitacao.")
+    cancelar.add_argument("codigo_solicitacao")
+    cancelar.add_argument("--motivo", default="Solicitação do cliente")
+    cancelar.set_defaults(executar=_cancelar)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    try:
+        return args.executar(args)
+    except Exception as exc:  # noqa: BLE001 - execução CLI precisa do erro
+        print("❌ Erro geral:", str(exc))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+# Credenciais do Banco Inter carregadas uma vez por processo: o .env é lido na
+# primeira utilização, o certificado vira um único SSLContext reaproveitado por uma
+# Session com pool, e mudanças nos arquivos são detectadas e trocadas atomicamente:
+# o conjunto novo só substitui o atual depois de carregar o TLS e obter um token.
+# ``requests`` (e ``ssl``) só são importados na primeira requisição: importar este
+# módulo, o Django ou o ``--help`` da linha de comando não paga esse custo.
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CREDENTIALS_DIR = BASE_DIR / "config" / "inter"
+ENV_PATH = CREDENTIALS_DIR / ".env"
+
+INTERVALO_VERIFICACAO = 30.0
+TAMANHO_POOL = 16
+# (conexão, leitura) em segundos quando o chamador não informa ``timeout``.
+TIMEOUT_PADRAO = (5.0, 30.0)
+# Token pedido para conferir um conjunto rotacionado antes de colocá-lo em uso.
+URL_TOKEN = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
+ESCOPO_VERIFICACAO = "boleto-cobranca.read"
+
+
+def resolver_caminho_cert(raw_value: Optional[str], filename: str) -> str:
+    if raw_value:
+        candidate = Path(raw_value)
+        if not candidate.is_absolute():
+            candidate = CREDENTIALS_DIR / candidate
+    else:
+        candidate = CREDENTIALS_DIR / filename
+    return str(candidate)
+
+
+def _assinatura(*caminhos: str) -> Tuple[Any, ...]:
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            stat = os.stat(caminho)
+        except OSError:
+            assinatura.append(None)
+        else:
+            assinatura.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(assinatura)
+
+
+@lru_cache(maxsize=None)
+def _classe_adaptador_ssl() -> type:
+    from requests.adapters import HTTPAdapter
+
+    class _AdaptadorSSL(HTTPAdapter):
+        """HTTPAdapter que usa um SSLContext já carregado em vez de reler o PEM a cada conexão."""
+
+        def __init__(self, contexto, **kwargs) -> None:
+            self._contexto = contexto
+            super().__init__(**kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["ssl_context"] = self._contexto
+            return super().init_poolmanager(*args, **kwargs)
+
+        def proxy_manager_for(self, *args, **kwargs):
+            kwargs["ssl_context"] = self._contexto
+            return super().proxy_manager_for(*args, **kwargs)
+
+    return _AdaptadorSSL
+
+
+class CredenciaisInter:
+    def __init__(
+        self,
+        client_id: Optional[str],
+        client_secret: Optional[str],
+        conta_corrente: Optional[str],
+        cert_path: str,
+        key_path: str,
+        *,
+        arquivos_extras: Tuple[str, ...] = (),
+    ) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.conta_corrente = conta_corrente
+        self.cert_path = cert_path
+        self.key_path = key_path
+        self.arquivos_monitorados = arquivos_extras + (cert_path, key_path)
+        self.assinatura = _assinatura(*self.arquivos_monitorados)
+        self._sessao: Optional["requests.Session"] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def do_ambiente(cls, env_path: Path = ENV_PATH) -> "CredenciaisInter":
+        return cls(
+            os.getenv("CLIENT_ID"),
+            os.getenv("CLIENT_SECRET"),
+            os.getenv("CONTA_CORRENTE"),
+            resolver_caminho_cert(os.getenv("CERT_PATH"), "Inter_API_Certificado.crt"),
+            resolver_caminho_cert(os.getenv("KEY_PATH"), "Inter_API_Chave.key"),
+            arquivos_extras=(str(env_path),),
+        )
+
+    def alterada(self) -> bool:
+        return _assinatura(*self.arquivos_monitorados) != self.assinatura
+
+    def validar(self) -> None:
+        if not all([self.client_id, self.client_secret, self.conta_corrente]):
+            raise RuntimeError("CLIENT_ID, CLIENT_SECRET e CONTA_CORRENTE precisam estar definidos no .env.")
+
+    def preparar(self, *, verificar_token: bool = True) -> None:
+        """Carrega o SSLContext agora e, com ``verificar_token``, obtém um token com ele.
+
+        Levanta se certificado e chave não formam um par, se os arquivos estão
+        incompletos ou se o Inter recusa as credenciais.
+        """
+        self.validar()
+        sessao = self.sessao
+        if not verificar_token:
+            return
+        response = sessao.post(
+            URL_TOKEN,
+            data={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "client_credentials",
+                "scope": ESCOPO_VERIFICACAO,
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=TIMEOUT_PADRAO,
+        )
+        if not response.ok or not response.json().get("access_token"):
+            raise RuntimeError(f"Token recusado com as credenciais novas ({response.status_code}).")
+
+    @property
+    def sessao(self) -> "requests.Session":
+        """Sessão HTTP com o certificado do cliente; o PEM é lido só na primeira chamada."""
+        if self._sessao is None:
+            with self._lock:
+                if self._sessao is None:
+                    import ssl
+
+                    import requests
+
+                    contexto = ssl.create_default_context()
+                    contexto.load_cert_chain(self.cert_path, self.key_path)
+                    sessao = requests.Session()
+                    sessao.mount(
+                        "https://",
+                        _classe_adaptador_ssl()(contexto, pool_connections=TAMANHO_POOL, pool_maxsize=TAMANHO_POOL),
+                    )
+                    self._sessao = sessao
+        return self._sessao
+
+
+def _rotacionar(atual: CredenciaisInter, candidata: CredenciaisInter, verificar_token: bool) -> CredenciaisInter:
+    """Devolve ``candidata`` já preparada ou, se ela falhar, continua com ``atual``.
+
+    Certificado e chave raramente são gravados juntos: um par incompleto é
+    ignorado e tentado de novo na próxima verificação.
+    """
+    try:
+        candidata.preparar(verificar_token=verificar_token)
+    except Exception as exc:  # noqa: BLE001 - qualquer falha mantém o conjunto em uso
+        logger.warning("Credenciais novas do Inter rejeitadas; mantendo as atuais: %s", exc)
+        return atual
+    return candidata
+
+
+class ProvedorCredenciais:
+    def __init__(self, env_path: Path = ENV_PATH, *, verificar_token: bool = True) -> None:
+        self.env_path = env_path
+        self.verificar_token = verificar_token
+        self._atual: Optional[CredenciaisInter] = None
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self) -> CredenciaisInter:
+        atual = self._atual
+        if atual is not None and time.monotonic() - self._verificado_em < INTERVALO_VERIFICACAO:
+            return atual
+        # Com um conjunto em uso, quem chega durante a verificação (que pode pedir um
+        # token) segue com ele em vez de esperar.
+        if not self._lock.acquire(blocking=atual is None):
+            return atual
+        try:
+            atual = self._atual
+            if atual is None:
+                self._carregar_env(override=False)
+                atual = CredenciaisInter.do_ambiente(self.env_path)
+            elif atual.alterada():
+                # Rotação: o conjunto novo só entra em uso depois de validado.
+                self._carregar_env(override=True)
+                atual = _rotacionar(atual, CredenciaisInter.do_ambiente(self.env_path), self.verificar_token)
+            self._atual = atual
+            self._verificado_em = time.monotonic()
+        finally:
+            self._lock.release()
+        return atual
+
+    def _carregar_env(self, *, override: bool) -> None:
+        from dotenv import load_dotenv
+
+        load_dotenv(self.env_path, override=override)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._atual = None
+
+
+_provedor = ProvedorCredenciais()
+_explicitas: Dict[str, Tuple[float, CredenciaisInter]] = {}
+_explicitas_lock = threading.Lock()
+
+
+def obter_credenciais() -> CredenciaisInter:
+    return _provedor.obter()
+
+
+def credenciais_da_conta(
+    chave: str,
+    *,
+    client_id: str,
+    client_secret: str,
+    conta_corrente: str,
+    cert_path: str,
+    key_path: str,
+) -> CredenciaisInter:
+    """Credenciais de uma conta cadastrada (ex.: ``ContaInter``), cacheadas por ``chave``.
+
+    Reaproveita SSLContext e sessão enquanto os valores e os arquivos não mudarem.
+    Arquivos trocados no disco passam pela mesma validação da rotação do ``.env``;
+    valores novos (conta editada) entram direto.
+    """
+    cert_path = resolver_caminho_cert(cert_path, "Inter_API_Certificado.crt")
+    key_path = resolver_caminho_cert(key_path, "Inter_API_Chave.key")
+    valores = (client_id, client_secret, conta_corrente, cert_path, key_path)
+    agora = time.monotonic()
+    registro = _explicitas.get(chave)
+    if registro is not None:
+        verificado_em, atual = registro
+        mesmos_valores = (
+            atual.client_id, atual.client_secret, atual.conta_corrente, atual.cert_path, atual.key_path
+        ) == valores
+        if mesmos_valores and (agora - verificado_em < INTERVALO_VERIFICACAO or not atual.alterada()):
+            if agora - verificado_em >= INTERVALO_VERIFICACAO:
+                _explicitas[chave] = (agora, atual)
+            return atual
+        if mesmos_valores:
+            nova = _rotacionar(atual, CredenciaisInter(*valores), _provedor.verificar_token)
+            with _explicitas_lock:
+                _explicitas[chave] = (agora, nova)
+            return nova
+    nova = CredenciaisInter(*valores)
+    with _explicitas_lock:
+        _explicitas[chave] = (agora, nova)
+    return nova
+
+
+def requisicao(
+    metodo: str,
+    url: str,
+    *,
+    cert_path: Optional[str] = None,
+    key_path: Optional[str] = None,
+    **kwargs,
+) -> "requests.Response":
+    """Faz a chamada pela sessão compartilhada; caminhos explícitos usam o ``cert=`` do requests."""
+    kwargs.setdefault("timeout", TIMEOUT_PADRAO)
+    if cert_path or key_path:
+        import requests
+
+        credenciais = obter_credenciais()
+        cert = (cert_path or credenciais.cert_path, key_path or credenciais.key_path)
+        return requests.request(metodo, url, cert=cert, **kwargs)
+    return obter_credenciais().sessao.request(metodo, url, **kwargs)
@@ -1,41 +1,35 @@
-import os
-from datetime import date, datetime
-from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
-
-import requests
-from dotenv import load_dotenv
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 try:
-    import pandas as pd
-except Exception:  # noqa: BLE001 - pandas é opcional para rodar via Django
-    pd = None  # type: ignore[assignment]
-
-BASE_DIR = Path(__file__).resolve().parents[1]
-CREDENTIALS_DIR = BASE_DIR / "config" / "inter"
+    from inter_api.credenciais import obter_credenciais, requisicao
+    from inter_api.payload import montar_corpo, montar_corpos
+except ImportError:  # executado como script de dentro de inter_api/
+    from credenciais import obter_credenciais, requisicao
+    from payload import montar_corpo, montar_corpos
 
-
-def _resolve_cert_path(raw_value: Optional[str], filename: str) -> str:
-    if raw_value:
-        candidate = Path(raw_value)
-        if not candidate.is_absolute():
-            candidate = CREDENTIALS_DIR / candidate
-    else:
-        candidate = CREDENTIALS_DIR / filename
-    return str(candidate)
+AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
+COBRANCA_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas"
+COBRANCA_CANCELAR_URL = COBRANCA_URL + "/{codigo_solicitacao}/cancelar"
+PLANILHA_PADRAO = "clientes_boletos_092025_teste.xlsx"
+ABA_PADRAO = "BOLETOS"
+SAIDA_PADRAO = "codigos_emitidos.xlsx"
 
 
-# Carregar variáveis de ambiente para uso CLI
-load_dotenv(CREDENTIALS_DIR / ".env")
+# Compatibilidade: CLIENT_ID, CERT_PATH etc. eram constantes lidas do .env no import.
+_ATRIBUTOS_LEGADOS = {
+    "CLIENT_ID": "client_id",
+    "CLIENT_SECRET": "client_secret",
+    "CONTA_CORRENTE": "conta_corrente",
+    "CERT_PATH": "cert_path",
+    "KEY_PATH": "key_path",
+}
 
-CLIENT_ID = os.getenv("CLIENT_ID")
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")
-CONTA_CORRENTE = os.getenv("CONTA_CORRENTE")
-CERT_PATH = _resolve_cert_path(os.getenv("CERT_PATH"), "Inter_API_Certificado.crt")
-KEY_PATH = _resolve_cert_path(os.getenv("KEY_PATH"), "Inter_API_Chave.key")
 
-AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
-COBRANCA_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas"
+def __getattr__(nome: str):
+    if nome in _ATRIBUTOS_LEGADOS:
+        return getattr(obter_credenciais(), _ATRIBUTOS_LEGADOS[nome])
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 
 def obter_token(
@@ -46,65 +40,26 @@ def obter_token(
     cert_path: Optional[str] = None,
     key_path: Optional[str] = None,
 ) -> str:
+    credenciais = obter_credenciais()
     payload = {
-        "client_id": client_id or CLIENT_ID,
-        "client_secret": client_secret or CLIENT_SECRET,
+        "client_id": client_id or credenciais.client_id,
+        "client_secret": client_secret or credenciais.client_secret,
         "grant_type": "client_credentials",
         "scope": scope,
     }
 
-    response = requests.post(
+    response = requisicao(
+        "POST",
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=payload,
-        cert=(cert_path or CERT_PATH, key_path or KEY_PATH),
+        cert_path=cert_path,
+        key_path=key_path,
     )
     response.raise_for_status()
     return response.json().get("access_token", "")
 
 
-def _tipo_pessoa(cpf_cnpj: str) -> str:
-    digits = "".join(ch for ch in cpf_cnpj or "" if ch.isdigit())
-    return "JURIDICA" if len(digits) > 11 else "FISICA"
-
-
-def _montar_seu_numero(cliente: Dict[str, Any], data_venc: date) -> str:
-    fornecido = str(cliente.get("seuNumero", "")).strip()
-    if fornecido:
-        sanitizado = "".join(ch for ch in fornecido if ch.isalnum()) or fornecido.replace(" ", "")
-        return sanitizado[:15]
-
-    cpf_cnpj = "".join(ch for ch in str(cliente.get("cpfCnpj", "")) if ch.isalnum()) or "SN"
-    sufixo = data_venc.strftime("%y%m%d")
-    max_base = max(0, 15 - len(sufixo))
-    base = cpf_cnpj[-max_base:] if max_base else ""
-    resultado = (base + sufixo)[:15]
-    return resultado or sufixo[-15:]
-
-
-if pd is not None:
-    _pandas_timestamp = (pd.Timestamp,)
-else:
-    _pandas_timestamp = tuple()
-
-
-def _normalizar_data(valor: Any) -> datetime:
-    if isinstance(valor, datetime):
-        return valor
-    if isinstance(valor, date):
-        return datetime.combine(valor, datetime.min.time())
-    if _pandas_timestamp and isinstance(valor, _pandas_timestamp):
-        return valor.to_pydatetime()
-    if isinstance(valor, str):
-        valor = valor.strip()
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
-            try:
-                return datetime.strptime(valor, fmt)
-            except ValueError:
-                continue
-    raise ValueError(f"Data de vencimento inválida: {valor}")
-
-
 def emitir_boleto_api(
     token: str,
     dados: Dict[str, Any],
@@ -112,70 +67,36 @@ def emitir_boleto_api(
     conta_corrente: Optional[str] = None,
     cert_path: Optional[str] = None,
     key_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    return enviar_corpo(
+        token,
+        montar_corpo(dados),
+        conta_corrente=conta_corrente,
+        cert_path=cert_path,
+        key_path=key_path,
+    )
+
+
+def enviar_corpo(
+    token: str,
+    body: Dict[str, Any],
+    *,
+    conta_corrente: Optional[str] = None,
+    cert_path: Optional[str] = None,
+    key_path: Optional[str] = None,
 ) -> Dict[str, Any]:
     headers = {
         "Authorization": f"Bearer {token}",
-        "x-conta-corrente": conta_corrente or CONTA_CORRENTE,
+        "x-conta-corrente": conta_corrente or obter_credenciais().conta_corrente,
         "Content-Type": "application/json",
     }
 
-    try:
-        valor = float(dados["valorNominal"])
-    except Exception as exc:  # noqa: BLE001 - queremos retornar erro legível
-        raise ValueError(f"Valor inválido: {dados.get('valorNominal')}") from exc
-
-    data_dt = _normalizar_data(dados["dataVencimento"])
-    data_formatada = data_dt.strftime("%Y-%m-%d")
-
-    seu_numero = dados.get("seuNumero")
-    if not seu_numero:
-        numero_base = "".join(ch for ch in str(dados.get("cpfCnpj", "")) if ch.isdigit()) or "SN"
-        seu_numero = f"{numero_base}-{data_dt.strftime('%Y%m')}"
-
-    seu_numero = str(seu_numero)[:20]
-
-    body = {
-        "seuNumero": seu_numero,
-        "valorNominal": valor,
-        "dataVencimento": data_formatada,
-        "numDiasAgenda": 30,
-        "pagador": {
-            "cpfCnpj": str(dados.get("cpfCnpj")),
-            "tipoPessoa": dados.get("tipoPessoa") or _tipo_pessoa(str(dados.get("cpfCnpj", ""))),
-            "nome": str(dados.get("nome")),
-            "endereco": str(dados.get("endereco", "")),
-            "bairro": str(dados.get("bairro", "")),
-            "cidade": str(dados.get("cidade", "")),
-            "uf": str(dados.get("uf", "")),
-            "cep": str(dados.get("cep", "")),
-            "email": str(dados.get("email", "")),
-            "ddd": str(dados.get("ddd", "")),
-            "telefone": str(dados.get("telefone", "")),
-            "numero": str(dados.get("numero", "")),
-            "complemento": str(dados.get("complemento", "")),
-        },
-        "multa": {
-            "codigo": dados.get("codigoMulta", "VALORFIXO"),
-            "valor": float(dados.get("valorMulta", 1.08)),
-        },
-        "mora": {
-            "codigo": dados.get("codigoMora", "TAXAMENSAL"),
-            "taxa": float(dados.get("taxaMora", 5)),
-        },
-        "mensagem": {
-            "linha1": str(dados.get("mensagem1", "Serviços contábeis.")),
-            "linha2": str(dados.get("mensagem2", "")),
-            "linha3": str(dados.get("mensagem3", "")),
-            "linha4": str(dados.get("mensagem4", "")),
-            "linha5": str(dados.get("mensagem5", "")),
-        },
-        "formasRecebimento": dados.get("formasRecebimento", ["BOLETO", "PIX"]),
-    }
-
-    response = requests.post(
+    response = requisicao(
+        "POST",
         COBRANCA_URL,
         headers=headers,
-        cert=(cert_path or CERT_PATH, key_path or KEY_PATH),
+        cert_path=cert_path,
+        key_path=key_path,
         json=body,
     )
 
@@ -208,18 +129,9 @@ def emitir_boleto(
         key_path=key_path,
     )
 
-    seu_numero = _montar_seu_numero(cliente, data_vencimento)
-
-    payload: Dict[str, Any] = {
-        **cliente,
-        "valorNominal": cliente.get("valorNominal"),
-        "dataVencimento": data_vencimento,
-        "seuNumero": seu_numero,
-    }
-
     resultado = emitir_boleto_api(
         token,
-        payload,
+        {**cliente, "dataVencimento": data_vencimento},
         conta_corrente=conta_corrente,
         cert_path=cert_path,
         key_path=key_path,
@@ -235,43 +147,84 @@ def emitir_boleto(
     }
 
 
-def salvar_codigos_excel(lista_codigos: Iterable[Iterable[Any]]) -> None:
-    if pd is None:
-        raise RuntimeError("pandas não está disponível para salvar os códigos em Excel.")
-    df = pd.DataFrame(list(lista_codigos), columns=["codigoSolicitacao", "nome"])
-    df.to_excel("codigos_emitidos.xlsx", index=False)
-    print("📄 Todos os códigos salvos em 'codigos_emitidos.xlsx'")
+def cancelar_boleto(
+    codigo_solicitacao: str,
+    motivo: str = "Solicitação do cliente",
+    *,
+    conta_corrente: Optional[str] = None,
+    cert_path: Optional[str] = None,
+    key_path: Optional[str] = None,
+) -> None:
+    token = obter_token(cert_path=cert_path, key_path=key_path)
+    response = requisicao(
+        "POST",
+        COBRANCA_CANCELAR_URL.format(codigo_solicitacao=codigo_solicitacao),
+        headers={
+            "Authorization": f"Bearer {token}",
+            "x-conta-corrente": conta_corrente or obter_credenciais().conta_corrente,
+            "Content-Type": "application/json",
+        },
+        cert_path=cert_path,
+        key_path=key_path,
+        json={"motivoCancelamento": (motivo.strip() or "Solicitação do cliente")[:50]},
+    )
+    if not response.ok:
+        print("✅ Resposta do servidor:")
+        print(response.text)
+    response.raise_for_status()
 
 
-if __name__ == "__main__":
+def _pandas():
+    # Importado só para ler/gravar planilhas: cancelar ou baixar um PDF não paga o custo.
     try:
-        if pd is None:
-            raise RuntimeError(
-                "pandas não está instalado. Instale-o para executar a emissão via linha de comando."
-            )
-        token = obter_token()
-        df = pd.read_excel(
-            "clientes_boletos_092025_teste.xlsx",
-            dtype=str,
-            sheet_name="BOLETOS",
-        )
-
-        codigos_emitidos = []
-
-        for _, row in df.iterrows():
-            try:
-                retorno = emitir_boleto_api(
-                    token,
-                    row.to_dict(),
-                    conta_corrente=CONTA_CORRENTE,
-                )
-                nome_cliente = str(row.get("nome", "cliente")).strip().replace(" ", "_")
-                codigos_emitidos.append([retorno.get("codigoSolicitacao"), nome_cliente])
-            except Exception as exc:  # noqa: BLE001 - logs completos no console
-                print(f"❌ Erro ao emitir boleto para {row.get('nome')}: {exc}")
-
-        if codigos_emitidos:
-            salvar_codigos_excel(codigos_emitidos)
+        import pandas as pd
+    except ImportError as exc:  # noqa: BLE001 - pandas é opcional para rodar via Django
+        raise RuntimeError(
+            "pandas não está instalado. Instale-o para executar a emissão via linha de comando."
+        ) from exc
+    return pd
+
+
+def salvar_codigos_excel(lista_codigos: Iterable[Iterable[Any]], arquivo: str = SAIDA_PADRAO) -> None:
+    df = _pandas().DataFrame(list(lista_codigos), columns=["codigoSolicitacao", "nome"])
+    df.to_excel(arquivo, index=False)
+    print(f"📄 Todos os códigos salvos em '{arquivo}'")
+
+
+def emitir_planilha(
+    planilha: str = PLANILHA_PADRAO,
+    aba: str = ABA_PADRAO,
+    saida: str = SAIDA_PADRAO,
+) -> Tuple[int, int]:
+    """Emite um boleto por linha válida da planilha. Retorna ``(emitidos, com erro)``."""
+    df = _pandas().read_excel(planilha, dtype=str, sheet_name=aba)
+    token = obter_token()
+
+    codigos_emitidos = []
+    erros = 0
+    conta_corrente = obter_credenciais().conta_corrente
+
+    # Valida e monta todos os corpos antes do primeiro envio.
+    corpos, invalidos = montar_corpos(df)
+    for posicao, motivo in invalidos:
+        print(f"❌ Linha {posicao + 2} ignorada: {motivo}")
+
+    for _, body in corpos:
+        nome = body["pagador"]["nome"]
+        try:
+            retorno = enviar_corpo(token, body, conta_corrente=conta_corrente)
+            codigos_emitidos.append([retorno.get("codigoSolicitacao"), nome.replace(" ", "_")])
+        except Exception as exc:  # noqa: BLE001 - logs completos no console
+            erros += 1
+            print(f"❌ Erro ao emitir boleto para {nome}: {exc}")
+
+    if codigos_emitidos:
+        salvar_codigos_excel(codigos_emitidos, saida)
+    return len(codigos_emitidos), erros + len(invalidos)
 
+
+if __name__ == "__main__":
+    try:
+        emitir_planilha()
     except Exception as exc:  # noqa: BLE001 - execução CLI precisa do erro
         print("❌ Erro geral:", str(exc))
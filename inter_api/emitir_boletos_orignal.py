@@ -1,67 +1,45 @@
-import os
-from datetime import datetime
-from pathlib import Path
-from typing import Dict, Optional
+try:
+    from inter_api.credenciais import obter_credenciais, requisicao
+    from inter_api.payload import montar_corpo
+except ImportError:  # executado como script de dentro de inter_api/
+    from credenciais import obter_credenciais, requisicao
+    from payload import montar_corpo
 
-import pandas as pd
-import requests
-from dotenv import load_dotenv
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-CREDENTIALS_DIR = BASE_DIR / "config" / "inter"
-
-
-def _resolve_cert_path(raw_value: Optional[str], filename: str) -> str:
-    if raw_value:
-        candidate = Path(raw_value)
-        if not candidate.is_absolute():
-            candidate = CREDENTIALS_DIR / candidate
-    else:
-        candidate = CREDENTIALS_DIR / filename
-    return str(candidate)
-
-
-# Mantém compatibilidade com scripts antigos, mas respeitando limite da API
-def _montar_seu_numero(dados: Dict[str, str], data_vencimento: datetime) -> str:
-    fornecido = str(dados.get("seuNumero", "")).strip()
-    if fornecido:
-        sanitizado = "".join(ch for ch in fornecido if ch.isalnum()) or fornecido.replace(" ", "")
-        return sanitizado[:15]
+AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
+COBRANCA_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas"
 
-    cpf_cnpj = "".join(ch for ch in str(dados.get("cpfCnpj", "")) if ch.isalnum()) or "SN"
-    sufixo = data_vencimento.strftime("%y%m%d")
-    max_base = max(0, 15 - len(sufixo))
-    base = cpf_cnpj[-max_base:] if max_base else ""
-    resultado = (base + sufixo)[:15]
-    return resultado or sufixo[-15:]
 
+# Compatibilidade: CLIENT_ID, CERT_PATH etc. eram constantes lidas do .env no import.
+_ATRIBUTOS_LEGADOS = {
+    "CLIENT_ID": "client_id",
+    "CLIENT_SECRET": "client_secret",
+    "CONTA_CORRENTE": "conta_corrente",
+    "CERT_PATH": "cert_path",
+    "KEY_PATH": "key_path",
+}
 
-# Carregar variáveis de ambiente
-load_dotenv(CREDENTIALS_DIR / ".env")
 
-CLIENT_ID = os.getenv("CLIENT_ID")
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")
-CONTA_CORRENTE = os.getenv("CONTA_CORRENTE")
-CERT_PATH = _resolve_cert_path(os.getenv("CERT_PATH"), "Inter_API_Certificado.crt")
-KEY_PATH = _resolve_cert_path(os.getenv("KEY_PATH"), "Inter_API_Chave.key")
-
-AUTH_URL = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
-COBRANCA_URL = "https://cdpj.partners.bancointer.com.br/cobranca/v3/cobrancas"
+def __getattr__(nome: str):
+    if nome in _ATRIBUTOS_LEGADOS:
+        return getattr(obter_credenciais(), _ATRIBUTOS_LEGADOS[nome])
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 
 def obter_token():
+    credenciais = obter_credenciais()
     payload = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
+        "client_id": credenciais.client_id,
+        "client_secret": credenciais.client_secret,
         "grant_type": "client_credentials",
         "scope": "boleto-cobranca.write"
     }
 
-    response = requests.post(
+    response = requisicao(
+        "POST",
         AUTH_URL,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         data=payload,
-        cert=(CERT_PATH, KEY_PATH)
     )
     response.raise_for_status()
     return response.json().get("access_token")
@@ -70,80 +48,17 @@ def obter_token():
 def emitir_boleto(token, dados):
     headers = {
         "Authorization": f"Bearer {token}",
-        "x-conta-corrente": CONTA_CORRENTE,
+        "x-conta-corrente": obter_credenciais().conta_corrente,
         "Content-Type": "application/json"
     }
 
-    # Tratamento do valor nominal
-    try:
-        valor = float(dados["valorNominal"])
-    except:
-        raise ValueError(f"Valor inválido: {dados['valorNominal']}")
-
-    # Tratamento da data de vencimento
-    data_original = str(dados["dataVencimento"]).strip()
-    try:
-        if isinstance(dados["dataVencimento"], pd.Timestamp):
-            data_obj = dados["dataVencimento"].to_pydatetime()
-        else:
-            try:
-                # Tenta formato do Excel convertido em string
-                data_obj = datetime.strptime(data_original, "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                try:
-                    # Tenta formato ano-mês-dia sem hora
-                    data_obj = datetime.strptime(data_original, "%Y-%m-%d")
-                except ValueError:
-                    # Tenta formato dia-mês-ano
-                    data_obj = datetime.strptime(data_original, "%d-%m-%Y")
-    except Exception as e:
-        raise ValueError(f"Data de vencimento inválida: {data_original} ({e})")
-
-    data_formatada = data_obj.strftime("%Y-%m-%d")
-
-    # Monta body para a API do Banco Inter
-    body = {
-        "seuNumero": _montar_seu_numero(dados, data_obj),
-        "valorNominal": valor,
-        "dataVencimento": str(data_formatada),
-        "numDiasAgenda": 30,
-        "pagador": {
-            "cpfCnpj": str(dados["cpfCnpj"]),
-            "tipoPessoa": "JURIDICA",
-            "nome": str(dados["nome"]),
-            "endereco": str(dados["endereco"]),
-            "bairro": str(dados["bairro"]),
-            "cidade": str(dados["cidade"]),
-            "uf": str(dados["uf"]),
-            "cep": str(dados["cep"]),
-            "email": str(dados["email"]),
-            "ddd": str(dados["ddd"]),
-            "telefone": str(dados["telefone"]),
-            "numero": str(dados["numero"]),
-            "complemento": str(dados["complemento"])
-        },
-        "multa": {
-            "codigo": "VALORFIXO",
-            "valor": 1.08  # valor fixo em reais
-        },
-        "mora": {
-            "codigo": "TAXAMENSAL",
-            "taxa": 5
-        },
-        "mensagem": {
-            "linha1": "Serviços contábeis.",
-            "linha2": "",
-            "linha3": "",
-            "linha4": "",
-            "linha5": ""
-        },
-        "formasRecebimento": ["BOLETO", "PIX"]
-    }
+    # Mesmo corpo gerado pelo sistema (valor, data, seuNumero, pagador e padrões de multa/mora)
+    body = montar_corpo(dados)
 
-    response = requests.post(
+    response = requisicao(
+        "POST",
         COBRANCA_URL,
         headers=headers,
-        cert=(CERT_PATH, KEY_PATH),
         json=body
     )
 
@@ -0,0 +1,82 @@
+# Mede a partida a frio dos pontos de entrada: cada cenário roda num interpretador
+# novo, algumas vezes, e mostra a mediana (e o acréscimo sobre um "python -c pass")
+# e os módulos pesados que acabaram carregados. O limite vale para os scripts de
+# linha de comando; a partida do Django (apps, admin, URLs) é só informada.
+# Uso: python -m inter_api.medir_importacao [--vezes N] [--limite-ms MS]
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Só deveriam ser carregados quando usados (requisição ao banco, planilha, PDF).
+MODULOS_PESADOS = ("requests", "urllib3", "pandas", "openpyxl", "pypdf")
+LIMITE_PADRAO_MS = 200.0
+
+# (nome, código, sujeito ao limite)
+CENARIOS: Tuple[Tuple[str, str, bool], ...] = (
+    (
+        "python -m inter_api --help",
+        "from inter_api.cli import criar_parser\n"
+        "try:\n    criar_parser().parse_args(['--help'])\nexcept SystemExit:\n    pass",
+        True,
+    ),
+    ("import inter_api.emitir_boletos", "import inter_api.emitir_boletos", True),
+    ("import inter_api.baixar_boletos_pdf", "import inter_api.baixar_boletos_pdf", True),
+    (
+        "django.setup() + urls",
+        "import os\nos.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')\n"
+        "import django\ndjango.setup()\nimport config.urls",
+        False,
+    ),
+)
+
+# Depois do cenário, informa no stderr quais módulos pesados foram importados.
+_RELATORIO = "\nimport sys\nprint(','.join(m for m in {!r} if m in sys.modules), file=sys.stderr)"
+
+
+def _rodar(codigo: str) -> Tuple[float, str]:
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    linhas = processo.stderr.strip().splitlines()
+    return (time.perf_counter() - inicio) * 1000, linhas[-1] if linhas else ""
+
+
+def medir(codigo: str, vezes: int) -> Tuple[float, str]:
+    """Mediana em ms de ``vezes`` execuções (após uma de aquecimento) e os módulos pesados carregados."""
+    _rodar(codigo)
+    medidas = [_rodar(codigo) for _ in range(vezes)]
+    return statistics.median(ms for ms, _ in medidas), medidas[-1][1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de partida dos pontos de entrada.")
+    parser.add_argument("--vezes", type=int, default=7)
+    parser.add_argument(
+        "--limite-ms", type=float, default=LIMITE_PADRAO_MS, help="Falha se um script de linha de comando passar disso."
+    )
+    args = parser.parse_args(argv)
+
+    base, _ = medir("pass", args.vezes)
+    print(f"{'interpretador vazio':40} {base:7.1f} ms")
+    acima = False
+    for nome, codigo, com_limite in CENARIOS:
+        ms, pesados = medir(codigo + _RELATORIO.format(MODULOS_PESADOS), args.vezes)
+        acima = acima or (com_limite and ms > args.limite_ms)
+        extra = f"  carregou: {pesados}" if pesados else ""
+        print(f"{nome:40} {ms:7.1f} ms  (+{ms - base:.1f}){extra}")
+    return 1 if acima else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
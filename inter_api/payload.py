@@ -0,0 +1,215 @@
+# Corpo da requisição de emissão (POST /cobranca/v3/cobrancas) montado num só lugar:
+# InterService e os scripts de linha de comando usam as mesmas funções e, portanto,
+# enviam exatamente o mesmo JSON para os mesmos dados.
+import datetime as dt
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Tuple
+
+CAMPOS_PAGADOR = (
+    "nome",
+    "endereco",
+    "bairro",
+    "cidade",
+    "uf",
+    "cep",
+    "email",
+    "ddd",
+    "telefone",
+    "numero",
+    "complemento",
+)
+MENSAGEM_PADRAO = "Serviços contábeis."
+FORMAS_RECEBIMENTO = ("BOLETO", "PIX")
+NUM_DIAS_AGENDA = 30
+
+# Chaves que alteram multa/mora/mensagem/formas; sem nenhuma delas usa-se o padrão pronto.
+CHAVES_OPCIONAIS = frozenset(
+    {
+        "codigoMulta",
+        "valorMulta",
+        "codigoMora",
+        "taxaMora",
+        "mensagem1",
+        "mensagem2",
+        "mensagem3",
+        "mensagem4",
+        "mensagem5",
+        "formasRecebimento",
+    }
+)
+MULTA_PADRAO = {"codigo": "VALORFIXO", "valor": 1.08}
+MORA_PADRAO = {"codigo": "TAXAMENSAL", "taxa": 5.0}
+_MENSAGEM_PADRAO = {"linha1": MENSAGEM_PADRAO, "linha2": "", "linha3": "", "linha4": "", "linha5": ""}
+
+_NAO_DIGITO = re.compile(r"\D")
+_NAO_ALFANUMERICO = re.compile(r"[\W_]")
+_FORMATOS_DATA = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+
+
+def _texto(valor: Any) -> str:
+    if type(valor) is str:
+        return valor
+    # None e NaN (células vazias do pandas) viram texto vazio.
+    if valor is None or valor != valor:
+        return ""
+    return str(valor)
+
+
+def _vazio(valor: Any) -> bool:
+    """None, NaN ou texto em branco: a célula não foi preenchida."""
+    return not _texto(valor).strip()
+
+
+def _numero_opcional(dados: Mapping[str, Any], chave: str, padrao: float) -> float:
+    """Número de ``dados[chave]`` (aceita vírgula decimal); vazio usa ``padrao``."""
+    valor = dados.get(chave)
+    if _vazio(valor):
+        return padrao
+    try:
+        numero = float(valor.replace(",", ".") if isinstance(valor, str) else valor)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"{chave} inválido: {valor}") from exc
+    if numero != numero or numero < 0:
+        raise ValueError(f"{chave} inválido: {valor}")
+    return numero
+
+
+def _formas_recebimento(valor: Any) -> List[str]:
+    """Lista ou texto "BOLETO, PIX"; vazio (None/NaN/"") usa as formas padrão."""
+    if isinstance(valor, str):
+        valor = [parte.strip().upper() for parte in valor.split(",") if parte.strip()]
+    elif not isinstance(valor, (list, tuple)):
+        valor = None
+    return list(valor or FORMAS_RECEBIMENTO)
+
+
+def tipo_pessoa(cpf_cnpj: str) -> str:
+    return "JURIDICA" if len(_NAO_DIGITO.sub("", cpf_cnpj or "")) > 11 else "FISICA"
+
+
+def montar_seu_numero(dados: Mapping[str, Any], data_venc: dt.date) -> str:
+    fornecido = _texto(dados.get("seuNumero")).strip()
+    if fornecido:
+        sanitizado = _NAO_ALFANUMERICO.sub("", fornecido) or fornecido.replace(" ", "")
+        return sanitizado[:15]
+
+    cpf_cnpj = _NAO_ALFANUMERICO.sub("", _texto(dados.get("cpfCnpj"))) or "SN"
+    sufixo = _sufixo_data(data_venc)  # garante diferença por competência/dia
+    max_base = max(0, 15 - len(sufixo))
+    base = cpf_cnpj[-max_base:] if max_base else ""
+    resultado = (base + sufixo)[:15]
+    return resultado or sufixo[-15:]
+
+
+@lru_cache(maxsize=512)
+def _sufixo_data(data_venc: dt.date) -> str:
+    return data_venc.strftime("%y%m%d")
+
+
+@lru_cache(maxsize=512)
+def _data_iso(data_venc: dt.date) -> str:
+    return data_venc.isoformat()
+
+
+@lru_cache(maxsize=512)
+def _data_de_texto(valor: str) -> dt.date:
+    # Num lote as mesmas poucas datas se repetem; cada texto é interpretado uma vez.
+    for formato in _FORMATOS_DATA:
+        try:
+            return dt.datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data de vencimento inválida: {valor}")
+
+
+def normalizar_data(valor: Any) -> dt.date:
+    """Aceita date, datetime, ``pandas.Timestamp`` ou texto (ISO ou dd/mm/aaaa)."""
+    if isinstance(valor, dt.datetime):  # inclui pandas.Timestamp
+        return valor.date()
+    if isinstance(valor, dt.date):
+        return valor
+    if isinstance(valor, str):
+        return _data_de_texto(valor.strip())
+    raise ValueError(f"Data de vencimento inválida: {valor}")
+
+
+def montar_corpo(dados: Mapping[str, Any], data_venc: Any = None) -> Dict[str, Any]:
+    """Valida ``dados`` e devolve o corpo JSON da emissão.
+
+    ``data_venc`` tem precedência sobre ``dados["dataVencimento"]``. Levanta
+    ``ValueError`` com mensagem legível quando algum campo obrigatório é inválido.
+    """
+    if "valorNominal" not in dados:
+        raise ValueError("O cliente precisa possuir o campo 'valorNominal'.")
+    try:
+        valor_nominal = float(dados["valorNominal"])
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Valor nominal inválido: {dados['valorNominal']}") from exc
+    if valor_nominal != valor_nominal or valor_nominal <= 0:
+        raise ValueError(f"Valor nominal inválido: {dados['valorNominal']}")
+
+    cpf_cnpj = _texto(dados.get("cpfCnpj")).strip()
+    if not cpf_cnpj:
+        raise ValueError("CPF/CNPJ é obrigatório para emissão do boleto.")
+    nome = _texto(dados.get("nome")).strip()
+    if not nome:
+        raise ValueError("Nome é obrigatório para emissão do boleto.")
+
+    data = normalizar_data(dados.get("dataVencimento") if data_venc is None else data_venc)
+
+    pagador = {"cpfCnpj": cpf_cnpj, "tipoPessoa": _texto(dados.get("tipoPessoa")) or tipo_pessoa(cpf_cnpj)}
+    pagador.update(zip(CAMPOS_PAGADOR, map(_texto, map(dados.get, CAMPOS_PAGADOR))))
+    pagador["nome"] = nome
+
+    corpo: Dict[str, Any] = {
+        "seuNumero": montar_seu_numero(dados, data),
+        "valorNominal": valor_nominal,
+        "dataVencimento": _data_iso(data),
+        "numDiasAgenda": NUM_DIAS_AGENDA,
+        "pagador": pagador,
+    }
+    if CHAVES_OPCIONAIS.isdisjoint(dados.keys()):
+        corpo["multa"] = dict(MULTA_PADRAO)
+        corpo["mora"] = dict(MORA_PADRAO)
+        corpo["mensagem"] = dict(_MENSAGEM_PADRAO)
+        corpo["formasRecebimento"] = list(FORMAS_RECEBIMENTO)
+        return corpo
+
+    # Colunas opcionais de planilha chegam como NaN/None/"" quando a célula está
+    # vazia: nesses casos vale o padrão, nunca um NaN no JSON.
+    corpo["multa"] = {
+        "codigo": _texto(dados.get("codigoMulta")).strip() or MULTA_PADRAO["codigo"],
+        "valor": _numero_opcional(dados, "valorMulta", MULTA_PADRAO["valor"]),
+    }
+    corpo["mora"] = {
+        "codigo": _texto(dados.get("codigoMora")).strip() or MORA_PADRAO["codigo"],
+        "taxa": _numero_opcional(dados, "taxaMora", MORA_PADRAO["taxa"]),
+    }
+    corpo["mensagem"] = {
+        f"linha{i}": _texto(dados[f"mensagem{i}"]) if not _vazio(dados.get(f"mensagem{i}")) else padrao
+        for i, padrao in enumerate(_MENSAGEM_PADRAO.values(), start=1)
+    }
+    corpo["formasRecebimento"] = _formas_recebimento(dados.get("formasRecebimento"))
+    return corpo
+
+
+def montar_corpos(
+    registros: Any, data_venc: Any = None
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]]]:
+    """Monta os corpos de um lote inteiro (lista de dicts, ``.values()`` ou DataFrame).
+
+    Retorna ``(corpos, erros)`` como pares ``(posição, corpo)`` e ``(posição, motivo)``:
+    uma linha inválida não interrompe as demais.
+    """
+    if hasattr(registros, "to_dict") and not isinstance(registros, Mapping):
+        registros = registros.to_dict("records")  # DataFrame
+    corpos: List[Tuple[int, Dict[str, Any]]] = []
+    erros: List[Tuple[int, str]] = []
+    for posicao, dados in enumerate(registros):
+        try:
+            corpos.append((posicao, montar_corpo(dados, data_venc)))
+        except (TypeError, ValueError) as exc:
+            erros.append((posicao, str(exc)))
+    return corpos, erros
+